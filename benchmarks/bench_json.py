@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""Benchmark of the JSON codecs (bestlab_platform.jsoncodec) on large HOBO and Tuya payloads.
+
+For each installed codec, measures decoding a response body and encoding a request body. "before" is the previous
+Tuya response handling, which decoded the same response with response.json() up to three times.
+
+Usage:
+    python benchmarks/bench_json.py
+"""
+from __future__ import annotations
+
+import json
+import timeit
+from typing import Any, Callable
+
+import requests
+
+from bestlab_platform.jsoncodec import JSON_CODECS, JSONCodec
+
+
+def make_tuya_page(size: int = 100) -> dict[str, Any]:
+    """A device log page as returned by /v1.0/devices/{device_id}/logs."""
+    return {
+        "result": {
+            "device_id": "vdevo123456789012345",
+            "has_next": True,
+            "next_row_key": "1634005305000_abcdef",
+            "logs": [
+                {
+                    "code": "va_temperature",
+                    "value": str(200 + i % 50),
+                    "event_time": 1634005305000 + i * 1000,
+                    "event_from": "1",
+                    "event_id": 7,
+                    "status": "1",
+                }
+                for i in range(size)
+            ],
+        },
+        "success": True,
+        "t": 1634005305123,
+    }
+
+
+def make_hobo_response(num_observations: int = 50000) -> dict[str, Any]:
+    """A get_data() response with 1-minute readings."""
+    return {
+        "message": f"OK: Found: {num_observations} results.",
+        "observation_list": [
+            {
+                "logger_sn": "21079936",
+                "sensor_sn": f"21079936-{i % 4 + 1}",
+                "timestamp": f"2021-10-{1 + i // 5760:02d}T{i // 240 % 24:02d}:{i // 4 % 60:02d}:00Z",
+                "data_type": "TIME_SERIES",
+                "si_value": 20.0 + i % 50 / 10,
+                "si_unit": "°C",
+                "us_value": 68.0 + i % 90 / 10,
+                "us_unit": "°F",
+                "scaled_value": 0.0,
+                "scaled_unit": None,
+                "sensor_key": "21079936-1-1",
+                "sensor_measurement_type": "Temperature",
+            }
+            for i in range(num_observations)
+        ],
+    }
+
+
+def fake_response(content: bytes) -> requests.Response:
+    response = requests.Response()
+    response._content = content
+    response.status_code = 200
+    response.encoding = "utf-8"
+    return response
+
+
+def per_call(func: Callable[[], Any], number: int) -> float:
+    return timeit.timeit(func, number=number) / number
+
+
+def installed_codecs() -> list[JSONCodec]:
+    codecs = []
+    for codec in JSON_CODECS.values():
+        try:
+            codecs.append(codec())
+        except ImportError:
+            print(f"{codec.name} is not installed, skipped")
+    return codecs
+
+
+if __name__ == '__main__':
+    tuya_page = json.dumps(make_tuya_page()).encode("utf8")
+    hobo_body = json.dumps(make_hobo_response()).encode("utf8")
+    command_body = {"commands": [{"code": "switch_led", "value": True}, {"code": "bright_value", "value": 255}]}
+    codecs = installed_codecs()
+
+    page_response = fake_response(tuya_page)
+    before = per_call(lambda: [page_response.json() for _ in range(3)], 2000)
+    print(f"Tuya log page ({len(tuya_page)} bytes), before: {before * 1e6:9.1f} us")
+    for codec in codecs:
+        print(f"  {codec.name:>6}: decode {per_call(lambda: codec.loads(page_response.content), 2000) * 1e6:9.1f} us")
+
+    hobo_response = fake_response(hobo_body)
+    print(f"HOBO response ({len(hobo_body)} bytes), response.json(): "
+          f"{per_call(hobo_response.json, 10) * 1e3:9.1f} ms")
+    for codec in codecs:
+        print(f"  {codec.name:>6}: decode {per_call(lambda: codec.loads(hobo_response.content), 10) * 1e3:9.1f} ms")
+
+    print("Request body")
+    for codec in codecs:
+        print(f"  {codec.name:>6}: encode {per_call(lambda: codec.dumps(command_body), 20000) * 1e6:9.2f} us")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""Micro-benchmark of the request/response logging overhead in TuyaOpenAPI.
+
+Compares the previous implementation (f-strings evaluated on every request, deepcopy-based redaction)
+with the current one (logging guarded by the logger level, copy-free redacting serializer).
+
+Usage:
+    python benchmarks/bench_logging.py
+"""
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import timeit
+from typing import Any
+
+from bestlab_platform.tuya.openlogging import (FILTER_LIST, STAR, filter_dumps,
+                                               logger)
+
+
+def old_filter_logger(result_info: Any) -> Any:
+    """filter_logger() before the change, kept here for comparison."""
+    if result_info is None:
+        return result_info
+    filter_info_original = copy.deepcopy(result_info)
+    if "result" in filter_info_original:
+        filter_info = filter_info_original["result"]
+    else:
+        filter_info = filter_info_original
+    if isinstance(filter_info, list):
+        for item in filter_info:
+            for filter_key in FILTER_LIST:
+                if filter_key in item:
+                    item[filter_key] = STAR
+    elif isinstance(filter_info, dict):
+        for filter_key in FILTER_LIST:
+            if filter_key in filter_info:
+                filter_info[filter_key] = STAR
+    return filter_info_original
+
+
+def old_log_response(result: dict[str, Any]) -> None:
+    logger.debug(
+        f"Response: {json.dumps(old_filter_logger(result), ensure_ascii=False, indent=2)}"
+    )
+
+
+def new_log_response(result: dict[str, Any]) -> None:
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Response: {filter_dumps(result, indent=2)}")
+
+
+def make_log_page(size: int = 100) -> dict[str, Any]:
+    """A device log page as returned by /v1.0/devices/{device_id}/logs."""
+    return {
+        "result": {
+            "device_id": "vdevo123456789012345",
+            "has_next": True,
+            "next_row_key": "1634005305000_abcdef",
+            "logs": [
+                {
+                    "code": "pir",
+                    "value": "pir" if i % 2 else "none",
+                    "event_time": 1634005305000 + i * 1000,
+                    "event_from": "1",
+                    "event_id": 7,
+                    "status": "1",
+                }
+                for i in range(size)
+            ],
+        },
+        "success": True,
+        "t": 1634005305123,
+    }
+
+
+def bench(level: int, number: int) -> None:
+    logger.setLevel(level)
+    page = make_log_page()
+    old = timeit.timeit(lambda: old_log_response(page), number=number) / number
+    new = timeit.timeit(lambda: new_log_response(page), number=number) / number
+    print(
+        f"{logging.getLevelName(level):>5}: before {old * 1e6:10.2f} us/request, "
+        f"after {new * 1e6:10.2f} us/request"
+    )
+
+
+if __name__ == '__main__':
+    # Drop the output, only the formatting cost is of interest.
+    logger.handlers = [logging.NullHandler()]
+    logger.propagate = False
+    bench(logging.INFO, number=2000)
+    bench(logging.DEBUG, number=500)
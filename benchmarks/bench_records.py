@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""Memory benchmark of the compact record types (bestlab_platform.records).
+
+Decodes synthetic Tuya device log pages and a HOBO get_data() response the same way the clients do, then measures the
+memory retained per record by the decoded dicts and by the compact records built from them.
+
+Usage:
+    python benchmarks/bench_records.py
+"""
+from __future__ import annotations
+
+import gc
+import json
+import tracemalloc
+from typing import Any, Callable
+
+from bestlab_platform.records import compact_device_log, compact_observations
+
+NUM_DEVICES = 20
+RECORDS_PER_DEVICE = 20000
+NUM_LOGGERS = 10
+SENSORS_PER_LOGGER = 4
+NUM_MINUTES = 2000
+
+
+def make_device_log_json(device_index: int) -> str:
+    """A device log as the JSON text of its pages, concatenated."""
+    codes = ["pir", "battery_percentage", "va_temperature", "va_humidity"]
+    logs = [
+        {
+            "code": codes[i % len(codes)],
+            "value": str(i % 100) if i % len(codes) else ("pir" if i % 2 else "none"),
+            "event_time": 1634005305000 + i * 1000,
+            "event_from": "1",
+            "event_id": 7,
+            "status": "1",
+        }
+        for i in range(RECORDS_PER_DEVICE)
+    ]
+    return json.dumps(logs)
+
+
+def make_hobo_json() -> str:
+    observations = [
+        {
+            "logger_sn": str(1000000 + logger_index),
+            "sensor_sn": f"{1000000 + logger_index}-{sensor_index}",
+            "timestamp": f"2021-10-{1 + minute // 1440:02d}T{minute // 60 % 24:02d}:{minute % 60:02d}:00Z",
+            "data_type": "TIME_SERIES",
+            "si_value": 20.0 + minute % 50 / 10,
+            "si_unit": "°C",
+            "us_value": 68.0 + minute % 90 / 10,
+            "us_unit": "°F",
+            "scaled_value": 0.0,
+            "scaled_unit": None,
+            "sensor_key": f"key-{sensor_index}",
+            "sensor_measurement_type": "Temperature",
+        }
+        for minute in range(NUM_MINUTES)
+        for logger_index in range(NUM_LOGGERS)
+        for sensor_index in range(SENSORS_PER_LOGGER)
+    ]
+    return json.dumps({"message": f"OK: Found: {len(observations)} results.", "observation_list": observations})
+
+
+def retained_bytes(build: Callable[[], Any]) -> tuple[int, Any]:
+    """Memory allocated by build() and still held by its result."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+
+def report(name: str, count: int, dict_bytes: int, compact_bytes: int) -> None:
+    print(
+        f"{name:>6}: {count} records, dicts {dict_bytes / count:7.1f} bytes/record, "
+        f"compact {compact_bytes / count:7.1f} bytes/record ({dict_bytes / compact_bytes:.1f}x smaller)"
+    )
+
+
+if __name__ == '__main__':
+    device_logs_json = [make_device_log_json(i) for i in range(NUM_DEVICES)]
+    count = NUM_DEVICES * RECORDS_PER_DEVICE
+    dict_bytes, _ = retained_bytes(lambda: [json.loads(text) for text in device_logs_json])
+    compact_bytes, _ = retained_bytes(lambda: [
+        compact_device_log(f"vdevo{i:015d}", json.loads(text)) for i, text in enumerate(device_logs_json)
+    ])
+    report("Tuya", count, dict_bytes, compact_bytes)
+
+    hobo_json = make_hobo_json()
+    count = NUM_MINUTES * NUM_LOGGERS * SENSORS_PER_LOGGER
+    dict_bytes, _ = retained_bytes(lambda: json.loads(hobo_json))
+    compact_bytes, _ = retained_bytes(lambda: compact_observations(json.loads(hobo_json)))
+    report("HOBO", count, dict_bytes, compact_bytes)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""Benchmark of the client-side overhead of one device log page, without network.
+
+Compares, per page:
+    - signing: the previous calculate_sign() (new HMAC from the raw secret, parameters sorted and the query string
+      built again) against TuyaRequestSigner and TuyaRequestTemplate, which only fill in start_row_key;
+    - HTTP request preparation: session.prepare_request() and the environment settings, as done by
+      session.request() for every page, against copying the request prepared once;
+    - the whole client (sign, prepare, send, decode, metrics) with an InMemoryTransport returning a small page:
+      TuyaOpenAPI.get() against TuyaOpenAPI.send_prepared().
+
+Usage:
+    python benchmarks/bench_signing.py
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import time
+import timeit
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+
+from bestlab_platform.transport import InMemoryTransport
+from bestlab_platform.tuya import TuyaOpenAPI
+from bestlab_platform.tuya.signing import TuyaRequestSigner, TuyaRequestTemplate
+
+ENDPOINT = "https://openapi.tuyaus.com"
+ACCESS_ID = "abcdefghijklmnopqrst"
+ACCESS_SECRET = "0123456789abcdef0123456789abcdef"
+ACCESS_TOKEN = "0123456789abcdef0123456789abcdef"
+PATH = "/v1.0/devices/vdevo123456789012345/logs"
+PARAMS = {"type": 7, "start_time": "1634000000000", "end_time": "1634600000000", "size": 100}
+ROW_KEY = "1634005305000_abcdef"
+
+
+def legacy_calculate_sign(
+    method: str, path: str, params: Optional[Dict[str, Any]] = None, body: Optional[Dict[str, Any]] = None
+) -> Tuple[str, int]:
+    """calculate_sign() before the signing engine."""
+    str_to_sign = method
+    str_to_sign += "\n"
+    content_to_sha256 = "" if body is None or len(body.keys()) == 0 else json.dumps(body)
+    str_to_sign += hashlib.sha256(content_to_sha256.encode("utf8")).hexdigest().lower()
+    str_to_sign += "\n"
+    str_to_sign += "\n"
+    str_to_sign += path
+    if params is not None and len(params.keys()) > 0:
+        str_to_sign += "?"
+        query_builder = ""
+        for key in sorted(params.keys()):
+            query_builder += f"{key}={params[key]}&"
+        str_to_sign += query_builder[:-1]
+    t = int(time.time() * 1000)
+    message = ACCESS_ID + ACCESS_TOKEN + str(t) + str_to_sign
+    sign = hmac.new(
+        ACCESS_SECRET.encode("utf8"), msg=message.encode("utf8"), digestmod=hashlib.sha256
+    ).hexdigest().upper()
+    return sign, t
+
+
+def headers(sign: str, t: int) -> Dict[str, str]:
+    return {"client_id": ACCESS_ID, "sign": sign, "sign_method": "HMAC-SHA256", "access_token": ACCESS_TOKEN,
+            "t": str(t), "lang": "en"}
+
+
+def per_call(func: Callable[[], Any], number: int = 20000) -> float:
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def report(name: str, before: float, after: float) -> None:
+    print(f"{name:<22} before: {before * 1e6:7.1f} us   after: {after * 1e6:7.1f} us   {before / after:5.1f}x")
+
+
+def bench_signing() -> None:
+    page_params = dict(PARAMS, start_row_key=ROW_KEY)
+    signer = TuyaRequestSigner(ACCESS_ID, ACCESS_SECRET)
+    template = TuyaRequestTemplate("GET", PATH, PARAMS)
+    extra = {"start_row_key": ROW_KEY}
+    assert signer.sign(ACCESS_TOKEN, template.string_to_sign(extra), 1) == signer.sign(
+        ACCESS_TOKEN, TuyaRequestTemplate("GET", PATH, page_params).string_to_sign(), 1
+    )
+    report(
+        "signing",
+        per_call(lambda: legacy_calculate_sign("GET", PATH, page_params)),
+        per_call(lambda: signer.sign(ACCESS_TOKEN, template.string_to_sign(extra))),
+    )
+
+
+def bench_preparation() -> None:
+    api = TuyaOpenAPI(ENDPOINT, ACCESS_ID, ACCESS_SECRET, auto_connect=False)
+    session = api.session
+    prepared = api.prepare("GET", PATH, PARAMS)
+    page_params = dict(PARAMS, start_row_key=ROW_KEY)
+    extra = {"start_row_key": ROW_KEY}
+    page_headers = headers("0" * 64, 1634005305000)
+
+    def before() -> Any:
+        request = session.prepare_request(
+            requests.Request("GET", ENDPOINT + PATH, params=page_params, headers=page_headers)
+        )
+        return request, session.merge_environment_settings(request.url, {}, None, None, None)
+
+    report("request preparation", per_call(before, 5000), per_call(lambda: prepared.build(page_headers, extra), 5000))
+
+
+def bench_client() -> None:
+    page = json.dumps({
+        "result": {"device_id": "vdevo123456789012345", "has_next": True, "next_row_key": ROW_KEY, "logs": []},
+        "success": True,
+        "t": 1634005305123,
+    }).encode("utf8")
+
+    api = TuyaOpenAPI(ENDPOINT, ACCESS_ID, ACCESS_SECRET, auto_connect=False,
+                      transport=InMemoryTransport(lambda request: (200, page), record_requests=False))
+    api._need_refresh = lambda: False  # type: ignore
+    page_params = dict(PARAMS, start_row_key=ROW_KEY)
+    prepared = api.prepare("GET", PATH, PARAMS)
+    extra = {"start_row_key": ROW_KEY}
+    report(
+        "whole client per page",
+        per_call(lambda: api.get(PATH, page_params), 5000),
+        per_call(lambda: api.send_prepared(prepared, extra), 5000),
+    )
+
+
+if __name__ == '__main__':
+    bench_signing()
+    bench_preparation()
+    bench_client()
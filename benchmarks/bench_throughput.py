@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""Offline throughput benchmark of the Tuya and HOBO clients against the local mock server (mock_server.py).
+
+For each scenario, reports the number of requests, requests/s, records/s, p50/p99 request latency as seen by the
+client, and the peak memory allocated by the client (measured with tracemalloc in a separate run, since tracing
+slows the client down).
+
+Usage:
+    python benchmarks/bench_throughput.py
+    python benchmarks/bench_throughput.py --latency 0.05 --log-records 20000 --devices 20 --workers 8
+    python benchmarks/bench_throughput.py --scenario hobo
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+import requests
+
+from bestlab_platform.hobo import HoboAPI
+from bestlab_platform.transport import RequestsTransport
+from bestlab_platform.tuya import (SmartHomeDeviceAPI, TuyaDeviceManager,
+                                   TuyaOpenAPI)
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mock_server import MockConfig, MockServerProcess  # noqa: E402
+
+HOBO_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class LatencyRecorder:
+    """Records the duration of every request sent through the wrapped sessions."""
+
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self._lock = threading.Lock()
+
+    def wrap(self, session: requests.Session) -> None:
+        # session.request() calls session.send() too.
+        send = session.send
+
+        def timed_send(*args: Any, **kwargs: Any) -> requests.Response:
+            started = time.perf_counter()
+            try:
+                return send(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self.latencies.append(elapsed)
+
+        session.send = timed_send  # type: ignore
+
+    def reset(self) -> None:
+        with self._lock:
+            self.latencies = []
+
+    def percentile(self, percent: float) -> float:
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100))]
+
+
+# A scenario creates its clients (tokens are requested before the measurement), wraps their sessions with the
+# recorder, and returns the measured function, which returns the number of records it received.
+Scenario = Callable[[str, argparse.Namespace, LatencyRecorder], Callable[[], int]]
+
+
+def tuya_api(endpoint: str, args: argparse.Namespace, recorder: LatencyRecorder) -> TuyaOpenAPI:
+    api = TuyaOpenAPI(endpoint, "mock-id", "mock-secret", transport=args.transport)
+    recorder.wrap(api.session)
+    return api
+
+
+def hobo_api(endpoint: str, args: argparse.Namespace, recorder: LatencyRecorder) -> HoboAPI:
+    api = HoboAPI("mock-id", "mock-secret", 1, endpoint=endpoint, transport=args.transport)
+    recorder.wrap(api.session)
+    return api
+
+
+def time_range_ms(args: argparse.Namespace) -> tuple[int, int]:
+    end = int(time.time() * 1000)
+    return end - args.days * 24 * 3600 * 1000, end
+
+
+def hobo_time_range(args: argparse.Namespace) -> tuple[str, str]:
+    end = datetime(2021, 10, 1) + timedelta(days=args.days) - timedelta(seconds=1)
+    return datetime(2021, 10, 1).strftime(HOBO_DATETIME_FORMAT), end.strftime(HOBO_DATETIME_FORMAT)
+
+
+def tuya_get_device_log(endpoint: str, args: argparse.Namespace, recorder: LatencyRecorder) -> Callable[[], int]:
+    device_api = SmartHomeDeviceAPI(tuya_api(endpoint, args, recorder))
+    start, end = time_range_ms(args)
+    return lambda: len(device_api.get_device_log("device-0", start, end))
+
+
+def tuya_log_batch(endpoint: str, args: argparse.Namespace, recorder: LatencyRecorder) -> Callable[[], int]:
+    device_list = [f"device-{i}" for i in range(args.devices)]
+    manager = TuyaDeviceManager(tuya_api(endpoint, args, recorder), device_list=device_list)
+    start, end = time_range_ms(args)
+
+    def run() -> int:
+        logs = manager.get_device_log_in_batch(start, end, max_workers=args.workers)
+        return sum(len(device_log) for device_log in logs.values())
+    return run
+
+
+def tuya_status_batch(endpoint: str, args: argparse.Namespace, recorder: LatencyRecorder) -> Callable[[], int]:
+    device_list = [f"device-{i}" for i in range(args.devices)]
+    manager = TuyaDeviceManager(tuya_api(endpoint, args, recorder), device_list=device_list)
+
+    def run() -> int:
+        return sum(len(manager.get_device_status_in_batch()["result"]) for _ in range(args.repeat))
+    return run
+
+
+def hobo_get_data(endpoint: str, args: argparse.Namespace, recorder: LatencyRecorder) -> Callable[[], int]:
+    api = hobo_api(endpoint, args, recorder)
+    loggers = [str(1000000 + i) for i in range(args.loggers)]
+    start, end = hobo_time_range(args)
+    return lambda: len(api.get_data(loggers, start, end)["observation_list"])
+
+
+def hobo_get_data_chunked(endpoint: str, args: argparse.Namespace, recorder: LatencyRecorder) -> Callable[[], int]:
+    api = hobo_api(endpoint, args, recorder)
+    loggers = [str(1000000 + i) for i in range(args.loggers)]
+    start, end = hobo_time_range(args)
+    return lambda: len(api.get_data(
+        loggers, start, end, chunk_period=timedelta(days=1), max_workers=args.workers
+    )["observation_list"])
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "tuya_get_device_log": tuya_get_device_log,
+    "tuya_log_batch": tuya_log_batch,
+    "tuya_status_batch": tuya_status_batch,
+    "hobo_get_data": hobo_get_data,
+    "hobo_get_data_chunked": hobo_get_data_chunked,
+}
+
+
+def run_scenario(name: str, scenario: Scenario, endpoint: str, args: argparse.Namespace) -> None:
+    recorder = LatencyRecorder()
+    run = scenario(endpoint, args, recorder)
+
+    recorder.reset()
+    started = time.perf_counter()
+    records = run()
+    elapsed = time.perf_counter() - started
+    num_requests = len(recorder.latencies)
+
+    peak = ""
+    if not args.skip_memory:
+        tracemalloc.start()
+        run()
+        peak = f"{tracemalloc.get_traced_memory()[1] / 2 ** 20:8.1f}"
+        tracemalloc.stop()
+
+    print(
+        f"{name:<22} {num_requests:>8} {num_requests / elapsed:>9.1f} {records / elapsed:>12.0f} "
+        f"{recorder.percentile(50) * 1000:>8.1f} {recorder.percentile(99) * 1000:>8.1f} {peak:>8}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark of the Tuya and HOBO clients.")
+    parser.add_argument("--latency", type=float, default=0.02, help="server latency per request in seconds")
+    parser.add_argument("--log-records", type=int, default=5000, help="device log records per device")
+    parser.add_argument("--padding", type=int, default=0, help="extra bytes per record")
+    parser.add_argument("--devices", type=int, default=10, help="devices in batch scenarios")
+    parser.add_argument("--workers", type=int, default=4, help="max_workers of batch and chunked calls")
+    parser.add_argument("--pool-size", type=int, default=10, help="connection pool size of the shared transport")
+    parser.add_argument("--repeat", type=int, default=20, help="calls of get_device_status_in_batch")
+    parser.add_argument("--loggers", type=int, default=5, help="HOBO loggers")
+    parser.add_argument("--sensors-per-logger", type=int, default=4)
+    parser.add_argument("--days", type=int, default=3, help="queried time range")
+    parser.add_argument("--scenario", default="", help="only run scenarios whose name contains this string")
+    parser.add_argument("--skip-memory", action="store_true", help="do not measure peak memory")
+    args = parser.parse_args()
+    args.transport = RequestsTransport(pool_maxsize=args.pool_size)
+
+    config = MockConfig(args.latency, args.log_records, args.padding, args.sensors_per_logger)
+    with MockServerProcess(config) as server:
+        print(f"{'scenario':<22} {'requests':>8} {'req/s':>9} {'records/s':>12} {'p50 ms':>8} {'p99 ms':>8} "
+              f"{'peak MB':>8}")
+        for name, scenario in SCENARIOS.items():
+            if args.scenario in name:
+                run_scenario(name, scenario, server.endpoint, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""Local stand-in for the Tuya and HOBO clouds, used by the offline benchmarks.
+
+Emulated endpoints:
+    GET  /v1.0/token, /v1.0/token/{refresh_token}   Tuya token
+    GET  /v1.0/devices/{device_id}/logs             Tuya device log, paginated with has_next / next_row_key
+    GET  /v1.0/devices/?device_ids=...              Tuya batch device info and status
+    POST /v1.0/devices/{device_id}/commands         Tuya commands
+    POST /ws/auth/token                             HOBO token
+    GET  /ws/data/file/JSON/user/{user_id}          HOBO data, one observation per sensor per minute
+
+Signatures and credentials are not checked. Every response is delayed by the configured latency.
+
+Usage:
+    python benchmarks/mock_server.py --port 8765 --latency 0.02
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import socket
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import TracebackType
+from typing import Any, Optional, Type
+from urllib.parse import parse_qs, urlparse
+
+HOBO_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class MockConfig:
+    """Behavior of the mock server.
+
+    Attributes:
+        latency: Seconds to wait before answering each request.
+        log_records: Maximum number of device log records returned for each query of a device log, newest first, one
+            on every whole second from end_time back to start_time.
+        padding: Extra bytes added to every device log record and HOBO observation, to emulate larger payloads.
+        sensors_per_logger: Number of sensors of each HOBO logger.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.02,
+        log_records: int = 10000,
+        padding: int = 0,
+        sensors_per_logger: int = 4
+    ):
+        self.latency = latency
+        self.log_records = log_records
+        self.padding = padding
+        self.sensors_per_logger = sensors_per_logger
+
+
+def _device(device_id: str) -> dict[str, Any]:
+    return {
+        "id": device_id,
+        "name": device_id,
+        "online": True,
+        "status": [{"code": "pir", "value": "none"}, {"code": "battery_percentage", "value": 100}],
+    }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Request handler. The configuration is set on the server."""
+
+    server: MockHTTPServer
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately: without TCP_NODELAY, delayed ACKs add ~40 ms to every response.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, obj: Any, status: int = 200) -> None:
+        body = json.dumps(obj).encode("utf8")
+        time.sleep(self.server.config.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _tuya(self, result: Any) -> None:
+        self._send_json({"success": True, "t": int(time.time() * 1000), "result": result})
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+
+        if url.path.startswith("/v1.0/token"):
+            self._tuya({"access_token": "mock-access-token", "refresh_token": "mock-refresh-token",
+                        "expire_time": 7200, "uid": "mock-uid"})
+        elif len(parts) == 4 and parts[:2] == ["v1.0", "devices"] and parts[3] == "logs":
+            self._device_log(parts[2], query)
+        elif url.path.rstrip("/") == "/v1.0/devices":
+            devices = [_device(device_id) for device_id in query.get("device_ids", "").split(",") if device_id]
+            self._tuya({"devices": devices, "has_more": False, "total": len(devices)})
+        elif len(parts) == 3 and parts[:2] == ["v1.0", "devices"]:
+            self._tuya(_device(parts[2]))
+        elif url.path.startswith("/ws/data/file/JSON/user/"):
+            self._hobo_data(query)
+        else:
+            self._send_json({"success": False, "code": 1108, "msg": "uri path invalid", "t": 0})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if self.path == "/ws/auth/token":
+            self._send_json({"access_token": "mock-hobo-token", "token_type": "bearer", "expires_in": 600})
+        else:
+            self._tuya(True)
+
+    def _device_log(self, device_id: str, query: dict[str, str]) -> None:
+        config = self.server.config
+        offset = int(query.get("start_row_key", 0))
+        size = int(query.get("size", 100))
+        end_time = int(query.get("end_time", time.time() * 1000))
+        start_time = int(query.get("start_time", 0))
+        # One record on every whole second within [start_time, end_time], like a real device: the records do not
+        # depend on how the time range is split into queries.
+        newest = end_time - end_time % 1000
+        total = max(0, min(config.log_records, (newest - start_time) // 1000 + 1))
+        last = min(offset + size, total)
+        padding = "x" * config.padding
+        logs = []
+        for i in range(offset, last):
+            event_time = newest - i * 1000
+            second = event_time // 1000
+            record = {
+                "code": "pir" if second % 2 else "battery_percentage",
+                "value": "pir" if second % 2 else str(100 - second % 100),
+                "event_time": event_time,
+                "event_from": "1",
+                "event_id": 7,
+                "status": "1",
+            }
+            if padding:
+                record["padding"] = padding
+            logs.append(record)
+        self._tuya({"device_id": device_id, "logs": logs, "has_next": last < total,
+                    "next_row_key": str(last), "current_row_key": str(offset)})
+
+    def _hobo_data(self, query: dict[str, str]) -> None:
+        config = self.server.config
+        start = datetime.strptime(query["start_date_time"], HOBO_DATETIME_FORMAT)
+        end = datetime.strptime(query["end_date_time"], HOBO_DATETIME_FORMAT)
+        loggers = [logger_sn for logger_sn in query.get("loggers", "").split(",") if logger_sn]
+        padding = "x" * config.padding
+        observations = []
+        timestamp = start.replace(second=0) + (timedelta(minutes=1) if start.second else timedelta())
+        while timestamp <= end:
+            time_str = timestamp.strftime("%Y-%m-%dT%H:%M:%SZ")
+            for logger_sn in loggers:
+                for sensor in range(1, config.sensors_per_logger + 1):
+                    observation = {
+                        "logger_sn": logger_sn,
+                        "sensor_sn": f"{logger_sn}-{sensor}",
+                        "timestamp": time_str,
+                        "data_type": "TIME_SERIES",
+                        "si_value": 20.0 + timestamp.minute / 10,
+                        "si_unit": "°C",
+                        "us_value": 68.0 + timestamp.minute / 10,
+                        "us_unit": "°F",
+                        "scaled_value": 0.0,
+                        "scaled_unit": None,
+                        "sensor_key": f"{logger_sn}-{sensor}-1",
+                        "sensor_measurement_type": "Temperature",
+                    }
+                    if padding:
+                        observation["padding"] = padding
+                    observations.append(observation)
+            timestamp += timedelta(minutes=1)
+        self._send_json({"message": f"OK: Found: {len(observations)} results.", "observation_list": observations})
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open many connections at once.
+    request_queue_size = 128
+
+    def __init__(self, address: tuple[str, int], config: MockConfig):
+        super().__init__(address, MockHandler)
+        self.config = config
+
+
+def serve(port: int, config: MockConfig) -> None:
+    """Run the server until the process is terminated."""
+    MockHTTPServer(("127.0.0.1", port), config).serve_forever()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port: int = s.getsockname()[1]
+        return port
+
+
+class MockServerProcess:
+    """Runs the mock server in a child process, so that it does not compete with the benchmarked client for the GIL.
+
+    Example:
+        with MockServerProcess(MockConfig(latency=0.01)) as server:
+            tuya_api = TuyaOpenAPI(server.endpoint, "id", "secret")
+    """
+
+    def __init__(self, config: MockConfig, port: Optional[int] = None):
+        self.config = config
+        self.port = port if port is not None else _free_port()
+        self.endpoint = f"http://127.0.0.1:{self.port}"
+        self._process: Optional[multiprocessing.Process] = None
+
+    def __enter__(self) -> MockServerProcess:
+        self._process = multiprocessing.Process(target=serve, args=(self.port, self.config), daemon=True)
+        self._process.start()
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=1).close()
+                return self
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType]
+    ) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per request")
+    parser.add_argument("--log-records", type=int, default=10000, help="device log records per query")
+    parser.add_argument("--padding", type=int, default=0, help="extra bytes per record")
+    parser.add_argument("--sensors-per-logger", type=int, default=4)
+    args = parser.parse_args()
+    print(f"Serving on http://127.0.0.1:{args.port}")
+    serve(args.port, MockConfig(args.latency, args.log_records, args.padding, args.sensors_per_logger))
@@ -18,3 +18,30 @@ class ResponseError(Exception):
         self.status_code = status_code
         self.response_text = response_text
         super().__init__(self.message)
+
+
+class BatchRequestError(Exception):
+    """Exception raised when some of the requests in a batch failed. Requests for other items are not aborted.
+
+    Attributes:
+        message: explanation of the error
+        results: map of item name -> result, for the items which succeeded
+        errors: map of item name -> exception, for the items which failed
+    """
+    def __init__(self, results: dict[str, Any], errors: dict[str, BaseException], *args: Any):
+        self.message = f"{len(errors)} of {len(results) + len(errors)} requests failed: {', '.join(errors)}"
+        self.results = results
+        self.errors = errors
+        super().__init__(self.message)
+
+
+class OutcomeUnknownError(TimeoutError):
+    """Exception raised when a request was sent but not answered before a deadline. Unlike a request cancelled before
+    it was sent, it may still have been applied by the server, e.g. a device command.
+
+    Attributes:
+        message: explanation of the error
+    """
+    def __init__(self, message: str, *args: Any):
+        self.message = message
+        super().__init__(self.message)
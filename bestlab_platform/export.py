@@ -0,0 +1,573 @@
+"""Bulk export of historical data from both platforms: the ``bestlab-export`` command.
+
+Reads a JSON configuration of the credentials, Tuya devices and HOBO loggers to export, for example::
+
+    {
+        "tuya": {
+            "endpoint": "https://openapi.tuyaus.com",
+            "client_id": "...",
+            "client_secret": "...",
+            "devices": {"PIR3": "asdasdadx", "PIR4": "12345abcde"}
+        },
+        "hobo": {
+            "client_id": "...",
+            "client_secret": "...",
+            "user_id": "...",
+            "loggers": ["1234567", "8912345"],
+            "chunk_hours": 24
+        }
+    }
+
+Missing credentials are read from the environment variables TUYA_CLIENT_ID, TUYA_CLIENT_SECRET, HOBO_CLIENT_ID,
+HOBO_CLIENT_SECRET and HOBO_USER_ID. Then exports every device and logger with a thread pool, one file each
+(``<output>/tuya/<device name>.<format>``, ``<output>/hobo/<logger serial number>.<format>``). Records are written
+as pages and time windows are fetched, so memory use does not grow with the size of the export. Files are written
+under a ".part" name and renamed once complete.
+
+Times without a UTC offset are in local time, or in the time zone of ``--tz`` (``--tz UTC`` or ``--utc``,
+``--tz +02:00``, ``--tz Europe/Paris``). They are converted to UTC for HOBO, whose API expects UTC times.
+
+Usage:
+    bestlab-export config.json --start "2021-10-15 00:00:00" --end "2021-10-22 00:00:00" --utc \\
+        --output export --format csv --workers 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import functools
+import gzip
+import importlib
+import io
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import (IO, Any, Callable, Iterable, List, Optional, Sequence,
+                    Tuple, cast)
+
+from .hobo import HoboAPI, HoboLogger
+from .hobo.webapi import HOBO_DATETIME_FORMAT, HOBO_ENDPOINT, check_chunking
+from .jsoncodec import JSONCodec, get_json_codec
+from .transport import RequestsTransport
+from .tuya import (TUYA_LOGGER, SmartHomeDeviceAPI, TuyaDeviceManager,
+                   TuyaOpenAPI)
+
+logger = logging.getLogger("bestlab-export")
+
+# (column name, type): "string", "int64" or "float64"
+Fields = List[Tuple[str, str]]
+
+TUYA_FIELDS: Fields = [
+    ("device_name", "string"),
+    ("device_id", "string"),
+    ("code", "string"),
+    ("value", "string"),
+    ("event_time", "int64"),
+    ("event_from", "string"),
+    ("event_id", "int64"),
+    ("status", "string"),
+]
+"""Columns of the Tuya device log exports: the device log record fields, plus the device name and ID."""
+
+HOBO_FIELDS: Fields = [
+    ("logger_sn", "string"),
+    ("sensor_sn", "string"),
+    ("timestamp", "string"),
+    ("data_type", "string"),
+    ("si_value", "float64"),
+    ("si_unit", "string"),
+    ("us_value", "float64"),
+    ("us_unit", "string"),
+    ("scaled_value", "float64"),
+    ("scaled_unit", "string"),
+    ("sensor_key", "string"),
+    ("sensor_measurement_type", "string"),
+]
+"""Columns of the HOBO exports: the fields of the observations."""
+
+FORMATS = ("ndjson", "csv", "parquet")
+# Default compression of each format
+DEFAULT_COMPRESSION = {"ndjson": "gzip", "csv": "gzip", "parquet": "snappy"}
+
+_CONVERTERS: dict[str, Callable[[Any], Any]] = {"string": str, "int64": int, "float64": float}
+
+
+def _convert(value: Any, type_: str) -> Any:
+    if value is None:
+        return None
+    if type_ == "string":
+        return json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+    # Missing numbers may be empty strings
+    return _CONVERTERS[type_](value) if value != "" else None
+
+
+class RecordWriter:
+    """Writes records (dicts) to a file incrementally. The columns and their types are fixed when it is created.
+
+    Use it as a context manager. The file is written as "<path>.part" and renamed to path when the writer is closed
+    without an exception.
+    """
+
+    def __init__(self, path: str, fields: Fields):
+        self.path = path
+        self.fields = fields
+        self.temp_path = path + ".part"
+        self.count = 0
+
+    def write(self, records: Iterable[dict[str, Any]]) -> int:
+        """Write records.
+
+        Args:
+            records (Iterable[dict[str, Any]]): Records. Keys which are not columns are ignored, missing keys are
+                written as null (an empty string in CSV).
+
+        Returns:
+            Number of records written.
+        """
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Finish the file and rename it to its final path."""
+        self._close()
+        os.replace(self.temp_path, self.path)
+
+    def abort(self) -> None:
+        """Close and delete the partial file."""
+        try:
+            self._close()
+        finally:
+            if os.path.exists(self.temp_path):
+                os.unlink(self.temp_path)
+
+    def __enter__(self) -> RecordWriter:
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _open_binary(path: str, compression: str) -> IO[bytes]:
+    if compression == "gzip":
+        # Level 6 compresses almost as well as 9, several times faster.
+        return cast(IO[bytes], gzip.open(path, "wb", compresslevel=6))
+    return open(path, "wb")
+
+
+class NDJSONWriter(RecordWriter):
+    """Newline delimited JSON, one record per line, optionally gzip compressed."""
+
+    def __init__(self, path: str, fields: Fields, compression: str = "gzip", json_codec: Optional[JSONCodec] = None):
+        super().__init__(path, fields)
+        self.json_codec = json_codec if json_codec is not None else get_json_codec()
+        self._file = _open_binary(self.temp_path, compression)
+
+    def write(self, records: Iterable[dict[str, Any]]) -> int:
+        dumps = self.json_codec.dumps
+        lines = [
+            dumps({name: _convert(record.get(name), type_) for name, type_ in self.fields}) for record in records
+        ]
+        if lines:
+            self._file.write(b"\n".join(lines) + b"\n")
+        self.count += len(lines)
+        return len(lines)
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class CSVWriter(RecordWriter):
+    """CSV with a header line, optionally gzip compressed. Null values are written as empty strings."""
+
+    def __init__(self, path: str, fields: Fields, compression: str = "gzip"):
+        super().__init__(path, fields)
+        self._binary = _open_binary(self.temp_path, compression)
+        self._file = io.TextIOWrapper(self._binary, encoding="utf8", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, _ in fields])
+
+    def write(self, records: Iterable[dict[str, Any]]) -> int:
+        rows = [[_convert(record.get(name), type_) for name, type_ in self.fields] for record in records]
+        self._writer.writerows(rows)
+        self.count += len(rows)
+        return len(rows)
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class ParquetWriter(RecordWriter):
+    """Parquet, written in row groups of row_group_size records. Requires the optional ``pyarrow`` package."""
+
+    def __init__(self, path: str, fields: Fields, compression: str = "snappy", row_group_size: int = 65536):
+        super().__init__(path, fields)
+        self._pa = importlib.import_module("pyarrow")
+        parquet = importlib.import_module("pyarrow.parquet")
+        self.schema = self._pa.schema([(name, getattr(self._pa, type_)()) for name, type_ in fields])
+        self.row_group_size = row_group_size
+        self._columns: list[list[Any]] = [[] for _ in fields]
+        self._writer = parquet.ParquetWriter(self.temp_path, self.schema, compression=compression)
+
+    def write(self, records: Iterable[dict[str, Any]]) -> int:
+        count = 0
+        for record in records:
+            for column, (name, type_) in zip(self._columns, self.fields):
+                column.append(_convert(record.get(name), type_))
+            count += 1
+            if len(self._columns[0]) >= self.row_group_size:
+                self._flush()
+        self.count += count
+        return count
+
+    def _flush(self) -> None:
+        if self._columns[0]:
+            self._writer.write_table(self._pa.Table.from_arrays(self._columns, schema=self.schema))
+            self._columns = [[] for _ in self.fields]
+
+    def _close(self) -> None:
+        try:
+            self._flush()
+        finally:
+            self._writer.close()
+
+
+def check_writer_options(format_: str, compression: Optional[str] = None) -> str:
+    """Check the options of open_writer().
+
+    Returns:
+        The compression, with the default of the format if None.
+
+    Raises:
+        ValueError: Unknown format or compression.
+        ImportError: parquet without pyarrow.
+    """
+    if format_ not in FORMATS:
+        raise ValueError(f"Unknown format {format_}, expected one of {', '.join(FORMATS)}")
+    if compression is None:
+        compression = DEFAULT_COMPRESSION[format_]
+    if format_ == "parquet":
+        if compression not in ("snappy", "gzip", "zstd", "none"):
+            raise ValueError(f"Unknown parquet compression {compression}")
+        importlib.import_module("pyarrow.parquet")
+    elif compression not in ("gzip", "none"):
+        raise ValueError(f"Unknown {format_} compression {compression}, expected gzip or none")
+    return compression
+
+
+def open_writer(path: str, fields: Fields, format_: str, compression: Optional[str] = None) -> RecordWriter:
+    """Create a writer.
+
+    Args:
+        path (str): Path of the file, without the extension.
+        fields (Fields): Columns, e.g. TUYA_FIELDS.
+        format_ (str): "ndjson", "csv" or "parquet".
+        compression (Optional[str]): "gzip" or "none" for ndjson and csv; "snappy", "gzip", "zstd" or "none" for
+            parquet. Default: DEFAULT_COMPRESSION of the format.
+
+    Returns:
+        The writer. Its path attribute is path with the extension of the format and compression.
+
+    Raises:
+        ValueError: Unknown format or compression.
+        ImportError: parquet without pyarrow.
+    """
+    compression = check_writer_options(format_, compression)
+    if format_ == "parquet":
+        return ParquetWriter(path + ".parquet", fields, compression)
+    suffix = ".gz" if compression == "gzip" else ""
+    if format_ == "csv":
+        return CSVWriter(f"{path}.csv{suffix}", fields, compression)
+    return NDJSONWriter(f"{path}.ndjson{suffix}", fields, compression)
+
+
+def _file_name(name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+def _env(section: dict[str, Any], key: str, variable: str) -> str:
+    value = section.get(key) or os.environ.get(variable)
+    if not value:
+        raise ValueError(f"Missing {key} in the configuration and {variable} in the environment")
+    return str(value)
+
+
+def _parse_datetime(text: str) -> datetime:
+    """Parse a date or a time, naive or with a UTC offset ("+02:00" or "Z")."""
+    for format_ in (
+        HOBO_DATETIME_FORMAT, "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S%z", "%Y-%m-%dT%H:%M:%S%z"
+    ):
+        try:
+            return datetime.strptime(text, format_)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(
+        f"Invalid date {text}, expected YYYY-MM-DD or YYYY-MM-DD HH:MM:SS, optionally followed by +HH:MM or Z"
+    )
+
+
+def _parse_timezone(text: str) -> tzinfo:
+    """Parse "UTC", a fixed offset "+HH:MM", or an IANA time zone name (requires Python 3.9+)."""
+    if text.upper() in ("UTC", "Z"):
+        return timezone.utc
+    match = re.fullmatch(r"([+-])(\d{2}):?(\d{2})", text)
+    if match:
+        offset = timedelta(hours=int(match.group(2)), minutes=int(match.group(3)))
+        return timezone(-offset if match.group(1) == "-" else offset)
+    try:
+        zoneinfo = importlib.import_module("zoneinfo")
+        return cast(tzinfo, zoneinfo.ZoneInfo(text))
+    except (ImportError, KeyError, ValueError):
+        # ZoneInfoNotFoundError is a KeyError
+        raise argparse.ArgumentTypeError(
+            f"Invalid time zone {text}, expected UTC, +HH:MM or a name such as Europe/Paris (Python 3.9+)"
+        )
+
+
+def _localize(value: datetime, tz: Optional[tzinfo]) -> datetime:
+    """Attach tz, or the local time zone if None, to a naive datetime. Aware datetimes are returned as is."""
+    if value.tzinfo is not None:
+        return value
+    return value.astimezone() if tz is None else value.replace(tzinfo=tz)
+
+
+def _to_utc(value: datetime) -> datetime:
+    """Naive UTC datetime of value. A naive value is in local time."""
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def export_tuya_device(
+        device_api: SmartHomeDeviceAPI,
+        device_name: str,
+        device_id: str,
+        start: datetime,
+        end: datetime,
+        writer: RecordWriter,
+        type_: int = 7
+) -> int:
+    """Write the device log of a device, page by page.
+
+    Args:
+        device_api (SmartHomeDeviceAPI): Device API.
+        device_name (str): Device name.
+        device_id (str): Device ID.
+        start (datetime): Start time, inclusive. A naive datetime is in local time.
+        end (datetime): End time, inclusive. A naive datetime is in local time.
+        writer (RecordWriter): Writer with TUYA_FIELDS.
+        type_ (int): See SmartHomeDeviceAPI.get_device_log(). Default: 7.
+
+    Returns:
+        Number of records written.
+    """
+    page: list[dict[str, Any]] = []
+    for record in device_api.iter_device_log(
+        device_id, int(start.timestamp() * 1000), int(end.timestamp() * 1000), device_name=device_name, type_=type_
+    ):
+        record["device_name"] = device_name
+        record["device_id"] = device_id
+        page.append(record)
+        if len(page) >= 1000:
+            writer.write(page)
+            page = []
+    writer.write(page)
+    return writer.count
+
+
+def export_hobo_logger(
+        hobo_api: HoboAPI,
+        logger_sn: str,
+        start: datetime,
+        end: datetime,
+        writer: RecordWriter,
+        chunk_period: timedelta = timedelta(days=1)
+) -> int:
+    """Write the observations of a logger, one time window of chunk_period after another.
+
+    Args:
+        hobo_api (HoboAPI): API client.
+        logger_sn (str): Logger serial number.
+        start (datetime): Start time, inclusive. A naive datetime is in local time, like for export_tuya_device(); it
+            is converted to UTC for the API.
+        end (datetime): End time, inclusive. A naive datetime is in local time.
+        writer (RecordWriter): Writer with HOBO_FIELDS.
+        chunk_period (timedelta): Length of the time windows requested, at least one second. Default: one day.
+
+    Returns:
+        Number of observations written.
+
+    Raises:
+        ValueError: chunk_period is shorter than one second.
+    """
+    check_chunking(chunk_period)
+    # The API expects UTC times.
+    window_start = _to_utc(start)
+    end = _to_utc(end)
+    while window_start <= end:
+        # Both ends are inclusive, so the next window starts one second later.
+        window_end = min(window_start + chunk_period - timedelta(seconds=1), end)
+        response = hobo_api.get_data(
+            [logger_sn], window_start.strftime(HOBO_DATETIME_FORMAT), window_end.strftime(HOBO_DATETIME_FORMAT)
+        )
+        writer.write(response.get("observation_list") or [])
+        window_start = window_end + timedelta(seconds=1)
+    return writer.count
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="bestlab-export",
+        description="Export historical data of Tuya devices and HOBO loggers to NDJSON, CSV or Parquet files."
+    )
+    parser.add_argument("config", help="JSON configuration of the credentials, devices and loggers")
+    parser.add_argument("--start", type=_parse_datetime, required=True,
+                        help="start time, YYYY-MM-DD or YYYY-MM-DD HH:MM:SS, optionally followed by a UTC offset "
+                             "(+HH:MM or Z), inclusive. Without an offset, in the time zone of --tz")
+    parser.add_argument("--end", type=_parse_datetime, required=True,
+                        help="end time, same format as --start, inclusive")
+    tz_group = parser.add_mutually_exclusive_group()
+    tz_group.add_argument("--tz", type=_parse_timezone,
+                          help="time zone of --start and --end without an offset: UTC, +HH:MM, or a name such as "
+                               "Europe/Paris (Python 3.9+) (default: local time)")
+    tz_group.add_argument("--utc", dest="tz", action="store_const", const=timezone.utc,
+                          help="same as --tz UTC")
+    parser.add_argument("--output", default="export", help="output directory (default: export)")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson", help="file format (default: ndjson)")
+    parser.add_argument("--compression", choices=("gzip", "zstd", "snappy", "none"),
+                        help="gzip or none for ndjson and csv (default: gzip); snappy, gzip, zstd or none for "
+                             "parquet (default: snappy)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="number of devices and loggers exported in parallel (default: 4)")
+    parser.add_argument("--platform", choices=("tuya", "hobo"), action="append",
+                        help="only export this platform, can be repeated (default: all platforms in the config)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every page fetched")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Entry point of ``bestlab-export``.
+
+    Args:
+        argv (Optional[Sequence[str]]): Command line arguments. Default: sys.argv[1:].
+
+    Returns:
+        Exit status: 0 if everything was exported, 1 if some devices or loggers failed, 2 for invalid arguments.
+    """
+    args = _parse_args(argv)
+    # Aware datetimes, converted to UTC for HOBO by export_hobo_logger()
+    start = _localize(args.start, args.tz)
+    end = _localize(args.end, args.tz)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("[%(asctime)s] [export] [%(levelname)s] %(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    if args.verbose:
+        TUYA_LOGGER.setLevel(logging.INFO)
+        HoboLogger.setLevel(logging.INFO)
+
+    try:
+        with open(args.config, "r", encoding="utf8") as f:
+            config = json.load(f)
+        platforms = args.platform or [platform for platform in ("tuya", "hobo") if platform in config]
+        # Check the writer options before any request.
+        check_writer_options(args.format, args.compression)
+    except (OSError, ValueError, ImportError) as e:
+        print(f"bestlab-export: {e}", file=sys.stderr)
+        return 2
+
+    # One connection per worker, shared by the clients of both platforms.
+    transport = RequestsTransport(pool_maxsize=max(args.workers, 1))
+    tasks: list[tuple[str, Callable[[RecordWriter], int], str, Fields]] = []
+    try:
+        if "tuya" in platforms:
+            section = config["tuya"]
+            tuya_api = TuyaOpenAPI(
+                section.get("endpoint", "https://openapi.tuyaus.com"),
+                _env(section, "client_id", "TUYA_CLIENT_ID"),
+                _env(section, "client_secret", "TUYA_CLIENT_SECRET"),
+                transport=transport
+            )
+            devices = section["devices"]
+            manager = TuyaDeviceManager(
+                tuya_api,
+                device_map=devices if isinstance(devices, dict) else None,
+                device_list=devices if isinstance(devices, list) else None
+            )
+            device_api = SmartHomeDeviceAPI(manager.api, manager.cache)
+            type_ = int(section.get("type", 7))
+            for device_name, device_id in manager.device_map.items():
+                tasks.append((
+                    f"Tuya device {device_name}",
+                    functools.partial(
+                        export_tuya_device, device_api, device_name, device_id, start, end, type_=type_
+                    ),
+                    os.path.join(args.output, "tuya", _file_name(device_name)),
+                    TUYA_FIELDS
+                ))
+        if "hobo" in platforms:
+            section = config["hobo"]
+            chunk_period = timedelta(hours=float(section.get("chunk_hours", 24)))
+            try:
+                check_chunking(chunk_period)
+            except ValueError:
+                raise ValueError(f"chunk_hours must be at least 1/3600 (one second), got {section.get('chunk_hours')}")
+            hobo_api = HoboAPI(
+                _env(section, "client_id", "HOBO_CLIENT_ID"),
+                _env(section, "client_secret", "HOBO_CLIENT_SECRET"),
+                _env(section, "user_id", "HOBO_USER_ID"),
+                endpoint=section.get("endpoint", HOBO_ENDPOINT),
+                transport=transport
+            )
+            for logger_sn in section["loggers"]:
+                tasks.append((
+                    f"HOBO logger {logger_sn}",
+                    functools.partial(
+                        export_hobo_logger, hobo_api, str(logger_sn), start, end, chunk_period=chunk_period
+                    ),
+                    os.path.join(args.output, "hobo", _file_name(str(logger_sn))),
+                    HOBO_FIELDS
+                ))
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"bestlab-export: invalid configuration: {e!r}", file=sys.stderr)
+        return 2
+    except Exception as e:
+        # e.g. the credentials are rejected when the clients get their token
+        print(f"bestlab-export: failed to connect: {e!r}", file=sys.stderr)
+        return 1
+
+    def run(task: tuple[str, Callable[[RecordWriter], int], str, Fields]) -> int:
+        name, export, path, fields = task
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        started = time.perf_counter()
+        with open_writer(path, fields, args.format, args.compression) as writer:
+            count = export(writer)
+        logger.info(f"Exported {name}: {count} records to {writer.path} in {time.perf_counter() - started:.1f}s")
+        return count
+
+    failed = 0
+    total = 0
+    with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as executor:
+        futures = [(task[0], executor.submit(run, task)) for task in tasks]
+        for name, future in futures:
+            try:
+                total += future.result()
+            except Exception as e:
+                logger.error(f"Failed to export {name}: {e!r}")
+                failed += 1
+    transport.close()
+    logger.info(f"Exported {total} records of {len(tasks) - failed} of {len(tasks)} devices and loggers")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,14 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
+from .sync import (HoboDataSync, HoboObservationStore,
+                   SQLiteHoboObservationStore)
 from .webapi import HoboAPI, HoboLogger, HoboTokenInfo
 
 __all__ = [
     "HoboAPI",
     "HoboTokenInfo",
-    "HoboLogger"
+    "HoboLogger",
+    "HoboDataSync",
+    "HoboObservationStore",
+    "SQLiteHoboObservationStore"
 ]
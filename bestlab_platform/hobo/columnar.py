@@ -0,0 +1,143 @@
+"""Columnar (NumPy/pandas) conversion of HOBO observations. Requires the optional ``numpy`` and ``pandas`` packages."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterable
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Numeric fields of an observation, converted to float64 (NaN if missing).
+HOBO_VALUE_FIELDS = ("si_value", "us_value", "scaled_value")
+# Fields which are not dictionary encoded.
+_PLAIN_FIELDS = frozenset(("sensor_sn", "timestamp") + HOBO_VALUE_FIELDS)
+CATEGORIES_SUFFIX = "_categories"
+
+
+def _observation_list(response: dict[str, Any] | Iterable[dict[str, Any]]) -> Iterable[dict[str, Any]]:
+    if isinstance(response, dict):
+        return response.get("observation_list") or []
+    return response
+
+
+def observations_to_arrays(
+        response: dict[str, Any] | Iterable[dict[str, Any]]
+) -> dict[str, dict[str, np.ndarray[Any, Any]]]:
+    """Convert HOBO observations to NumPy arrays per sensor, in a single pass over the observations.
+
+    Args:
+        response (dict[str, Any] | Iterable[dict[str, Any]]):
+            HoboAPI.get_data() response, or its "observation_list".
+
+    Returns:
+        Map of sensor serial number -> columns, in the order of the observations:
+
+        - "timestamp": datetime64[s] array (UTC). Use .astype(numpy.int64) for unix timestamps in seconds.
+        - "si_value", "us_value", "scaled_value": float64 arrays, NaN where missing.
+        - Every other field (e.g. "logger_sn", "si_unit", "sensor_measurement_type") is dictionary encoded: "<field>"
+          is an int32 array of codes, and "<field>_categories" an object array of the distinct values, so that
+          "<field>_categories"[codes] gives the values back. Missing values are encoded as None.
+    """
+    import numpy as np
+
+    timestamps: dict[str, list[str]] = {}
+    values: dict[str, dict[str, list[Any]]] = {}
+    codes: dict[str, dict[str, list[int]]] = {}
+    categories: dict[str, dict[str, dict[Any, int]]] = {}
+    for observation in _observation_list(response):
+        sensor_sn = str(observation.get("sensor_sn", ""))
+        if sensor_sn not in timestamps:
+            timestamps[sensor_sn] = []
+            values[sensor_sn] = {field: [] for field in HOBO_VALUE_FIELDS}
+            codes[sensor_sn] = {}
+            categories[sensor_sn] = {}
+        sensor_codes = codes[sensor_sn]
+        sensor_categories = categories[sensor_sn]
+        count = len(timestamps[sensor_sn])
+
+        # "2021-10-15T04:00:00Z" -> "2021-10-15T04:00:00", parsed by NumPy below.
+        timestamps[sensor_sn].append(str(observation.get("timestamp", ""))[:19])
+        for field, field_values in values[sensor_sn].items():
+            field_values.append(observation.get(field))
+        for field, value in observation.items():
+            if field in _PLAIN_FIELDS:
+                continue
+            if field not in sensor_codes:
+                # Field first seen now: earlier observations did not have it.
+                sensor_categories[field] = {None: 0} if count else {}
+                sensor_codes[field] = [0] * count
+            field_categories = sensor_categories[field]
+            code = field_categories.get(value)
+            if code is None:
+                code = field_categories[value] = len(field_categories)
+            sensor_codes[field].append(code)
+        for field, field_codes in sensor_codes.items():
+            if len(field_codes) == count:
+                # Field missing in this observation
+                sensor_categories[field].setdefault(None, len(sensor_categories[field]))
+                field_codes.append(sensor_categories[field][None])
+
+    arrays: dict[str, dict[str, np.ndarray[Any, Any]]] = {}
+    for sensor_sn, sensor_timestamps in timestamps.items():
+        columns: dict[str, np.ndarray[Any, Any]] = {
+            "timestamp": np.asarray(sensor_timestamps).astype("datetime64[s]")
+        }
+        for field, field_values in values[sensor_sn].items():
+            columns[field] = np.asarray(field_values, dtype=np.float64)
+        for field, field_codes in codes[sensor_sn].items():
+            columns[field] = np.asarray(field_codes, dtype=np.int32)
+            category_values = np.empty(len(categories[sensor_sn][field]), dtype=object)
+            category_values[:] = list(categories[sensor_sn][field])
+            columns[field + CATEGORIES_SUFFIX] = category_values
+        arrays[sensor_sn] = columns
+    return arrays
+
+
+def observations_to_dataframe(response: dict[str, Any] | Iterable[dict[str, Any]]) -> pd.DataFrame:
+    """Convert HOBO observations to a DataFrame with one row per observation.
+
+    Args:
+        response (dict[str, Any] | Iterable[dict[str, Any]]):
+            HoboAPI.get_data() response, or its "observation_list".
+
+    Returns:
+        A DataFrame with columns "sensor_sn" and the other text fields as categoricals, "timestamp" as UTC datetime64,
+        and "si_value", "us_value" and "scaled_value" as float64. Rows are grouped by sensor, in the order of the
+        observations within a sensor.
+    """
+    import numpy as np
+    import pandas as pd
+
+    frames = []
+    categorical_fields = ["sensor_sn"]
+    for sensor_sn, columns in observations_to_arrays(response).items():
+        data: dict[str, Any] = {
+            "sensor_sn": [sensor_sn] * len(columns["timestamp"]),
+            "timestamp": pd.to_datetime(columns["timestamp"], utc=True),
+        }
+        for field, column in columns.items():
+            if field == "timestamp" or field.endswith(CATEGORIES_SUFFIX):
+                continue
+            if field in HOBO_VALUE_FIELDS:
+                data[field] = column
+                continue
+            # pandas encodes missing values as -1 instead of a None category.
+            field_categories = columns[field + CATEGORIES_SUFFIX]
+            present = np.asarray([category is not None for category in field_categories], dtype=bool)
+            remap = np.where(present, np.cumsum(present) - 1, -1)
+            data[field] = pd.Categorical.from_codes(remap[column], categories=field_categories[present])
+            if field not in categorical_fields:
+                categorical_fields.append(field)
+        frames.append(pd.DataFrame(data))
+
+    if not frames:
+        empty: dict[str, Any] = {"sensor_sn": pd.Categorical([]), "timestamp": pd.to_datetime([], utc=True)}
+        empty.update({field: pd.Series([], dtype="float64") for field in HOBO_VALUE_FIELDS})
+        return pd.DataFrame(empty)
+
+    dataframe = pd.concat(frames, ignore_index=True)
+    # Sensors have different categories, so concat() falls back to object columns: encode them again.
+    for field in categorical_fields:
+        dataframe[field] = dataframe[field].astype("category")
+    return dataframe
@@ -0,0 +1,378 @@
+"""Incremental local synchronization of HOBO observations."""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Iterable, List, Optional, Union
+
+from ..jsoncodec import JSONCodec, get_json_codec
+from .webapi import HOBO_DATETIME_FORMAT, HoboAPI, logger
+
+DEFAULT_UPLOAD_LAG = timedelta(days=1)
+"""Default of HoboDataSync.sync(upload_lag): loggers upload their observations in batches, up to a day late."""
+
+
+def _normalize_timestamp(timestamp: str) -> str:
+    """Convert an observation timestamp such as "2021-10-15T04:00:00Z" to yyyy-MM-dd HH:mm:ss format."""
+    return timestamp.replace("T", " ")[:19]
+
+
+def _merge_intervals(intervals: Iterable[tuple[str, str]]) -> list[tuple[str, str]]:
+    """Merge overlapping or adjacent (one second apart) ranges in yyyy-MM-dd HH:mm:ss format."""
+    merged: list[tuple[datetime, datetime]] = []
+    for start, end in sorted(
+        (datetime.strptime(start, HOBO_DATETIME_FORMAT), datetime.strptime(end, HOBO_DATETIME_FORMAT))
+        for start, end in intervals
+    ):
+        if merged and start <= merged[-1][1] + timedelta(seconds=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return [(start.strftime(HOBO_DATETIME_FORMAT), end.strftime(HOBO_DATETIME_FORMAT)) for start, end in merged]
+
+
+class HoboObservationStore:
+    """Storage of HOBO observations, with the synchronized range of each logger.
+    Subclass it to use another storage backend. See SQLiteHoboObservationStore for the default implementation.
+    """
+
+    def get_logger_state(self, logger_sn: str) -> tuple[Optional[str], Optional[str]]:
+        """Get the synchronization state of a logger.
+
+        Args:
+            logger_sn (str): Logger serial number.
+
+        Returns:
+            A tuple of (start of the first synchronized range, latest stored observation timestamp), both in
+            yyyy-MM-dd HH:mm:ss format. Each item is None if unknown.
+        """
+        raise NotImplementedError
+
+    def save(self, logger_sns: list[str], start_date_time: str, observations: Iterable[dict[str, Any]]) -> int:
+        """Store observations fetched for a group of loggers since start_date_time, and update the state of the
+        loggers. Observations already stored are ignored.
+
+        Args:
+            logger_sns (list[str]): Logger serial numbers the observations were requested for.
+            start_date_time (str): Start of the requested range, in yyyy-MM-dd HH:mm:ss format.
+            observations (Iterable[dict[str, Any]]): Items of "observation_list" in the get_data() response.
+
+        Returns:
+            Number of new observations.
+        """
+        raise NotImplementedError
+
+    def get_synced_intervals(self, logger_sn: str) -> list[tuple[str, str]]:
+        """Get the time ranges synchronized for a logger, with or without observations.
+
+        The default implementation assumes that everything from the start of the first synchronized range to the
+        latest stored observation is synchronized, as recorded by get_logger_state(). Override it with
+        add_synced_interval() to record the actual ranges.
+
+        Args:
+            logger_sn (str): Logger serial number.
+
+        Returns:
+            A list of (start, end), both inclusive, in yyyy-MM-dd HH:mm:ss format.
+        """
+        synced_from, watermark = self.get_logger_state(logger_sn)
+        return [(synced_from, watermark)] if synced_from is not None and watermark is not None else []
+
+    def add_synced_interval(self, logger_sns: list[str], start_date_time: str, end_date_time: str) -> None:
+        """Record that a time range was synchronized for a group of loggers, after its observations were saved.
+
+        Args:
+            logger_sns (list[str]): Logger serial numbers.
+            start_date_time (str): Start of the range, in yyyy-MM-dd HH:mm:ss format, inclusive.
+            end_date_time (str): End of the range, in yyyy-MM-dd HH:mm:ss format, inclusive.
+        """
+
+    def query(
+        self,
+        logger_sn: Optional[str] = None,
+        sensor_sn: Optional[str] = None,
+        start_date_time: Optional[str] = None,
+        end_date_time: Optional[str] = None
+    ) -> list[dict[str, Any]]:
+        """Read stored observations in timestamp order.
+
+        Args:
+            logger_sn (Optional[str]): Only return observations of this logger.
+            sensor_sn (Optional[str]): Only return observations of this sensor.
+            start_date_time (Optional[str]): yyyy-MM-dd HH:mm:ss, inclusive.
+            end_date_time (Optional[str]): yyyy-MM-dd HH:mm:ss, inclusive.
+
+        Returns:
+            A list of observations, in the same format as "observation_list" in the get_data() response.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release the resources held by the store."""
+
+
+class SQLiteHoboObservationStore(HoboObservationStore):
+    """Observation store in a local SQLite database file.
+
+    Example:
+        store = SQLiteHoboObservationStore("hobo_observations.sqlite3")
+    """
+
+    def __init__(self, path: str = "hobo_observations.sqlite3", json_codec: Optional[JSONCodec] = None):
+        """Open (and create if needed) the database.
+
+        Args:
+            path (str): Path of the database file. Use ":memory:" for a temporary in-memory database.
+            json_codec (Optional[JSONCodec]): Serializes the stored records. Default: get_json_codec().
+        """
+        self.path = path
+        self.json_codec = json_codec if json_codec is not None else get_json_codec()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS observation ("
+                "logger_sn TEXT NOT NULL, "
+                "sensor_sn TEXT NOT NULL, "
+                "timestamp TEXT NOT NULL, "
+                "record TEXT NOT NULL, "
+                "PRIMARY KEY (logger_sn, sensor_sn, timestamp))"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS observation_timestamp ON observation (timestamp)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS logger_state ("
+                "logger_sn TEXT PRIMARY KEY, "
+                "synced_from TEXT NOT NULL, "
+                "watermark TEXT)"
+            )
+            # Disjoint, non-adjacent ranges (both ends inclusive) per logger
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS synced_interval ("
+                "logger_sn TEXT NOT NULL, "
+                "start_time TEXT NOT NULL, "
+                "end_time TEXT NOT NULL, "
+                "PRIMARY KEY (logger_sn, start_time))"
+            )
+
+    def get_logger_state(self, logger_sn: str) -> tuple[Optional[str], Optional[str]]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT synced_from, watermark FROM logger_state WHERE logger_sn = ?", (logger_sn,)
+            ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def get_synced_intervals(self, logger_sn: str) -> list[tuple[str, str]]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT start_time, end_time FROM synced_interval WHERE logger_sn = ? ORDER BY start_time",
+                (logger_sn,)
+            ).fetchall()
+        if rows:
+            return [(row[0], row[1]) for row in rows]
+        # Databases created before the synced ranges were recorded
+        return super().get_synced_intervals(logger_sn)
+
+    def add_synced_interval(self, logger_sns: list[str], start_date_time: str, end_date_time: str) -> None:
+        for logger_sn in logger_sns:
+            intervals = _merge_intervals(self.get_synced_intervals(logger_sn) + [(start_date_time, end_date_time)])
+            with self._lock, self._connection:
+                self._connection.execute("DELETE FROM synced_interval WHERE logger_sn = ?", (logger_sn,))
+                self._connection.executemany(
+                    "INSERT INTO synced_interval (logger_sn, start_time, end_time) VALUES (?, ?, ?)",
+                    [(logger_sn, start, end) for start, end in intervals]
+                )
+
+    def save(self, logger_sns: list[str], start_date_time: str, observations: Iterable[dict[str, Any]]) -> int:
+        rows = [
+            (
+                str(observation.get("logger_sn", "")),
+                str(observation.get("sensor_sn", "")),
+                _normalize_timestamp(str(observation.get("timestamp", ""))),
+                self.json_codec.dumps(observation).decode("utf8")
+            )
+            for observation in observations
+        ]
+        watermarks: dict[str, str] = {}
+        for row in rows:
+            if row[0] not in watermarks or row[2] > watermarks[row[0]]:
+                watermarks[row[0]] = row[2]
+
+        with self._lock, self._connection:
+            before = self._connection.total_changes
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO observation (logger_sn, sensor_sn, timestamp, record) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            inserted = self._connection.total_changes - before
+            for logger_sn in logger_sns:
+                self._connection.execute(
+                    "INSERT OR IGNORE INTO logger_state (logger_sn, synced_from) VALUES (?, ?)",
+                    (logger_sn, start_date_time)
+                )
+                # MAX()/MIN() with a NULL argument return NULL, hence the COALESCE.
+                self._connection.execute(
+                    "UPDATE logger_state SET synced_from = MIN(synced_from, ?), "
+                    "watermark = MAX(COALESCE(watermark, ?), COALESCE(?, watermark)) WHERE logger_sn = ?",
+                    (start_date_time, watermarks.get(logger_sn), watermarks.get(logger_sn), logger_sn)
+                )
+        return inserted
+
+    def query(
+        self,
+        logger_sn: Optional[str] = None,
+        sensor_sn: Optional[str] = None,
+        start_date_time: Optional[str] = None,
+        end_date_time: Optional[str] = None
+    ) -> list[dict[str, Any]]:
+        conditions: list[str] = []
+        args: list[Any] = []
+        for column, operator, value in (
+            ("logger_sn", "=", logger_sn),
+            ("sensor_sn", "=", sensor_sn),
+            ("timestamp", ">=", start_date_time),
+            ("timestamp", "<=", end_date_time),
+        ):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                args.append(value)
+        sql = "SELECT record FROM observation"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY timestamp, logger_sn, sensor_sn"
+
+        with self._lock:
+            rows = self._connection.execute(sql, args).fetchall()
+        return [self.json_codec.loads(row[0]) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class HoboDataSync:
+    """Keeps a local copy of the observations of a list of loggers up to date.
+    Each sync() only requests the intervals which are not stored yet, and the accumulated observations can be read
+    back with query() without calling the API.
+
+    Example:
+        hobo_sync = HoboDataSync(hobo_api, ["1234567", "8912345"], SQLiteHoboObservationStore("hobo.sqlite3"))
+        hobo_sync.sync("2021-10-01 00:00:00")
+        observations = hobo_sync.query(logger_sn="1234567", start_date_time="2021-10-15 00:00:00")
+    """
+
+    def __init__(
+        self,
+        api: HoboAPI,
+        loggers: List[Union[str, int]] | str,
+        store: Optional[HoboObservationStore] = None
+    ):
+        """Init HoboDataSync.
+
+        Args:
+            api (HoboAPI): API client.
+            loggers (List[Union[str, int]] | str): A list of logger serial numbers, or a comma separated string.
+            store (Optional[HoboObservationStore]): Where to store the observations.
+                Default: SQLiteHoboObservationStore("hobo_observations.sqlite3").
+        """
+        self.api = api
+        if isinstance(loggers, str):
+            self.loggers = [logger_sn.strip() for logger_sn in loggers.split(",") if logger_sn.strip()]
+        else:
+            self.loggers = [str(logger_sn) for logger_sn in loggers]
+        self.store = store if store is not None else SQLiteHoboObservationStore()
+
+    def _missing_intervals(self, logger_sn: str, start: datetime, end: datetime) -> list[tuple[datetime, datetime]]:
+        """Intervals (both ends inclusive) of [start, end] which have not been synchronized yet for the logger."""
+        synced = [
+            (datetime.strptime(synced_start, HOBO_DATETIME_FORMAT), datetime.strptime(synced_end, HOBO_DATETIME_FORMAT))
+            for synced_start, synced_end in _merge_intervals(self.store.get_synced_intervals(logger_sn))
+        ]
+
+        intervals = []
+        since = start
+        for synced_start, synced_end in synced:
+            if synced_end < since:
+                continue
+            if synced_start > end:
+                break
+            if synced_start > since:
+                intervals.append((since, synced_start - timedelta(seconds=1)))
+            since = synced_end + timedelta(seconds=1)
+        if since <= end:
+            intervals.append((since, end))
+        return intervals
+
+    def sync(
+        self,
+        start_date_time: str,
+        end_date_time: Optional[str] = None,
+        upload_lag: timedelta = DEFAULT_UPLOAD_LAG,
+        **get_data_kwargs: Any
+    ) -> int:
+        """Request the observations of the ranges which are not synchronized yet and store them.
+        The synchronized ranges of each logger are recorded whether they had observations or not, so gaps between
+        two syncs are filled and ranges without data are not requested again. Since loggers upload their observations
+        in batches, the ranges are only recorded up to now - upload_lag: the last upload_lag is requested again by
+        every sync, and the observations already stored are ignored.
+        Loggers missing the same interval are requested together, so that a sync of loggers which are up to date to
+        the same point only needs one get_data() call.
+
+        Args:
+            start_date_time (str):
+                Start of the range to synchronize, in yyyy-MM-dd HH:mm:ss format.
+            end_date_time (Optional[str]):
+                End of the range to synchronize, in yyyy-MM-dd HH:mm:ss format. Default: now (UTC).
+            upload_lag (timedelta):
+                Longest delay between an observation and its upload. Default: DEFAULT_UPLOAD_LAG, one day. Lower it
+                to request less data again when the loggers upload often, e.g. through a gateway.
+            get_data_kwargs:
+                Passed to HoboAPI.get_data(), e.g. chunk_period for a long initial backfill.
+
+        Returns:
+            Number of new observations.
+        """
+        now = datetime.utcnow().replace(microsecond=0)
+        start = datetime.strptime(start_date_time, HOBO_DATETIME_FORMAT)
+        end = datetime.strptime(end_date_time, HOBO_DATETIME_FORMAT) if end_date_time else now
+        # Observations after it may not be uploaded yet.
+        complete_until = now - upload_lag
+
+        groups: dict[tuple[datetime, datetime], list[str]] = {}
+        for logger_sn in self.loggers:
+            for interval in self._missing_intervals(logger_sn, start, end):
+                groups.setdefault(interval, []).append(logger_sn)
+
+        inserted = 0
+        for (interval_start, interval_end), logger_sns in groups.items():
+            interval_start_str = interval_start.strftime(HOBO_DATETIME_FORMAT)
+            logger.info(
+                f"Syncing observations of loggers {','.join(logger_sns)} "
+                f"from {interval_start_str} to {interval_end.strftime(HOBO_DATETIME_FORMAT)}"
+            )
+            response = self.api.get_data(
+                ",".join(logger_sns),
+                interval_start_str,
+                interval_end.strftime(HOBO_DATETIME_FORMAT),
+                **get_data_kwargs
+            )
+            inserted += self.store.save(logger_sns, interval_start_str, response.get("observation_list") or [])
+            synced_end = min(interval_end, complete_until)
+            if synced_end >= interval_start:
+                self.store.add_synced_interval(
+                    logger_sns, interval_start_str, synced_end.strftime(HOBO_DATETIME_FORMAT)
+                )
+        return inserted
+
+    def query(
+        self,
+        logger_sn: Optional[str] = None,
+        sensor_sn: Optional[str] = None,
+        start_date_time: Optional[str] = None,
+        end_date_time: Optional[str] = None
+    ) -> list[dict[str, Any]]:
+        """Read locally stored observations in timestamp order. See HoboObservationStore.query()."""
+        return self.store.query(logger_sn, sensor_sn, start_date_time, end_date_time)
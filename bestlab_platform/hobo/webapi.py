@@ -4,12 +4,26 @@ from __future__ import annotations
 
 import json
 import logging
+import threading
 import time
-from typing import Any, List, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Union
 
 import requests
 
-from ..exceptions import ResponseError
+from ..exceptions import BatchRequestError, ResponseError
+from ..jsoncodec import JSONCodec, get_json_codec
+from ..metrics import CLIENT_HOBO, RequestMetrics
+from ..records import HoboObservation, compact_observations
+from ..retry import RETRY_TOKEN, RETRY_TRANSIENT, RetryPolicy, RetryStats
+from ..token_store import InMemoryTokenStore, TokenStore
+from ..transport import RequestsTransport, Transport
+from .columnar import observations_to_arrays, observations_to_dataframe
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
 # https://docs.python.org/3/howto/logging.html#logging-basic-tutorial
 logger = logging.getLogger('hobo_iot')
@@ -23,6 +37,19 @@ HoboLogger = logger
 
 HOBO_ENDPOINT = "https://webservice.hobolink.com"
 HOBO_GET_TOKEN_API = "/ws/auth/token"
+HOBO_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def check_chunking(chunk_period: Optional[timedelta] = None, loggers_per_chunk: Optional[int] = None) -> None:
+    """Check the chunking options of HoboAPI.get_data(), which would otherwise never finish splitting the request.
+
+    Raises:
+        ValueError: chunk_period is shorter than one second, or loggers_per_chunk is less than 1.
+    """
+    if chunk_period is not None and chunk_period < timedelta(seconds=1):
+        raise ValueError(f"chunk_period must be at least one second, got {chunk_period}")
+    if loggers_per_chunk is not None and loggers_per_chunk < 1:
+        raise ValueError(f"loggers_per_chunk must be at least 1, got {loggers_per_chunk}")
 
 
 class HoboTokenInfo:
@@ -50,6 +77,23 @@ class HoboTokenInfo:
         else:
             return True
 
+    def to_dict(self) -> dict[str, Any]:
+        """Token info as a dict, e.g. to save it in a TokenStore."""
+        return {
+            "access_token": self.access_token,
+            "token_type": self.token_type,
+            "expire_time": self.expire_time,
+        }
+
+    @classmethod
+    def from_dict(cls, token: dict[str, Any]) -> HoboTokenInfo:
+        """Load token info saved by to_dict()."""
+        token_info = cls({})
+        token_info.access_token = token.get("access_token", "")
+        token_info.token_type = token.get("token_type", "bearer")
+        token_info.expire_time = token.get("expire_time", 0)
+        return token_info
+
 
 class HoboAPI:
     """HOBO API
@@ -57,30 +101,116 @@ class HoboAPI:
     Example:
         hobo_api = HoboAPI(client_id, client_secret, user_id)
         hobo_api.get_data(["1234567", "8912345"], start_date_time, end_date_time)
+
+    Example with many accounts, authenticated concurrently:
+        hobo_apis = [HoboAPI(client_id, client_secret, user_id, auto_connect=False) for user_id in user_ids]
+        HoboAPI.prewarm(hobo_apis)
     """
     def __init__(
             self,
             client_id: str,
             client_secret: str,
             user_id: int | str,
-            endpoint: str = HOBO_ENDPOINT
+            endpoint: str = HOBO_ENDPOINT,
+            retry_policy: Optional[RetryPolicy] = None,
+            token_store: Optional[TokenStore] = None,
+            auto_connect: bool = True,
+            json_codec: Optional[JSONCodec] = None,
+            metrics: Optional[RequestMetrics] = None,
+            transport: Optional[Transport] = None
     ):
+        """Init HoboAPI.
+
+        Args:
+            client_id (str): Client ID.
+            client_secret (str): Client secret.
+            user_id (int | str): User ID.
+            endpoint (str): Default: HOBO_ENDPOINT.
+            retry_policy (Optional[RetryPolicy]): When to retry failed requests. Default: RetryPolicy().
+            token_store (Optional[TokenStore]): Token cache shared with other clients using the same credentials,
+                e.g. FileTokenStore to share the token between processes. Default: a cache private to this instance.
+            auto_connect (bool): Get the token on initialization, unless a valid token is cached in token_store.
+                If False, the token is requested by the first request, or by connect() or prewarm(). Default: True.
+            json_codec (Optional[JSONCodec]): Decodes responses.
+                Default: get_json_codec(), i.e. orjson or ujson if installed, the json module otherwise.
+            metrics (Optional[RequestMetrics]): Request metrics, possibly shared with other clients.
+                Default: metrics private to this instance.
+            transport (Optional[Transport]): Creates the HTTP session: connection pool size, keep-alive, timeouts.
+                Share a RequestsTransport between clients to share its connection pool. Default: RequestsTransport(),
+                with the defaults of requests.
+        """
         self.endpoint = endpoint
         self.client_id = client_id
         self.client_secret = client_secret
         self.user_id = str(user_id)
 
-        self.session = requests.session()
+        self.transport = transport if transport is not None else RequestsTransport()
+        self.session = self.transport.create_session()
+        self.json_codec = json_codec if json_codec is not None else get_json_codec()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        # Number of retries per kind of failure
+        self.retry_stats = RetryStats()
+        self.metrics = metrics if metrics is not None else RequestMetrics()
 
         self.token_info: HoboTokenInfo | None = None
-        self._get_access_token_if_needed(force=True)
+        self._token_lock = threading.Lock()
+        self.token_store = token_store if token_store is not None else InMemoryTokenStore()
+        self._token_key = f"hobo:{endpoint}:{client_id}"
+        if auto_connect:
+            self._get_access_token_if_needed()
+
+    def connect(self) -> None:
+        """Get a token now, unless we already have a valid one.
+
+        Raises:
+            ResponseError: HTTP status code and response text
+        """
+        self._get_access_token_if_needed()
+
+    def is_connect(self) -> bool:
+        """Whether we have a valid access token."""
+        return self.token_info is not None and not self.token_info.need_refresh()
+
+    @staticmethod
+    def prewarm(apis: Iterable[HoboAPI], max_workers: int = 8) -> None:
+        """Get tokens for many HoboAPI instances concurrently, e.g. created with auto_connect=False.
+        Instances which already have a valid token are skipped.
+
+        Args:
+            apis (Iterable[HoboAPI]): API clients.
+            max_workers (int): Number of tokens requested in parallel. Default: 8.
+
+        Raises:
+            BatchRequestError: Some instances failed to get a token. The errors are keyed by user ID; the other
+                instances are ready to use.
+        """
+        pending = [api for api in apis if not api.is_connect()]
+        if not pending:
+            return
+
+        results: dict[str, Any] = {}
+        errors: dict[str, BaseException] = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [(api.user_id, executor.submit(api.connect)) for api in pending]
+            for user_id, future in futures:
+                try:
+                    results[user_id] = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to get a token for user {user_id}: {e!r}")
+                    errors[user_id] = e
+
+        if errors:
+            raise BatchRequestError(results, errors)
 
     def get_data(
         self,
         loggers: List[Union[str, int]] | Union[str, int],
         start_date_time: str,
         end_date_time: str,
-        warn_on_empty_data: bool = False
+        warn_on_empty_data: bool = False,
+        chunk_period: Optional[timedelta] = None,
+        loggers_per_chunk: Optional[int] = None,
+        max_workers: int = 4
     ) -> dict[str, Any]:
         """Get data from HOBO Web Services
 
@@ -94,14 +224,26 @@ class HoboAPI:
             warn_on_empty_data (bool):
                 If True, print a warning message (to HoboLogger, which by default is your console).
                 Has no effect on function return.
+            chunk_period (Optional[timedelta]):
+                If specified, split the time range into chunks of this length, e.g. timedelta(days=1). At least one
+                second.
+            loggers_per_chunk (Optional[int]):
+                If specified, split the loggers into groups of at most this many loggers. At least 1.
+            max_workers (int):
+                Number of chunks fetched in parallel when chunk_period or loggers_per_chunk is specified. Default: 4.
 
         Returns:
-            response (dict): JSON decoded response
+            response (dict): JSON decoded response. If the request is split into chunks, the observation lists of
+            all chunks are merged in timestamp order into the first response.
 
         Raises:
             TypeError:
                 The "loggers" parameter type is incorrect
+            ValueError:
+                chunk_period is shorter than one second, or loggers_per_chunk is less than 1
         """
+        check_chunking(chunk_period, loggers_per_chunk)
+
         # Comma separated list of logger device IDs
         logger_list: str = ""
         if isinstance(loggers, str):
@@ -111,21 +253,157 @@ class HoboAPI:
         else:
             raise TypeError('Please check your input to get_data function')
 
+        if chunk_period is None and loggers_per_chunk is None:
+            response = self._get_data_chunk(logger_list, start_date_time, end_date_time)
+        else:
+            response = self._get_data_in_chunks(
+                logger_list, start_date_time, end_date_time, chunk_period, loggers_per_chunk, max_workers
+            )
+
+        if warn_on_empty_data and not response.get('observation_list', None):
+            logger.warning(f"The data seems to be empty. Response: {response}, t = {int(time.time())}")
+
+        return response
+
+    def get_data_records(
+        self,
+        loggers: List[Union[str, int]] | Union[str, int],
+        start_date_time: str,
+        end_date_time: str,
+        **get_data_kwargs: Any
+    ) -> list[HoboObservation]:
+        """Get the observations as records.HoboObservation tuples with interned strings, which take much less memory
+        than the dicts of the raw response.
+
+        Args:
+            loggers (List[Union[str, int]] | Union[str, int]):
+                See get_data().
+            start_date_time (str):
+                See get_data().
+            end_date_time (str):
+                See get_data().
+            get_data_kwargs:
+                Passed to get_data(), e.g. chunk_period.
+
+        Returns:
+            A list of HoboObservation, in the order of "observation_list".
+        """
+        return compact_observations(self.get_data(loggers, start_date_time, end_date_time, **get_data_kwargs))
+
+    def get_data_arrays(
+        self,
+        loggers: List[Union[str, int]] | Union[str, int],
+        start_date_time: str,
+        end_date_time: str,
+        **get_data_kwargs: Any
+    ) -> dict[str, dict[str, np.ndarray[Any, Any]]]:
+        """Get data as NumPy arrays per sensor serial number. Requires numpy.
+
+        Args:
+            loggers (List[Union[str, int]] | Union[str, int]):
+                See get_data().
+            start_date_time (str):
+                See get_data().
+            end_date_time (str):
+                See get_data().
+            get_data_kwargs:
+                Passed to get_data(), e.g. chunk_period.
+
+        Returns:
+            Map of sensor serial number -> columns. See columnar.observations_to_arrays().
+        """
+        return observations_to_arrays(self.get_data(loggers, start_date_time, end_date_time, **get_data_kwargs))
+
+    def get_data_dataframe(
+        self,
+        loggers: List[Union[str, int]] | Union[str, int],
+        start_date_time: str,
+        end_date_time: str,
+        **get_data_kwargs: Any
+    ) -> pd.DataFrame:
+        """Get data as a DataFrame with one row per observation. Requires pandas.
+
+        Args:
+            loggers (List[Union[str, int]] | Union[str, int]):
+                See get_data().
+            start_date_time (str):
+                See get_data().
+            end_date_time (str):
+                See get_data().
+            get_data_kwargs:
+                Passed to get_data(), e.g. chunk_period.
+
+        Returns:
+            See columnar.observations_to_dataframe().
+        """
+        return observations_to_dataframe(self.get_data(loggers, start_date_time, end_date_time, **get_data_kwargs))
+
+    def _get_data_chunk(self, logger_list: str, start_date_time: str, end_date_time: str) -> dict[str, Any]:
         params = {
             "loggers": logger_list,
             "start_date_time": start_date_time,
             "end_date_time": end_date_time
         }
 
-        response = self.get(
+        return self.get(
             path=f"/ws/data/file/JSON/user/{self.user_id}",
             params=params
         )
 
-        if warn_on_empty_data and not response.get('observation_list', None):
-            logger.warning(f"The data seems to be empty. Response: {response}, t = {int(time.time())}")
+    def _get_data_in_chunks(
+        self,
+        logger_list: str,
+        start_date_time: str,
+        end_date_time: str,
+        chunk_period: Optional[timedelta],
+        loggers_per_chunk: Optional[int],
+        max_workers: int
+    ) -> dict[str, Any]:
+        """Split the request by time window and by logger group, fetch the chunks with a thread pool, then merge
+        the observation lists in timestamp order.
+        """
+        logger_ids = [logger_id.strip() for logger_id in logger_list.split(",") if logger_id.strip()]
+        if loggers_per_chunk:
+            logger_groups = [
+                ",".join(logger_ids[i:i + loggers_per_chunk]) for i in range(0, len(logger_ids), loggers_per_chunk)
+            ]
+        else:
+            logger_groups = [",".join(logger_ids)]
+
+        start = datetime.strptime(start_date_time, HOBO_DATETIME_FORMAT)
+        end = datetime.strptime(end_date_time, HOBO_DATETIME_FORMAT)
+        windows: list[tuple[str, str]] = []
+        if chunk_period:
+            window_start = start
+            while window_start <= end:
+                # Both ends are inclusive, so the next window starts one second later.
+                window_end = min(window_start + chunk_period - timedelta(seconds=1), end)
+                windows.append((
+                    window_start.strftime(HOBO_DATETIME_FORMAT), window_end.strftime(HOBO_DATETIME_FORMAT)
+                ))
+                window_start = window_end + timedelta(seconds=1)
+        else:
+            windows.append((start_date_time, end_date_time))
 
-        return response
+        chunks = [(group, window[0], window[1]) for window in windows for group in logger_groups]
+        logger.debug(f"Fetching data in {len(chunks)} chunks, t = {int(time.time())}")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            responses = list(executor.map(lambda chunk: self._get_data_chunk(*chunk), chunks))
+
+        if not responses:
+            return {"observation_list": []}
+
+        observations: list[Any] = []
+        for response in responses:
+            observations.extend(response.get("observation_list") or [])
+        # Stable sort: readings with the same timestamp keep the logger order
+        observations.sort(key=lambda observation: observation.get("timestamp", ""))
+
+        merged = dict(responses[0])
+        merged["observation_list"] = observations
+        if str(merged.get("message", "")).startswith("OK: Found:"):
+            merged["message"] = f"OK: Found: {len(observations)} results."
+        return merged
 
     def _get_access_token_if_needed(self, force: bool = False) -> None:
         """Get a new token if needed
@@ -139,26 +417,50 @@ class HoboAPI:
         if not force and self.token_info and not self.token_info.need_refresh():
             return
 
+        # Only one thread (or process, depending on the token store) gets the token, the others wait for it and
+        # reuse the new token.
+        with self._token_lock, self.token_store.lock(self._token_key):
+            if not force:
+                self._load_token()
+                if self.token_info and not self.token_info.need_refresh():
+                    return
+            self._get_access_token()
+
+    def _load_token(self) -> None:
+        """Use the cached token if it expires later than ours. Must be called with the token store lock held."""
+        cached = self.token_store.load(self._token_key)
+        if cached is None:
+            return
+        token_info = HoboTokenInfo.from_dict(cached)
+        if token_info.access_token and (
+            self.token_info is None or token_info.expire_time > self.token_info.expire_time
+        ):
+            self.token_info = token_info
+
+    def _get_access_token(self) -> None:
+        """Get a new token. Must be called with the token lock and the token store lock held.
+
+        Raises:
+            ResponseError: HTTP status code and response text
+        """
         payload = {
             "grant_type": "client_credentials",
             "client_id": self.client_id,
             "client_secret": self.client_secret
         }
 
-        logger.debug(f"Getting new token, t = {int(time.time())}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Getting new token, t = {int(time.time())}")
 
-        logger.debug(
-            f"Request: method = POST, \
-                 url = {self.endpoint + HOBO_GET_TOKEN_API},\
-                 params = None,\
-                 body = {payload},\
-                 t = {int(time.time())}"
-        )
+            logger.debug(
+                f"Request: method = POST, \
+                     url = {self.endpoint + HOBO_GET_TOKEN_API},\
+                     params = None,\
+                     body = {payload},\
+                     t = {int(time.time())}"
+            )
 
-        response: requests.Response = self.session.post(
-            url=self.endpoint + HOBO_GET_TOKEN_API,
-            data=payload
-        )
+        response = self.__send("POST", HOBO_GET_TOKEN_API, None, payload, None)
 
         if response.ok is False:
             logger.error(
@@ -166,7 +468,38 @@ class HoboAPI:
             )
             raise ResponseError(response.status_code, response.text)
 
-        self.token_info = HoboTokenInfo(response.json())
+        self.token_info = HoboTokenInfo(self.json_codec.loads(response.content))
+        self.token_store.save(self._token_key, self.token_info.to_dict())
+        self.metrics.record_token_refresh(CLIENT_HOBO)
+
+    def _reconnect(self, stale_authorization: Optional[str]) -> None:
+        """Get a new token after the server rejected stale_authorization, unless another client already did."""
+        with self._token_lock, self.token_store.lock(self._token_key):
+            self._load_token()
+            if self.token_info is None or f"Bearer {self.token_info.access_token}" == stale_authorization:
+                self._get_access_token()
+
+    def __send(
+        self,
+        method: str,
+        path: str,
+        params: Optional[dict[str, Any]],
+        body: Optional[dict[str, Any]],
+        headers: Optional[dict[str, str]]
+    ) -> requests.Response:
+        """Send the request and record its metrics."""
+        sent = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.endpoint + path, params=params, data=body, headers=headers
+            )
+        except (requests.ConnectionError, requests.Timeout):
+            self.metrics.record_request(CLIENT_HOBO, method, path, None, time.perf_counter() - sent)
+            raise
+        self.metrics.record_request(
+            CLIENT_HOBO, method, path, response.status_code, time.perf_counter() - sent, len(response.content)
+        )
+        return response
 
     def __request(
         self,
@@ -197,34 +530,71 @@ class HoboAPI:
         if auth_required:
             self._get_access_token_if_needed()
 
-        headers = None
-        if self.token_info:
-            access_token = self.token_info.access_token
-            headers = {"Authorization": f"Bearer {access_token}"}
-
-        logger.debug(
-            f"Request: method = {method}, \
-                url = {self.endpoint + path},\
-                params = {params},\
-                body = {body},\
-                t = {int(time.time())}"
-        )
-
-        response = self.session.request(
-            method, self.endpoint + path, params=params, data=body, headers=headers
-        )
-
-        if response.ok is False:
+        started = time.monotonic()
+        attempt = 1
+        while True:
+            headers = None
+            if self.token_info:
+                access_token = self.token_info.access_token
+                headers = {"Authorization": f"Bearer {access_token}"}
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    f"Request: method = {method}, \
+                        url = {self.endpoint + path},\
+                        params = {params},\
+                        body = {body},\
+                        t = {int(time.time())}"
+                )
+
+            response: Optional[requests.Response] = None
+            try:
+                response = self.__send(method, path, params, body, headers)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error: BaseException = e
+                failure: Optional[str] = RETRY_TRANSIENT
+            else:
+                if response.ok:
+                    break
+                if response.status_code == 401 and auth_required:
+                    failure = RETRY_TOKEN
+                elif self.retry_policy.is_transient_status(response.status_code):
+                    failure = RETRY_TRANSIENT
+                else:
+                    # Other client errors will fail again, do not retry.
+                    failure = None
+
+            if failure is not None:
+                delay = 0.0 if failure == RETRY_TOKEN else self.retry_policy.backoff_delay(attempt)
+                if self.retry_policy.can_retry(attempt, started, delay):
+                    attempt += 1
+                    self.retry_stats.increment(failure)
+                    self.metrics.record_retry(CLIENT_HOBO, failure)
+                    logger.warning(
+                        f"Request failed ({failure}), retrying in {delay:.1f}s: "
+                        f"code={response.status_code if response is not None else error!r}, "
+                        f"t = {int(time.time())}"
+                    )
+                    if failure == RETRY_TOKEN:
+                        self._reconnect(headers["Authorization"] if headers else None)
+                    else:
+                        time.sleep(delay)
+                    continue
+
+            if response is None:
+                logger.error(f"Request failed: {error!r}")
+                raise error
             logger.error(
                 f"Response error: code={response.status_code}, body={response.text}"
             )
             raise ResponseError(response.status_code, response.text)
 
-        result: dict[str, Any] = response.json()
+        result: dict[str, Any] = self.json_codec.loads(response.content)
 
-        logger.debug(
-            f"Response: {json.dumps(result, ensure_ascii=False, indent=2)}"
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"Response: {json.dumps(result, ensure_ascii=False, indent=2)}"
+            )
 
         return result
 
@@ -0,0 +1,100 @@
+"""Pluggable JSON encoding and decoding"""
+
+from __future__ import annotations
+
+import importlib
+import json
+from typing import Any, Optional
+
+
+class JSONCodec:
+    """JSON codec based on the standard library. Subclasses use faster third-party packages.
+
+    The encoded body of a request is signed and sent as is, so a codec may format its output freely (e.g. without
+    spaces) as long as dumps() returns valid JSON.
+    """
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode obj to UTF-8 JSON."""
+        return json.dumps(obj).encode("utf8")
+
+    def loads(self, data: bytes | str) -> Any:
+        """Decode JSON text or UTF-8 bytes.
+
+        Raises:
+            ValueError: data is not valid JSON.
+        """
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """JSON codec based on the optional ``orjson`` package."""
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        self._orjson = importlib.import_module("orjson")
+
+    def dumps(self, obj: Any) -> bytes:
+        result: bytes = self._orjson.dumps(obj)
+        return result
+
+    def loads(self, data: bytes | str) -> Any:
+        # orjson.JSONDecodeError is a subclass of ValueError.
+        return self._orjson.loads(data)
+
+
+class UjsonCodec(JSONCodec):
+    """JSON codec based on the optional ``ujson`` package."""
+
+    name = "ujson"
+
+    def __init__(self) -> None:
+        self._ujson = importlib.import_module("ujson")
+
+    def dumps(self, obj: Any) -> bytes:
+        text: str = self._ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False)
+        return text.encode("utf8")
+
+    def loads(self, data: bytes | str) -> Any:
+        # ujson.JSONDecodeError is a subclass of ValueError.
+        return self._ujson.loads(data)
+
+
+JSON_CODECS = {codec.name: codec for codec in (OrjsonCodec, UjsonCodec, JSONCodec)}
+
+_default_codec: Optional[JSONCodec] = None
+
+
+def get_json_codec(name: Optional[str] = None) -> JSONCodec:
+    """Get a JSON codec.
+
+    Args:
+        name (Optional[str]): "orjson", "ujson" or "json". Default: None, the fastest installed package, in this
+            order.
+
+    Returns:
+        The codec.
+
+    Raises:
+        ImportError: The package of the named codec is not installed.
+        ValueError: Unknown codec name.
+    """
+    global _default_codec
+    if name is not None:
+        if name not in JSON_CODECS:
+            raise ValueError(f"Unknown JSON codec {name!r}, expected one of {', '.join(JSON_CODECS)}")
+        return JSON_CODECS[name]()
+
+    if _default_codec is None:
+        codec: JSONCodec = JSONCodec()
+        for candidate in (OrjsonCodec, UjsonCodec):
+            try:
+                codec = candidate()
+                break
+            except ImportError:
+                continue
+        _default_codec = codec
+    return _default_codec
@@ -0,0 +1,338 @@
+"""Request metrics shared by the API clients, with a Prometheus text format exporter"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Values of the "client" label
+CLIENT_TUYA = "tuya"
+CLIENT_HOBO = "hobo"
+
+DEFAULT_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+"""Upper bounds in seconds of the latency histogram buckets."""
+
+_VERSION_SEGMENT = re.compile(r"^v[0-9]+(\.[0-9]+)*$")
+
+
+def path_template(path: str) -> str:
+    """Replace the IDs in a request path by "{id}", so that metrics are grouped by endpoint instead of by device or
+    user, and tokens (e.g. in the Tuya refresh token path) never end up in metric labels.
+
+    A path segment is considered an ID if it is made of digits, contains a comma (list of IDs), or is at least 10
+    characters long and contains a digit.
+
+    Example:
+        "/v1.0/devices/eb0123456789abcdef/logs" -> "/v1.0/devices/{id}/logs"
+    """
+    segments = path.split("/")
+    for i, segment in enumerate(segments):
+        if _VERSION_SEGMENT.match(segment):
+            continue
+        if segment.isdigit() or "," in segment or (
+            len(segment) >= 10 and any(char.isdigit() for char in segment)
+        ):
+            segments[i] = "{id}"
+    return "/".join(segments)
+
+
+class RequestEvent:
+    """One HTTP request (a single attempt: a retried request produces one event per attempt), passed to the hooks.
+
+    Attributes:
+        client: CLIENT_TUYA or CLIENT_HOBO.
+        method: HTTP method.
+        endpoint: Request path, with IDs replaced by path_template().
+        status_code: HTTP status code, or None if the request failed without a response (connection error, timeout).
+        duration: Seconds from sending the request to reading the whole response, excluding the client-side rate
+            limiter wait.
+        response_bytes: Size of the response body.
+        error_code: Error code of a Tuya response with "success": false, otherwise None.
+    """
+
+    def __init__(
+        self,
+        client: str,
+        method: str,
+        endpoint: str,
+        status_code: Optional[int],
+        duration: float,
+        response_bytes: int = 0,
+        error_code: Any = None
+    ):
+        self.client = client
+        self.method = method
+        self.endpoint = endpoint
+        self.status_code = status_code
+        self.duration = duration
+        self.response_bytes = response_bytes
+        self.error_code = error_code
+
+    def __repr__(self) -> str:
+        return (
+            f"RequestEvent(client={self.client!r}, method={self.method!r}, endpoint={self.endpoint!r}, "
+            f"status_code={self.status_code!r}, duration={self.duration:.3f}, "
+            f"response_bytes={self.response_bytes}, error_code={self.error_code!r})"
+        )
+
+
+class Histogram:
+    """Counts of observed values per bucket, Prometheus style. Not thread-safe: RequestMetrics holds its lock."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        # Non cumulative: counts[i] is the number of values in (buckets[i - 1], buckets[i]], the last item counts the
+        # values above the last bucket.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Add a value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: Histogram) -> None:
+        """Add the values of another histogram with the same buckets."""
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile (e.g. 0.99), by linear interpolation within its bucket, like Prometheus
+        histogram_quantile(). Returns the last bucket bound if the quantile is above it, and NaN if there is no value.
+        """
+        if self.count == 0:
+            return float("nan")
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class RequestMetrics:
+    """Thread-safe request metrics: requests per endpoint and status, latency histograms, response bytes, retries,
+    token refreshes and Tuya error codes.
+
+    Every client has its own instance by default (its ``metrics`` attribute). Pass the same instance to several
+    clients to aggregate their metrics, e.g. to export all of them with to_prometheus().
+
+    Example:
+        metrics = RequestMetrics()
+        metrics.add_hook(lambda event: print(event) if event.duration > 5 else None)
+        tuya_api = TuyaOpenAPI(ENDPOINT, ACCESS_ID, ACCESS_KEY, metrics=metrics)
+        hobo_api = HoboAPI(client_id, client_secret, user_id, metrics=metrics)
+        ...
+        print(metrics.latency_quantile(0.99, endpoint="/v1.0/devices/{id}/logs"))
+        text = metrics.to_prometheus()
+    """
+
+    def __init__(
+        self,
+        latency_buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+        endpoint_label: Callable[[str], str] = path_template
+    ):
+        """Init RequestMetrics.
+
+        Args:
+            latency_buckets (Sequence[float]): Increasing upper bounds in seconds of the latency histogram buckets.
+                Default: DEFAULT_LATENCY_BUCKETS.
+            endpoint_label (Callable[[str], str]): Converts a request path to the "endpoint" label. It must remove
+                IDs and secrets from the path. Default: path_template().
+        """
+        self.latency_buckets = tuple(latency_buckets)
+        self.endpoint_label = endpoint_label
+        self._lock = threading.Lock()
+        self._hooks: List[Callable[[RequestEvent], None]] = []
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all metrics. Hooks are kept."""
+        with self._lock:
+            # (client, method, endpoint, status) -> count. status is the HTTP status code, or "error".
+            self.requests: Dict[Tuple[str, str, str, str], int] = {}
+            # (client, method, endpoint) -> latency histogram
+            self.latency: Dict[Tuple[str, str, str], Histogram] = {}
+            # (client, method, endpoint) -> total size of the response bodies
+            self.response_bytes: Dict[Tuple[str, str, str], int] = {}
+            # (client, kind) -> count. kind is RETRY_TOKEN, RETRY_TRANSIENT or RETRY_RATE_LIMIT.
+            self.retries: Dict[Tuple[str, str], int] = {}
+            # client -> count
+            self.token_refreshes: Dict[str, int] = {}
+            # (client, error code) -> count
+            self.error_codes: Dict[Tuple[str, str], int] = {}
+
+    def add_hook(self, hook: Callable[[RequestEvent], None]) -> None:
+        """Call hook(event) after every request, in the thread (or event loop) which sent it. Hooks must be fast.
+        Exceptions raised by hooks are logged and ignored.
+        """
+        with self._lock:
+            self._hooks = self._hooks + [hook]
+
+    def remove_hook(self, hook: Callable[[RequestEvent], None]) -> None:
+        """Remove a hook added by add_hook()."""
+        with self._lock:
+            self._hooks = [h for h in self._hooks if h is not hook]
+
+    def record_request(
+        self,
+        client: str,
+        method: str,
+        path: str,
+        status_code: Optional[int],
+        duration: float,
+        response_bytes: int = 0,
+        error_code: Any = None
+    ) -> None:
+        """Record one HTTP request, then call the hooks. Called by the clients, see RequestEvent for the arguments."""
+        event = RequestEvent(
+            client, method, self.endpoint_label(path), status_code, duration, response_bytes, error_code
+        )
+        key = (client, method, event.endpoint)
+        status = str(status_code) if status_code is not None else "error"
+        with self._lock:
+            request_key = key + (status,)
+            self.requests[request_key] = self.requests.get(request_key, 0) + 1
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram(self.latency_buckets)
+            histogram.observe(duration)
+            self.response_bytes[key] = self.response_bytes.get(key, 0) + response_bytes
+            if error_code is not None:
+                error_key = (client, str(error_code))
+                self.error_codes[error_key] = self.error_codes.get(error_key, 0) + 1
+            hooks = self._hooks
+
+        for hook in hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                logger.warning(f"Request metrics hook {hook!r} failed: {e!r}")
+
+    def record_retry(self, client: str, kind: str) -> None:
+        """Record one retry of a failed request."""
+        with self._lock:
+            self.retries[(client, kind)] = self.retries.get((client, kind), 0) + 1
+
+    def record_token_refresh(self, client: str) -> None:
+        """Record one new token (initial token, refresh or reconnection)."""
+        with self._lock:
+            self.token_refreshes[client] = self.token_refreshes.get(client, 0) + 1
+
+    def latency_histogram(
+        self,
+        client: Optional[str] = None,
+        method: Optional[str] = None,
+        endpoint: Optional[str] = None
+    ) -> Histogram:
+        """Latency histogram of the matching requests, all requests by default.
+
+        Args:
+            client (Optional[str]): CLIENT_TUYA or CLIENT_HOBO.
+            method (Optional[str]): HTTP method.
+            endpoint (Optional[str]): Endpoint label, e.g. "/v1.0/devices/{id}/logs".
+        """
+        merged = Histogram(self.latency_buckets)
+        with self._lock:
+            for (key_client, key_method, key_endpoint), histogram in self.latency.items():
+                if (
+                    (client is None or client == key_client)
+                    and (method is None or method == key_method)
+                    and (endpoint is None or endpoint == key_endpoint)
+                ):
+                    merged.merge(histogram)
+        return merged
+
+    def latency_quantile(
+        self,
+        q: float,
+        client: Optional[str] = None,
+        method: Optional[str] = None,
+        endpoint: Optional[str] = None
+    ) -> float:
+        """Estimated latency quantile in seconds (e.g. q=0.99) of the matching requests. See latency_histogram()."""
+        return self.latency_histogram(client, method, endpoint).quantile(q)
+
+    def to_prometheus(self, prefix: str = "bestlab") -> str:
+        """Export the metrics in the Prometheus text exposition format (version 0.0.4), e.g. to serve them on a
+        /metrics endpoint or to write them to a node_exporter textfile.
+
+        Args:
+            prefix (str): Prefix of the metric names. Default: "bestlab".
+
+        Returns:
+            The metrics text.
+        """
+        lines: List[str] = []
+
+        def add_metric(
+            name: str, kind: str, help_text: str, label_names: Sequence[str], samples: Dict[Any, Any]
+        ) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for key, value in sorted(samples.items()):
+                values = key if isinstance(key, tuple) else (key,)
+                lines.append(f"{prefix}_{name}{{{_labels(label_names, values)}}} {_format_value(value)}")
+
+        with self._lock:
+            add_metric(
+                "requests_total", "counter", "HTTP requests sent, per endpoint and status (\"error\" if no response).",
+                ("client", "method", "endpoint", "status"), self.requests
+            )
+
+            name = f"{prefix}_request_duration_seconds"
+            lines.append(f"# HELP {name} HTTP request latency, excluding the client-side rate limiter wait.")
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in sorted(self.latency.items()):
+                labels = _labels(("client", "method", "endpoint"), key)
+                cumulative = 0
+                for bound, count in zip(self.latency_buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{_format_value(bound)}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {_format_value(histogram.sum)}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+            add_metric(
+                "response_bytes_total", "counter", "Size of the HTTP response bodies.",
+                ("client", "method", "endpoint"), self.response_bytes
+            )
+            add_metric(
+                "retries_total", "counter", "Retries of failed requests, per kind of failure.",
+                ("client", "kind"), self.retries
+            )
+            add_metric(
+                "token_refreshes_total", "counter", "Access tokens obtained or refreshed.",
+                ("client",), self.token_refreshes
+            )
+            add_metric(
+                "api_errors_total", "counter", "Responses with an API error code, e.g. Tuya \"success\": false.",
+                ("client", "code"), self.error_codes
+            )
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,99 @@
+"""Compact record types for large device log and observation lists.
+
+A JSON decoded record is a dict holding its own hash table, keys and value strings. The records below are tuples
+without per-record keys, and their repeated strings (device IDs, DP codes, units, timestamps...) are interned, so that
+all records share a single copy of each distinct string. See benchmarks/bench_records.py for the memory saved.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Any, Iterable, List, NamedTuple, Optional
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class TuyaLogRecord(NamedTuple):
+    """One record of a Tuya device log. Same fields as the record dicts returned by get_device_log(), plus the device
+    ID. Use record._asdict() to get a dict back.
+    """
+    device_id: str
+    code: str
+    value: Any
+    event_time: int
+    event_from: Optional[str] = None
+    event_id: Optional[int] = None
+    status: Optional[str] = None
+
+
+class HoboObservation(NamedTuple):
+    """One item of "observation_list" in a HOBO get_data() response. Use observation._asdict() to get a dict back."""
+    logger_sn: str
+    sensor_sn: str
+    timestamp: str
+    data_type: Optional[str] = None
+    si_value: Optional[float] = None
+    si_unit: Optional[str] = None
+    us_value: Optional[float] = None
+    us_unit: Optional[str] = None
+    scaled_value: Optional[float] = None
+    scaled_unit: Optional[str] = None
+    sensor_key: Optional[str] = None
+    sensor_measurement_type: Optional[str] = None
+
+
+def compact_device_log(device_id: str, device_log: Iterable[dict[str, Any]]) -> List[TuyaLogRecord]:
+    """Convert device log records to TuyaLogRecord.
+
+    Args:
+        device_id (str): Device ID.
+        device_log (Iterable[dict[str, Any]]): Records from get_device_log(), or from iter_device_log() to never hold
+            the dicts of the whole log in memory.
+
+    Returns:
+        A list of TuyaLogRecord, in the same order.
+    """
+    device_id = sys.intern(device_id)
+    return [
+        TuyaLogRecord(
+            device_id,
+            sys.intern(str(record["code"])),
+            _intern(record.get("value")),
+            int(record["event_time"]),
+            _intern(record.get("event_from")),
+            record.get("event_id"),
+            _intern(record.get("status")),
+        )
+        for record in device_log
+    ]
+
+
+def compact_observations(response: dict[str, Any] | Iterable[dict[str, Any]]) -> List[HoboObservation]:
+    """Convert HOBO observations to HoboObservation.
+
+    Args:
+        response (dict[str, Any] | Iterable[dict[str, Any]]): HoboAPI.get_data() response, or its "observation_list".
+
+    Returns:
+        A list of HoboObservation, in the same order.
+    """
+    observations = (response.get("observation_list") or []) if isinstance(response, dict) else response
+    return [
+        HoboObservation(
+            sys.intern(str(observation.get("logger_sn", ""))),
+            sys.intern(str(observation.get("sensor_sn", ""))),
+            sys.intern(str(observation.get("timestamp", ""))),
+            _intern(observation.get("data_type")),
+            observation.get("si_value"),
+            _intern(observation.get("si_unit")),
+            observation.get("us_value"),
+            _intern(observation.get("us_unit")),
+            observation.get("scaled_value"),
+            _intern(observation.get("scaled_unit")),
+            _intern(observation.get("sensor_key")),
+            _intern(observation.get("sensor_measurement_type")),
+        )
+        for observation in observations
+    ]
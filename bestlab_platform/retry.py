@@ -0,0 +1,87 @@
+"""Shared retry policy"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Optional
+
+# Kinds of failures which are worth retrying
+RETRY_TOKEN = "token"
+"""The access token is invalid or expired: get a new token, sign again and retry immediately."""
+RETRY_TRANSIENT = "transient"
+"""Server error (5xx) or connection error: retry after an exponential backoff with jitter."""
+RETRY_RATE_LIMIT = "rate_limit"
+"""Request frequency limit exceeded: retry when the rate limiter allows it."""
+
+
+class RetryPolicy:
+    """When and how long to wait before sending a failed request again.
+    Client errors other than an invalid token (e.g. HTTP 4xx, invalid parameters) are never retried.
+
+    Attributes:
+        max_attempts: Maximum number of attempts per request, including the first one.
+        max_time: Give up when the next attempt would start later than this many seconds after the first one.
+            None means no limit.
+        backoff: Base delay in seconds of the exponential backoff.
+        max_backoff: Upper limit of the backoff delay in seconds.
+        retry_status_codes: HTTP status codes considered transient.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        max_time: Optional[float] = 60.0,
+        backoff: float = 0.5,
+        max_backoff: float = 10.0,
+        retry_status_codes: frozenset[int] = frozenset({500, 502, 503, 504})
+    ):
+        self.max_attempts = max_attempts
+        self.max_time = max_time
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_status_codes = retry_status_codes
+
+    def is_transient_status(self, status_code: int) -> bool:
+        """Whether a HTTP status code indicates a transient server error."""
+        return status_code in self.retry_status_codes
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Delay before the next attempt after a transient failure of the given attempt (starting at 1).
+        Uses "full jitter": a random delay between 0 and the exponential backoff.
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2.0 ** (attempt - 1)))
+
+    def can_retry(self, attempt: int, started: float, delay: float = 0.0) -> bool:
+        """Whether another attempt is allowed after the given attempt failed.
+
+        Args:
+            attempt (int): Number of the failed attempt, starting at 1.
+            started (float): time.monotonic() when the first attempt started.
+            delay (float): Seconds to wait before the next attempt.
+        """
+        if attempt >= self.max_attempts:
+            return False
+        if self.max_time is not None and time.monotonic() + delay - started > self.max_time:
+            return False
+        return True
+
+
+class RetryStats:
+    """Thread-safe counters of retries per kind of failure."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counts: dict[str, int] = {RETRY_TOKEN: 0, RETRY_TRANSIENT: 0, RETRY_RATE_LIMIT: 0}
+
+    def increment(self, kind: str) -> None:
+        """Count one retry for the kind of failure."""
+        with self._lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+
+    @property
+    def total(self) -> int:
+        """Total number of retries."""
+        with self._lock:
+            return sum(self.counts.values())
@@ -0,0 +1,183 @@
+"""Access token caches shared by API clients"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import IO, Any, ContextManager, Iterator, Optional
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+
+class TokenStore:
+    """Cache of access tokens, so that API clients using the same credentials share one valid token.
+
+    Tokens are saved as plain dicts (see TuyaTokenInfo.to_dict() and HoboTokenInfo.to_dict()) under a key identifying
+    the endpoint and the client ID. A client holds lock(key) while it checks the cached token and gets a new one, so
+    only one of the clients sharing the store requests a new token at a time.
+    Subclass it to use another storage backend.
+    """
+
+    def load(self, key: str) -> Optional[dict[str, Any]]:
+        """Get the cached token.
+
+        Args:
+            key (str): Token key.
+
+        Returns:
+            The token dict, or None if no token is cached under the key.
+        """
+        raise NotImplementedError
+
+    def save(self, key: str, token: dict[str, Any]) -> None:
+        """Cache a token, replacing the previous token of the key.
+
+        Args:
+            key (str): Token key.
+            token (dict[str, Any]): The token dict.
+        """
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Remove the cached token, e.g. after its refresh token was rejected.
+
+        The default implementation saves an empty token, which the clients ignore.
+
+        Args:
+            key (str): Token key.
+        """
+        self.save(key, {})
+
+    def lock(self, key: str) -> ContextManager[None]:
+        """Context manager holding the lock of the key. Must be reentrant within a thread."""
+        raise NotImplementedError
+
+
+class InMemoryTokenStore(TokenStore):
+    """Token cache shared by the API clients of one process.
+
+    Example:
+        token_store = InMemoryTokenStore()
+        apis = [TuyaOpenAPI(ENDPOINT, ACCESS_ID, ACCESS_KEY, token_store=token_store) for _ in range(4)]
+    """
+
+    def __init__(self) -> None:
+        self._tokens: dict[str, dict[str, Any]] = {}
+        self._locks: dict[str, threading.RLock] = {}
+        self._lock = threading.Lock()
+
+    def load(self, key: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            token = self._tokens.get(key)
+        return dict(token) if token is not None else None
+
+    def save(self, key: str, token: dict[str, Any]) -> None:
+        with self._lock:
+            self._tokens[key] = dict(token)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._tokens.pop(key, None)
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        with self._lock:
+            if key not in self._locks:
+                self._locks[key] = threading.RLock()
+            key_lock = self._locks[key]
+        with key_lock:
+            yield
+
+
+class FileTokenStore(TokenStore):
+    """Token cache in a JSON file, shared by the API clients of all processes using the same file, e.g. cron jobs
+    or the workers of a process pool. The file is locked with an OS file lock ("<path>.lock") while a client checks
+    or renews a token. Keep the file private: it contains access tokens.
+
+    Example:
+        token_store = FileTokenStore(os.path.expanduser("~/.cache/bestlab_tokens.json"))
+        tuya_api = TuyaOpenAPI(ENDPOINT, ACCESS_ID, ACCESS_KEY, token_store=token_store)
+    """
+
+    def __init__(self, path: str):
+        """Init FileTokenStore.
+
+        Args:
+            path (str): Path of the JSON file. Created on the first save.
+        """
+        self.path = path
+        # File locks exclude other processes; threads of this process are excluded by the thread lock.
+        self._thread_lock = threading.RLock()
+        self._lock_file: Optional[IO[bytes]] = None
+        self._lock_depth = 0
+
+    def _read(self) -> dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf8") as f:
+                tokens = json.load(f)
+        except (OSError, ValueError):
+            # Missing or corrupted cache: the clients will get new tokens.
+            return {}
+        return tokens if isinstance(tokens, dict) else {}
+
+    def load(self, key: str) -> Optional[dict[str, Any]]:
+        with self.lock(key):
+            token = self._read().get(key)
+        return token if isinstance(token, dict) else None
+
+    def save(self, key: str, token: dict[str, Any]) -> None:
+        with self.lock(key):
+            tokens = self._read()
+            tokens[key] = token
+            self._write(tokens)
+
+    def delete(self, key: str) -> None:
+        with self.lock(key):
+            tokens = self._read()
+            if tokens.pop(key, None) is not None:
+                self._write(tokens)
+
+    def _write(self, tokens: dict[str, Any]) -> None:
+        # Must be called with the lock held.
+        directory = os.path.dirname(os.path.abspath(self.path))
+        # Write to a temporary file and rename it, so that readers never see a partially written file.
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tokens-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf8") as f:
+                json.dump(tokens, f)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        # A single lock for the whole file: token renewals are rare.
+        with self._thread_lock:
+            if self._lock_depth == 0:
+                self._lock_file = open(self.path + ".lock", "a+b")
+                if sys.platform == "win32":
+                    self._lock_file.seek(0)
+                    msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                else:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    if sys.platform == "win32":
+                        self._lock_file.seek(0)
+                        msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                    else:
+                        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+                    self._lock_file.close()
+                    self._lock_file = None
@@ -0,0 +1,198 @@
+"""HTTP transports of the API clients"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Callable, List, Mapping, Optional, Tuple, Union
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Seconds, or (connect timeout, read timeout) like in requests
+Timeout = Union[float, Tuple[float, float]]
+
+
+class Transport:
+    """Creates the HTTP session of an API client (its ``session`` attribute).
+
+    The clients send every request with their session, so a transport customizes how requests are sent through
+    requests' extension point, the adapters mounted on the session: connection pooling, timeouts, or no network at
+    all with InMemoryTransport. Subclass it to use another adapter.
+    """
+
+    def create_session(self) -> requests.Session:
+        """Create the session of a new client."""
+        raise NotImplementedError
+
+
+class _HTTPAdapter(HTTPAdapter):
+    """HTTPAdapter with a default timeout."""
+
+    def __init__(self, timeout: Optional[Timeout], **kwargs: Any):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        stream: bool = False,
+        timeout: Any = None,
+        verify: Union[bool, str] = True,
+        cert: Any = None,
+        proxies: Optional[Mapping[str, str]] = None
+    ) -> requests.Response:
+        if timeout is None:
+            timeout = self.timeout
+        return super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+
+class RequestsTransport(Transport):
+    """Sends requests over HTTP with ``requests``, the default transport.
+
+    Every client gets its own session (headers, cookies), but all the sessions created by one RequestsTransport share
+    its connection pool. Share one instance between the clients of a process to reuse connections across clients
+    and bound the number of open sockets.
+
+    Example:
+        # Up to 32 concurrent connections per host, shared by all clients
+        transport = RequestsTransport(pool_maxsize=32, timeout=(5, 30))
+        tuya_api = TuyaOpenAPI(ENDPOINT, ACCESS_ID, ACCESS_KEY, transport=transport)
+        hobo_apis = [HoboAPI(client_id, client_secret, user_id, transport=transport) for user_id in user_ids]
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        timeout: Optional[Timeout] = None
+    ):
+        """Init RequestsTransport. The defaults are the defaults of ``requests``.
+
+        Args:
+            pool_connections (int): Number of hosts whose connection pool is kept. Default: 10.
+            pool_maxsize (int): Maximum number of connections kept open per host. Set it to at least the number of
+                threads sending requests (e.g. max_workers of batch calls), otherwise connections beyond the limit
+                are closed after each request ("Connection pool is full" warnings) and opened again. Default: 10.
+            pool_block (bool): Wait for a free connection when pool_maxsize connections are in use, instead of
+                opening a connection which is not kept. Default: False.
+            keep_alive (bool): Keep connections open between requests. Default: True.
+            timeout (Optional[Timeout]): Default timeout of the requests in seconds, or a tuple of
+                (connect timeout, read timeout). Default: None, wait forever.
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.adapter = _HTTPAdapter(
+            timeout, pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block
+        )
+
+    def create_session(self) -> requests.Session:
+        session = requests.Session()
+        session.mount("https://", self.adapter)
+        session.mount("http://", self.adapter)
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def close(self) -> None:
+        """Close the pooled connections. They are opened again by the next requests."""
+        self.adapter.close()
+
+
+# Handler of InMemoryTransport: request -> (HTTP status code, body). The body is bytes, str, or an object encoded to
+# JSON.
+Handler = Callable[[requests.PreparedRequest], Tuple[int, Any]]
+
+
+class _InMemoryAdapter(BaseAdapter):
+    def __init__(self, transport: InMemoryTransport):
+        super().__init__()
+        self.transport = transport
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        stream: bool = False,
+        timeout: Any = None,
+        verify: Union[bool, str] = True,
+        cert: Any = None,
+        proxies: Optional[Mapping[str, str]] = None
+    ) -> requests.Response:
+        return self.transport.respond(request)
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryTransport(Transport):
+    """Answers the requests in memory with a handler function, without network. For tests and benchmarks.
+
+    Example:
+        def handler(request: requests.PreparedRequest) -> Tuple[int, Any]:
+            if request.path_url.startswith("/v1.0/token"):
+                return 200, {"success": True, "result": {"access_token": "a", "refresh_token": "r",
+                                                         "expire_time": 7200, "uid": "u"}}
+            return 200, {"success": True, "result": {"id": "device-1", "online": True}}
+
+        transport = InMemoryTransport(handler)
+        tuya_api = TuyaOpenAPI("https://tuya.test", ACCESS_ID, ACCESS_KEY, transport=transport)
+        tuya_api.get("/v1.0/devices/device-1")
+        assert transport.requests[-1].path_url == "/v1.0/devices/device-1"
+    """
+
+    def __init__(self, handler: Handler, latency: float = 0.0, record_requests: bool = True):
+        """Init InMemoryTransport.
+
+        Args:
+            handler (Handler): Called with each request, returns a tuple of (HTTP status code, body). The body is
+                bytes, str, or an object encoded to JSON. Called concurrently by the threads sending requests.
+            latency (float): Seconds to wait before answering each request. Default: 0.
+            record_requests (bool): Keep the sent requests in the ``requests`` attribute. Default: True.
+        """
+        self.handler = handler
+        self.latency = latency
+        self.record_requests = record_requests
+        self.requests: List[requests.PreparedRequest] = []
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+    def create_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = _InMemoryAdapter(self)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def respond(self, request: requests.PreparedRequest) -> requests.Response:
+        """Answer a request with the handler."""
+        with self._lock:
+            self.request_count += 1
+            if self.record_requests:
+                self.requests.append(request)
+        started = time.perf_counter()
+        if self.latency > 0:
+            time.sleep(self.latency)
+        status_code, body = self.handler(request)
+        if isinstance(body, str):
+            body = body.encode("utf8")
+        elif not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf8")
+
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = body
+        response.headers = CaseInsensitiveDict({"Content-Type": "application/json", "Content-Length": str(len(body))})
+        response.encoding = "utf-8"
+        response.url = str(request.url)
+        response.request = request
+        response.reason = "OK" if status_code < 400 else "Error"
+        response.elapsed = timedelta(seconds=time.perf_counter() - started)
+        return response
@@ -1,12 +1,29 @@
+from .async_device import AsyncSmartHomeDeviceAPI, AsyncTuyaDeviceManager
+from .async_openapi import AsyncTuyaOpenAPI
+from .cache import MetadataCache
 from .device import SmartHomeDeviceAPI, TuyaDeviceManager
-from .openapi import TuyaOpenAPI, TuyaTokenInfo
+from .openapi import PreparedTuyaRequest, TuyaOpenAPI, TuyaTokenInfo
 from .openlogging import TUYA_LOGGER
+from .polling import StatusChange, StatusSnapshot
+from .ratelimit import TuyaRateLimiter
+from .sync import SQLiteTuyaLogStore, TuyaLogStore, TuyaLogSync
 
 __all__ = [
     "TuyaOpenAPI",
     "TuyaTokenInfo",
+    "PreparedTuyaRequest",
     "TuyaDeviceManager",
     # "TuyaDevice",
     "SmartHomeDeviceAPI",
+    "MetadataCache",
+    "StatusChange",
+    "StatusSnapshot",
+    "AsyncTuyaOpenAPI",
+    "AsyncSmartHomeDeviceAPI",
+    "AsyncTuyaDeviceManager",
+    "TuyaRateLimiter",
+    "TuyaLogSync",
+    "TuyaLogStore",
+    "SQLiteTuyaLogStore",
     "TUYA_LOGGER"
 ]
@@ -0,0 +1,541 @@
+"""Asyncio version of Tuya device api. Requires the optional ``aiohttp`` package."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Optional, TypeVar
+
+from ..exceptions import BatchRequestError, OutcomeUnknownError
+from .async_openapi import AsyncTuyaOpenAPI
+from .batch import TUYA_MAX_DEVICE_IDS, chunk_device_ids, merge_chunk_responses
+from .device import _to_millisecond_timestamp
+from .openlogging import logger
+
+_T = TypeVar("_T")
+
+
+class AsyncSmartHomeDeviceAPI:
+    """Asyncio Tuya Smart Home Device API. Same as SmartHomeDeviceAPI, except that every method is a coroutine.
+
+    Example:
+        async with AsyncTuyaOpenAPI("https://openapi.tuyaus.com", CLIENT_ID, CLIENT_SECRET) as tuya_api:
+            device_api = AsyncSmartHomeDeviceAPI(tuya_api)
+            print(await device_api.get_device_status("YOUR_DEVICE_ID_HERE"))
+    """
+
+    def __init__(self, api: AsyncTuyaOpenAPI):
+        self.api = api
+
+    async def get_device_info(self, device_id: str, include_device_status: bool = True) -> dict[str, Any]:
+        """Get device details, including properties and the latest status of the device.
+
+        Args:
+            device_id (str): Device ID
+            include_device_status (bool): Whether device status field should be included. Default: True
+
+        Returns:
+            API Response in a dictionary.
+        """
+        response = await self.api.get(f"/v1.0/devices/{device_id}")
+        if not include_device_status:
+            response["result"].pop("status")
+        return response
+
+    async def _get_in_chunks(
+        self, path: str, device_ids: list[str], chunk_size: int, max_concurrency: Optional[int]
+    ) -> dict[str, Any]:
+        """GET a batch API accepting a limited number of device IDs, in chunks requested concurrently, and merge the
+        responses into the response of a single request. See batch.merge_chunk_responses().
+
+        Raises:
+            BatchRequestError: Some chunks failed.
+        """
+        chunks = chunk_device_ids(device_ids, chunk_size)
+        if len(chunks) <= 1:
+            return await self.api.get(path, {"device_ids": ",".join(device_ids)})
+
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+        async def get(chunk: list[str]) -> dict[str, Any]:
+            if semaphore is None:
+                return await self.api.get(path, {"device_ids": ",".join(chunk)})
+            async with semaphore:
+                return await self.api.get(path, {"device_ids": ",".join(chunk)})
+
+        outcomes = await asyncio.gather(*(get(chunk) for chunk in chunks), return_exceptions=True)
+        for chunk, outcome in zip(chunks, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error(f"Request failed for devices {','.join(chunk)}: {outcome!r}")
+        return merge_chunk_responses(chunks, outcomes)
+
+    async def get_device_list_info(
+        self,
+        device_ids: list[str],
+        include_device_status: bool = True,
+        chunk_size: int = TUYA_MAX_DEVICE_IDS,
+        max_concurrency: Optional[int] = None
+    ) -> dict[str, Any]:
+        """Get device info for a list of devices.
+
+        Args:
+            device_ids (list[str]): a list of device ids.
+            include_device_status: Include device status in the return fields. Default: True
+            chunk_size (int): Maximum number of device IDs per request. Longer lists are split into chunks requested
+                concurrently, and the responses merged. Default: TUYA_MAX_DEVICE_IDS (20), the limit of the API.
+            max_concurrency (Optional[int]): Maximum number of chunks requested at the same time. Default: None,
+                unbounded.
+
+        Returns:
+            API Response in a dictionary.
+
+        Raises:
+            BatchRequestError: Some chunks failed. The info of the devices of the other chunks is available in its
+                "results" attribute, by device ID.
+        """
+        response = await self._get_in_chunks("/v1.0/devices/", device_ids, chunk_size, max_concurrency)
+        if response["success"] and not include_device_status:
+            for info in response["result"]["devices"]:
+                info.pop("status")
+        return response
+
+    async def get_device_status(self, device_id: str) -> dict[str, Any]:
+        """Get device status
+
+        Args:
+            device_id (str): Device ID
+
+        Returns:
+            API Response in a dictionary.
+        """
+        response = await self.api.get(f"/v1.0/devices/{device_id}")
+        response["result"] = response["result"]["status"]
+        return response
+
+    async def get_device_list_status(
+        self,
+        device_ids: list[str],
+        chunk_size: int = TUYA_MAX_DEVICE_IDS,
+        max_concurrency: Optional[int] = None
+    ) -> dict[str, Any]:
+        """Get device status for a list of devices.
+
+        Args:
+            device_ids (list[str]): List of Device IDs.
+            chunk_size (int): See get_device_list_info().
+            max_concurrency (Optional[int]): See get_device_list_info().
+
+        Returns:
+            API Response in a dictionary.
+
+        Raises:
+            BatchRequestError: Some chunks failed.
+        """
+        response = await self._get_in_chunks("/v1.0/devices/", device_ids, chunk_size, max_concurrency)
+        status_list = []
+        if response["success"]:
+            for info in response["result"]["devices"]:
+                status_list.append({"id": info["id"], "status": info["status"]})
+
+        response["result"] = status_list
+        return response
+
+    async def get_factory_info(
+        self,
+        device_ids: list[str],
+        chunk_size: int = TUYA_MAX_DEVICE_IDS,
+        max_concurrency: Optional[int] = None
+    ) -> dict[str, Any]:
+        """Query the factory information of the device.
+        Possible return fields are: id, uuid, sn, mac.
+
+        Args:
+            device_ids (list[str]): List of Device IDs.
+            chunk_size (int): See get_device_list_info().
+            max_concurrency (Optional[int]): See get_device_list_info().
+
+        Returns:
+            API Response in a dictionary.
+
+        Raises:
+            BatchRequestError: Some chunks failed.
+        """
+        return await self._get_in_chunks("/v1.0/devices/factory-infos", device_ids, chunk_size, max_concurrency)
+
+    async def get_device_functions(self, device_id: str) -> dict[str, Any]:
+        """Get the instruction set supported by the device, and the obtained instructions can be used to issue control.
+
+        Args:
+            device_id (str): Device ID.
+
+        Returns:
+            API Response in a dictionary.
+        """
+        return await self.api.get(f"/v1.0/devices/{device_id}/functions")
+
+    async def get_category_functions(self, category_id: str) -> dict[str, Any]:
+        """Query the instruction set supported by Tuya Platform in the given category.
+        You should not need this unless you are a platform developer.
+
+        Args:
+            category_id (str): Product category.
+
+        Returns:
+            API Response in a dictionary.
+        """
+        return await self.api.get(f"/v1.0/functions/{category_id}")
+
+    async def get_device_specification(self, device_id: str) -> dict[str, Any]:
+        """Acquire the instruction set and status set supported by the device according to the device ID.
+
+        Args:
+            device_id (str): Device ID.
+
+        Returns:
+            API Response in a dictionary.
+        """
+        return await self.api.get(f"/v1.0/devices/{device_id}/specifications")
+
+    async def send_commands(
+        self, device_id: str, commands: list[dict[str, Any]]
+    ) -> dict[str, Any]:
+        """Issue standard instructions to control equipment
+
+        Args:
+            device_id (str): Device ID.
+            commands: issue commands.
+
+        Returns:
+            API Response in a dictionary.
+        """
+        return await self.api.post(
+            f"/v1.0/devices/{device_id}/commands", {"commands": commands}
+        )
+
+    async def _yield_device_log_page(
+            self,
+            device_id: str,
+            start_time: int | float | str,
+            end_time: int | float | str,
+            size: int = 100,
+            type_: int = 7,
+            warn_on_empty_data: bool = False
+    ) -> AsyncIterator[list[Any]]:
+        """Async iterator which yields results within a page for the given device.
+        You should avoid calling this function directly unless you know what you are doing. Please call
+        get_device_log() instead.
+
+        See SmartHomeDeviceAPI._yield_device_log_page() for the arguments.
+        """
+        params = {
+            "type": type_,
+            "start_time": str(_to_millisecond_timestamp(start_time)),
+            "end_time": str(_to_millisecond_timestamp(end_time)),
+            "size": size
+        }
+        # Only start_row_key changes between pages: the request is prepared once.
+        request = self.api.prepare("GET", f"/v1.0/devices/{device_id}/logs", params)
+        current_page = await self.api.send_prepared(request)
+
+        # Warn on empty result if warn_on_empty_data = True
+        if warn_on_empty_data and not current_page["result"]["logs"]:
+            logger.warning(f"Detected empty result. device: {device_id}, params: {str(params)}")
+
+        yield current_page["result"]["logs"]
+
+        while current_page["result"]["has_next"]:
+            current_page = await self.api.send_prepared(
+                request, {"start_row_key": current_page["result"]["next_row_key"]}
+            )
+            yield current_page["result"]["logs"]
+
+    async def iter_device_log(
+            self,
+            device_id: str,
+            start_timestamp: int | float | str,
+            end_timestamp: int | float | str,
+            device_name: Optional[str] = None,
+            warn_on_empty_data: bool = False,
+            type_: int = 7
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Async iterator over device log records stored on the Tuya platform, one record at a time.
+
+        See SmartHomeDeviceAPI.iter_device_log() for the arguments.
+        """
+        result_device_name = device_name if device_name else device_id
+        logger.info(f"Start fetching historical data for device {result_device_name}")
+        page_num = 1
+        is_empty = True
+        async for page in self._yield_device_log_page(
+                device_id,
+                start_timestamp,
+                end_timestamp,
+                warn_on_empty_data=warn_on_empty_data,
+                type_=type_
+        ):
+            logger.info(f"Fetched historical data for device {result_device_name}, page {page_num}")
+            page_num += 1
+            if page:
+                is_empty = False
+            for record in page:
+                yield record
+
+        # Warn on empty result if warn_on_empty_data = True
+        if warn_on_empty_data and is_empty:
+            logger.warning(f"Detected empty result for device {str(result_device_name)}")
+
+    async def get_device_log(
+            self,
+            device_id: str,
+            start_timestamp: int | float | str,
+            end_timestamp: int | float | str,
+            device_name: Optional[str] = None,
+            warn_on_empty_data: bool = False,
+            type_: int = 7
+    ) -> list[Any]:
+        """Get device log stored on the Tuya platform. Note that free version of Tuya Platform only stores 7 days' data.
+
+        See SmartHomeDeviceAPI.get_device_log() for the arguments.
+
+        Returns:
+            A list of device logs.
+        """
+        return [record async for record in self.iter_device_log(
+            device_id,
+            start_timestamp,
+            end_timestamp,
+            device_name=device_name,
+            warn_on_empty_data=warn_on_empty_data,
+            type_=type_
+        )]
+
+
+class AsyncTuyaDeviceManager:
+    """Asyncio version of TuyaDeviceManager. Calls for multiple devices are issued concurrently on the running
+    event loop.
+
+    Args:
+        api (AsyncTuyaOpenAPI): API client.
+        device_map (dict[str, str]): Map of device name -> device id.
+        device_list (list[str]): List of device ids. Specify either device_map or device_list.
+        max_concurrency (int): Maximum number of requests in flight issued by this manager. None means unbounded.
+    """
+
+    def __init__(
+        self,
+        api: AsyncTuyaOpenAPI,
+        device_map: Optional[dict[str, str]] = None,
+        device_list: Optional[list[str]] = None,
+        max_concurrency: Optional[int] = None
+    ):
+        if (not device_map and not device_list) or (device_map and device_list):
+            raise ValueError("You must specify either device_map or device_list")
+
+        self.api = api
+        self.max_concurrency = max_concurrency
+
+        if device_map:
+            self.device_map: dict[str, str] = device_map
+        elif device_list:
+            self.device_map = {device_id: device_id for device_id in device_list}
+        self.device_ids: list[str] = list(self.device_map.values())
+
+    async def _gather_per_device(
+            self,
+            coroutines: dict[str, Awaitable[_T]],
+            return_exceptions: bool = False
+    ) -> dict[str, Any]:
+        """Await one coroutine per device name, at most max_concurrency at a time. A failed device does not abort the
+        others, like TuyaDeviceManager._run_in_parallel().
+
+        Returns:
+            Map of device name -> return value (or exception if return_exceptions is True), in the order of
+            coroutines.
+
+        Raises:
+            BatchRequestError: Some devices failed and return_exceptions is False.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+
+        async def run(coroutine: Awaitable[_T]) -> _T:
+            if semaphore is None:
+                return await coroutine
+            async with semaphore:
+                return await coroutine
+
+        outcomes = await asyncio.gather(
+            *(run(coroutine) for coroutine in coroutines.values()), return_exceptions=True
+        )
+        results: dict[str, Any] = {}
+        errors: dict[str, BaseException] = {}
+        for device_name, outcome in zip(coroutines.keys(), outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Request failed for device {device_name}: {outcome!r}")
+                errors[device_name] = outcome
+                if return_exceptions:
+                    results[device_name] = outcome
+            elif isinstance(outcome, BaseException):
+                # e.g. CancelledError: not a failure of the device
+                raise outcome
+            else:
+                results[device_name] = outcome
+        if errors and not return_exceptions:
+            raise BatchRequestError(results, errors)
+        return results
+
+    async def get_device_status_in_batch(self, chunk_size: int = TUYA_MAX_DEVICE_IDS) -> dict[str, Any]:
+        """Get device status for all devices in this instance in batch, in chunks of at most chunk_size devices
+        requested concurrently (at most max_concurrency at a time).
+
+        Returns:
+            API response in a dictionary.
+
+        Raises:
+            BatchRequestError: Some chunks failed.
+        """
+        return await AsyncSmartHomeDeviceAPI(self.api).get_device_list_status(
+            self.device_ids, chunk_size=chunk_size, max_concurrency=self.max_concurrency
+        )
+
+    async def get_device_log_in_batch(
+            self,
+            start_timestamp: int | float | str,
+            end_timestamp: int | float | str,
+            warn_on_empty_data: bool = False,
+            type_: int = 7,
+            return_exceptions: bool = False
+    ) -> dict[str, Any]:
+        """Get device log stored on the Tuya platform for all devices concurrently. A failed device does not abort the
+        others.
+
+        See TuyaDeviceManager.get_device_log_in_batch() for the arguments.
+
+        Returns:
+            Map of device name -> device log, or exception if the device failed and return_exceptions is True.
+
+        Raises:
+            BatchRequestError: Some devices failed and return_exceptions is False. The logs of the other devices are
+                available in its "results" attribute.
+        """
+        device_api = AsyncSmartHomeDeviceAPI(self.api)
+        return await self._gather_per_device({
+            device_name: device_api.get_device_log(
+                device_id,
+                start_timestamp=start_timestamp,
+                end_timestamp=end_timestamp,
+                device_name=device_name,
+                warn_on_empty_data=warn_on_empty_data,
+                type_=type_
+            )
+            for device_name, device_id in self.device_map.items()
+        }, return_exceptions=return_exceptions)
+
+    async def get_device_info_in_batch(
+            self,
+            include_device_status: bool = True,
+            chunk_size: int = TUYA_MAX_DEVICE_IDS
+    ) -> dict[str, Any]:
+        """Get device info in batch
+
+        Args:
+            include_device_status (bool): Include device status in the return fields. Default: True
+            chunk_size (int): Maximum number of device IDs per request, see get_device_status_in_batch().
+                Default: TUYA_MAX_DEVICE_IDS (20).
+
+        Returns:
+            API response in a dictionary.
+
+        Raises:
+            BatchRequestError: Some chunks failed.
+        """
+        return await AsyncSmartHomeDeviceAPI(self.api).get_device_list_info(
+            self.device_ids, include_device_status=include_device_status, chunk_size=chunk_size,
+            max_concurrency=self.max_concurrency
+        )
+
+    async def get_factory_info_in_batch(self, chunk_size: int = TUYA_MAX_DEVICE_IDS) -> dict[str, Any]:
+        """"Query the factory information of the devices.
+        Possible return fields are: id, uuid, sn, mac.
+
+        Args:
+            chunk_size (int): Maximum number of device IDs per request, see get_device_status_in_batch().
+                Default: TUYA_MAX_DEVICE_IDS (20).
+
+        Returns:
+            API response in a dictionary.
+
+        Raises:
+            BatchRequestError: Some chunks failed.
+        """
+        return await AsyncSmartHomeDeviceAPI(self.api).get_factory_info(
+            self.device_ids, chunk_size=chunk_size, max_concurrency=self.max_concurrency
+        )
+
+    async def send_command_in_batch(
+            self,
+            commands: list[dict[str, Any]],
+            timeout: Optional[float] = None,
+            return_exceptions: bool = True
+    ) -> dict[str, Any]:
+        """Issue standard instructions to control equipments concurrently, to at most max_concurrency devices at a
+        time. A failed device does not abort the others.
+
+        Args:
+            commands (list): issue commands.
+            timeout (Optional[float]): Deadline of the whole batch in seconds, see
+                TuyaDeviceManager.send_command_in_batch(). The commands being sent are cancelled too, but the devices
+                still fail with OutcomeUnknownError since the request may have reached the server.
+                Default: None, wait for all devices.
+            return_exceptions (bool): If True, the exception raised for a failed device is stored in the returned
+                map in place of its response. Otherwise BatchRequestError is raised after all devices have been
+                processed. Default: True.
+
+        Returns:
+            Map of device name -> API response (check its "success" field), or exception if the device failed.
+
+        Raises:
+            BatchRequestError: Some devices failed and return_exceptions is False.
+        """
+        device_api = AsyncSmartHomeDeviceAPI(self.api)
+        semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+        loop = asyncio.get_event_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        sent: set[str] = set()
+
+        async def send(device_id: str) -> dict[str, Any]:
+            if semaphore is None:
+                sent.add(device_id)
+                return await device_api.send_commands(device_id, commands)
+            async with semaphore:
+                sent.add(device_id)
+                return await device_api.send_commands(device_id, commands)
+
+        async def send_before_deadline(device_name: str, device_id: str) -> Any:
+            # The deadline includes the time waiting for the semaphore.
+            try:
+                if deadline is None:
+                    return await send(device_id)
+                return await asyncio.wait_for(send(device_id), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                if device_id not in sent:
+                    logger.error(f"Request cancelled for device {device_name}: not started after {timeout}s")
+                    return TimeoutError(f"Not started within the timeout of {timeout}s")
+                logger.error(f"Request timed out for device {device_name} after {timeout}s, outcome unknown")
+                return OutcomeUnknownError(f"Not done within the timeout of {timeout}s, it may still be applied")
+            except Exception as e:
+                logger.error(f"Request failed for device {device_name}: {e!r}")
+                return e
+
+        outcomes = await asyncio.gather(*(
+            send_before_deadline(device_name, device_id) for device_name, device_id in self.device_map.items()
+        ))
+        results = dict(zip(self.device_map.keys(), outcomes))
+        errors: dict[str, BaseException] = {
+            device_name: result for device_name, result in results.items() if isinstance(result, Exception)
+        }
+        if errors and not return_exceptions:
+            raise BatchRequestError(
+                {device_name: result for device_name, result in results.items() if device_name not in errors},
+                errors
+            )
+        return results
@@ -0,0 +1,532 @@
+"""Asyncio version of Tuya Open API. Requires the optional ``aiohttp`` package."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, Type
+
+from ..exceptions import ResponseError
+from ..jsoncodec import JSONCodec, get_json_codec
+from ..metrics import CLIENT_TUYA, RequestMetrics
+from ..retry import (RETRY_RATE_LIMIT, RETRY_TOKEN, RETRY_TRANSIENT,
+                     RetryPolicy, RetryStats)
+from ..token_store import InMemoryTokenStore, TokenStore
+from .openapi import (GET_TOKEN_API, REFRESH_TOKEN_API, TUYA_ERROR_CODES_TOKEN,
+                      TuyaTokenInfo, calculate_sign)
+from .openlogging import filter_dumps, logger
+from .ratelimit import TuyaRateLimiter, is_rate_limited
+from .signing import TuyaRequestSigner, TuyaRequestTemplate
+
+if TYPE_CHECKING:
+    import aiohttp
+
+
+class AsyncTuyaOpenAPI:
+    """Asyncio Open Api. Same as TuyaOpenAPI, except that every request method is a coroutine, so that many
+    requests can be in flight on a single event loop.
+
+    The token is obtained on the first request (or by awaiting connect() explicitly). Token refreshing is
+    single-flight: concurrent requests which find the token expired wait for one refresh instead of each
+    requesting a new token.
+
+    Typical usage example:
+
+    async with AsyncTuyaOpenAPI(ENDPOINT, ACCESS_ID, ACCESS_KEY) as openapi:
+        response = await openapi.get(f"/v1.0/devices/{device_id}")
+    """
+    def __init__(
+        self,
+        endpoint: str,
+        access_id: str,
+        access_secret: str,
+        lang: str = "en",
+        session: Optional[aiohttp.ClientSession] = None,
+        rate_limiter: Optional[TuyaRateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        token_store: Optional[TokenStore] = None,
+        json_codec: Optional[JSONCodec] = None,
+        metrics: Optional[RequestMetrics] = None
+    ):
+        """Init AsyncTuyaOpenAPI.
+
+        Args:
+            endpoint (str): Tuya endpoint, such as "https://openapi.tuyaus.com".
+            access_id (str): Client ID of the cloud project.
+            access_secret (str): Client secret of the cloud project.
+            lang (str): Language. Default: "en".
+            session (aiohttp.ClientSession): Optional session to share with other clients.
+                If not specified, a session is created on the first request and closed by close().
+            rate_limiter (Optional[TuyaRateLimiter]): Client-side rate limits, shared by all tasks using this instance.
+                Default: no limit, but frequency limit errors are still retried with backoff.
+            retry_policy (Optional[RetryPolicy]): When to retry failed requests. Default: RetryPolicy().
+            token_store (Optional[TokenStore]): Token cache shared with other clients using the same credentials,
+                e.g. FileTokenStore to share the token between processes. Within one event loop, share the
+                AsyncTuyaOpenAPI instance instead. Default: a cache private to this instance.
+            json_codec (Optional[JSONCodec]): Encodes request bodies and decodes responses.
+                Default: get_json_codec(), i.e. orjson or ujson if installed, the json module otherwise.
+            metrics (Optional[RequestMetrics]): Request metrics, possibly shared with other clients.
+                Default: metrics private to this instance.
+        """
+        self.session = session
+        self.json_codec = json_codec if json_codec is not None else get_json_codec()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else TuyaRateLimiter()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        # Number of retries per kind of failure
+        self.retry_stats = RetryStats()
+        self.metrics = metrics if metrics is not None else RequestMetrics()
+        self._owns_session = session is None
+
+        self.endpoint = endpoint
+        self.access_id = access_id
+        self.access_secret = access_secret
+        self.signer = TuyaRequestSigner(access_id, access_secret)
+        self.lang = lang
+
+        self.__login_path = GET_TOKEN_API
+        self.__refresh_token_path = REFRESH_TOKEN_API
+
+        self.token_info: TuyaTokenInfo | None = None
+        # Created lazily, so that the lock is bound to the running event loop (Python 3.7 - 3.9).
+        self._token_lock: asyncio.Lock | None = None
+        self.token_store = token_store if token_store is not None else InMemoryTokenStore()
+        self._token_key = f"tuya:{endpoint}:{access_id}"
+
+    async def __aenter__(self) -> AsyncTuyaOpenAPI:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType]
+    ) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the underlying HTTP session if it was created by this instance."""
+        if self.session is not None and self._owns_session:
+            await self.session.close()
+            self.session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self.session is None:
+            import aiohttp
+            self.session = aiohttp.ClientSession()
+        return self.session
+
+    def _get_token_lock(self) -> asyncio.Lock:
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        return self._token_lock
+
+    def _calculate_sign(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        body: Optional[Dict[str, Any] | bytes] = None,
+    ) -> Tuple[str, int]:
+        access_token = self.token_info.access_token if self.token_info is not None else ""
+        # Signed on the bytes encoded by json_codec, which are the bytes sent.
+        data = self.json_codec.dumps(body) if isinstance(body, dict) and body else body
+        return calculate_sign(self.access_id, self.access_secret, access_token, method, path, params, data)
+
+    def _need_refresh(self) -> bool:
+        if self.token_info is None:
+            return True
+        now = int(time.time() * 1000)
+        expired_time: int = self.token_info.expire_time
+        return expired_time - 60 * 1000 <= now  # 1min
+
+    async def _refresh_access_token_if_need(self, path: str) -> None:
+        if path.startswith(self.__login_path):
+            return
+
+        if path.startswith(self.__refresh_token_path):
+            return
+
+        if not self._need_refresh():
+            return
+
+        async with self._get_token_lock():
+            await self.__refresh_access_token()
+
+    async def __refresh_access_token(self) -> None:
+        # Must be called with the token lock held.
+        # Another task or client may have refreshed the token while we were waiting for the lock.
+        self._load_cached_token()
+        if not self._need_refresh():
+            return
+
+        if self.token_info is None:
+            await self._connect()
+            return
+
+        refresh_token = self.token_info.refresh_token
+        self.token_info.access_token = ""
+        try:
+            response = await self.get(
+                self.__refresh_token_path.format(refresh_token)
+            )
+        except ResponseError as e:
+            # The refresh token is expired or revoked: refreshing it again would fail forever.
+            logger.warning(f"Failed to refresh the access token, requesting a new token: {e!r}")
+            self._discard_token(refresh_token)
+            if self._need_refresh():
+                await self._connect()
+            return
+
+        self._store_token(TuyaTokenInfo(response))
+        self.metrics.record_token_refresh(CLIENT_TUYA)
+
+    def _load_cached_token(self) -> None:
+        """Use the cached token if it expires later than ours.
+
+        The token store lock is a blocking (possibly inter-process file) lock, so it is only held around the
+        synchronous load and save, never across an await: otherwise a client waiting for it would block the event
+        loop during the token request of another client.
+        """
+        with self.token_store.lock(self._token_key):
+            self._load_token()
+
+    def _discard_token(self, refresh_token: str) -> None:
+        """Forget the token whose refresh token was rejected, and remove it from the token store unless another client
+        already replaced it, in which case the new token is used.
+        """
+        with self.token_store.lock(self._token_key):
+            self.token_info = None
+            cached = self.token_store.load(self._token_key)
+            if cached is not None and cached.get("refresh_token") == refresh_token:
+                self.token_store.delete(self._token_key)
+            else:
+                self._load_token()
+
+    def _store_token(self, token_info: TuyaTokenInfo) -> None:
+        """Use a new token and cache it, unless another client cached a token expiring later while it was requested."""
+        with self.token_store.lock(self._token_key):
+            self.token_info = token_info
+            self._load_token()
+            if self.token_info is token_info:
+                self.token_store.save(self._token_key, token_info.to_dict())
+
+    def _load_token(self) -> None:
+        """Use the cached token if it expires later than ours. Must be called with the token store lock held."""
+        cached = self.token_store.load(self._token_key)
+        if cached is None:
+            return
+        token_info = TuyaTokenInfo.from_dict(cached)
+        if token_info.access_token and (
+            self.token_info is None or token_info.expire_time > self.token_info.expire_time
+        ):
+            self.token_info = token_info
+
+    async def connect(
+        self
+    ) -> Dict[str, Any]:
+        """Connect to Tuya Cloud.
+
+        Returns:
+            response: connect response
+        """
+        async with self._get_token_lock():
+            return await self._connect()
+
+    async def _connect(self) -> Dict[str, Any]:
+        # Must be called with the token lock held.
+        self.token_info = None
+        response = await self.get(
+            path=GET_TOKEN_API,
+            params={
+                "grant_type": 1
+            }
+        )
+
+        # Cache token info.
+        self._store_token(TuyaTokenInfo(response))
+        self.metrics.record_token_refresh(CLIENT_TUYA)
+
+        return response
+
+    def is_connect(self) -> bool:
+        """Whether we have an access token.
+        Note: will return true even if the access token is expired.
+        Token refreshing is handled internally.
+        """
+        return self.token_info is not None and len(self.token_info.access_token) > 0
+
+    def _build_headers(
+        self,
+        request: TuyaRequestTemplate,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, str]:
+        """Sign the request, with the parameters of the template updated with params, and build the request headers."""
+        access_token = self.token_info.access_token if self.token_info else ""
+        sign, t = self.signer.sign(access_token, request.string_to_sign(params))
+        return {
+            "client_id": self.access_id,
+            "sign": sign,
+            "sign_method": "HMAC-SHA256",
+            "access_token": access_token,
+            "t": str(t),
+            "lang": self.lang,
+        }
+
+    async def __send(
+        self,
+        request: TuyaRequestTemplate,
+        params: Optional[Dict[str, Any]],
+        headers: Dict[str, str]
+    ) -> Tuple[int, bytes, Any]:
+        """Wait for the rate limiter, then send the request and record its metrics.
+
+        Returns:
+            A tuple of (HTTP status, response body, decoded JSON or None).
+        """
+        import aiohttp
+
+        method, path = request.method, request.path
+        delay = self.rate_limiter.reserve(path)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        merged_params = request.merged_params(params)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"Request: method = {method}, "
+                f"url = {self.endpoint + path}, "
+                f"params = {merged_params}, "
+                f"body = {filter_dumps(request.body)}, "
+                f"t = {int(time.time()*1000)}"
+            )
+
+        if request.data is not None:
+            headers = dict(headers, **{"Content-Type": "application/json"})
+        sent = time.perf_counter()
+        try:
+            async with self._get_session().request(
+                method, self.endpoint + path, params=merged_params or None, data=request.data, headers=headers
+            ) as response:
+                status = response.status
+                content = await response.read()
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            self.metrics.record_request(CLIENT_TUYA, method, path, None, time.perf_counter() - sent)
+            raise
+        duration = time.perf_counter() - sent
+
+        try:
+            result = self.json_codec.loads(content)
+        except ValueError:
+            result = None
+        error_code = result.get("code") if isinstance(result, dict) and result.get("success") is False else None
+        self.metrics.record_request(CLIENT_TUYA, method, path, status, duration, len(content), error_code)
+        return status, content, result
+
+    def prepare(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        body: Optional[Dict[str, Any]] = None
+    ) -> TuyaRequestTemplate:
+        """Prepare a request, to send it with send_prepared(). See TuyaOpenAPI.prepare()."""
+        # Encoded once: the signature is calculated on the bytes which are sent.
+        data = self.json_codec.dumps(body) if body is not None else None
+        return TuyaRequestTemplate(method, path, params, data, body)
+
+    async def send_prepared(
+        self,
+        request: TuyaRequestTemplate,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Sign and send a request prepared by prepare(). See TuyaOpenAPI.send_prepared()."""
+        return await self.__request_prepared(request, params)
+
+    async def __request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        body: Optional[Dict[str, Any]] = None,
+    ) -> dict[str, Any]:
+        """Internal method to sign and send.
+        You should avoid using this method directly.
+
+        Args:
+            method (str): HTTP method
+            path (str): relative path starting with "/"
+            params (Optional[Dict[str, Any]]): HTTP parameters
+            body (Optional[Dict[str, Any]]): HTTP body
+
+        Returns:
+            JSON decoded response (a dict).
+
+        Raises:
+            ResponseError: HTTP status code and response text
+        """
+        return await self.__request_prepared(self.prepare(method, path, params, body), None)
+
+    async def __request_prepared(
+        self,
+        request: TuyaRequestTemplate,
+        params: Optional[Dict[str, Any]]
+    ) -> dict[str, Any]:
+        """Sign and send a prepared request, retrying failures according to the retry policy."""
+        import aiohttp
+
+        path = request.path
+        await self._refresh_access_token_if_need(path)
+
+        started = time.monotonic()
+        attempt = 1
+        rate_limit_attempt = 0
+        while True:
+            headers = self._build_headers(request, params)
+            status: Optional[int] = None
+            try:
+                status, content, result = await self.__send(request, params, headers)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error: BaseException = e
+                failure: Optional[str] = RETRY_TRANSIENT
+            else:
+                failure = self._classify_failure(path, status, result)
+                if failure is None:
+                    break
+
+            if failure == RETRY_RATE_LIMIT and rate_limit_attempt < self.rate_limiter.max_retries:
+                # Frequency limit errors are not caused by the token: wait for the rate limiter and send again.
+                rate_limit_attempt += 1
+                delay = self.rate_limiter.on_rate_limited(path, rate_limit_attempt)
+                self.retry_stats.increment(failure)
+                self.metrics.record_retry(CLIENT_TUYA, failure)
+                logger.warning(
+                    f"Request frequency limit exceeded, retrying in at least {delay:.1f}s: "
+                    f"path={path}, t = {int(time.time() * 1000)}"
+                )
+                continue
+
+            if failure in (RETRY_TOKEN, RETRY_TRANSIENT):
+                delay = 0.0 if failure == RETRY_TOKEN else self.retry_policy.backoff_delay(attempt)
+                if self.retry_policy.can_retry(attempt, started, delay):
+                    attempt += 1
+                    self.retry_stats.increment(failure)
+                    self.metrics.record_retry(CLIENT_TUYA, failure)
+                    logger.warning(
+                        f"Request failed ({failure}), retrying in {delay:.1f}s: "
+                        f"code={status if status is not None else error!r}, "
+                        f"body={content.decode('utf8', 'replace') if status is not None else ''}, "
+                        f"t = {int(time.time() * 1000)}"
+                    )
+                    if failure == RETRY_TOKEN:
+                        await self._reconnect(headers["access_token"])
+                    else:
+                        await asyncio.sleep(delay)
+                    continue
+
+            if status is None:
+                logger.error(f"Request failed: {error!r}")
+                raise error
+            text = content.decode("utf8", "replace")
+            logger.error(
+                f"Response error: code={status}, body={text}"
+            )
+            raise ResponseError(status, text)
+
+        response_body: dict[str, Any] = result
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Response: {filter_dumps(response_body, indent=2)}")
+
+        return response_body
+
+    def _classify_failure(self, path: str, status_code: int, result: Any) -> Optional[str]:
+        """Classify the response. See TuyaOpenAPI._classify_failure()."""
+        if self.retry_policy.is_transient_status(status_code):
+            return RETRY_TRANSIENT
+        if status_code >= 400 or not isinstance(result, dict):
+            return "fatal"
+        # Tuya returns HTTP 200 OK even if there is an error.
+        if result.get("success", False) is not False:
+            return None
+        if is_rate_limited(result):
+            return RETRY_RATE_LIMIT
+        if (
+            result.get("code") in TUYA_ERROR_CODES_TOKEN
+            and not path.startswith(self.__login_path)
+            and not path.startswith(self.__refresh_token_path)
+        ):
+            return RETRY_TOKEN
+        return "fatal"
+
+    async def _reconnect(self, stale_access_token: str) -> None:
+        """Get a new token after the server rejected stale_access_token, unless another task or client already did."""
+        async with self._get_token_lock():
+            self._load_cached_token()
+            if self.token_info is None or self.token_info.access_token == stale_access_token:
+                await self._connect()
+
+    async def get(
+        self, path: str, params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Http Get.
+
+        Requests the server to return specified resources.
+
+        Args:
+            path (str): api path
+            params (map): request parameter
+
+        Returns:
+            response: response body
+        """
+        return await self.__request("GET", path, params, None)
+
+    async def post(
+        self, path: str, body: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Http Post.
+
+        Requests the server to update specified resources.
+
+        Args:
+            path (str): api path
+            body (map): request body
+
+        Returns:
+            response: response body
+        """
+        return await self.__request("POST", path, None, body)
+
+    async def put(
+        self, path: str, body: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Http Put.
+
+        Requires the server to perform specified operations.
+
+        Args:
+            path (str): api path
+            body (map): request body
+
+        Returns:
+            response: response body
+        """
+        return await self.__request("PUT", path, None, body)
+
+    async def delete(
+        self, path: str, params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Http Delete.
+
+        Requires the server to delete specified resources.
+
+        Args:
+            path (str): api path
+            params (map): request param
+
+        Returns:
+            response: response body
+        """
+        return await self.__request("DELETE", path, params, None)
@@ -0,0 +1,99 @@
+"""Chunking of the batch device APIs, which accept a limited number of device IDs per request.
+Shared by the blocking and the asyncio device APIs.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Sequence, Union
+
+from ..exceptions import BatchRequestError
+
+TUYA_MAX_DEVICE_IDS = 20
+"""Maximum number of device IDs per request of /v1.0/devices/ and /v1.0/devices/factory-infos."""
+TUYA_MAX_DEVICE_IDS_LENGTH = 1000
+"""Maximum length of the comma separated device IDs of one request, to keep the URL short."""
+
+
+def chunk_device_ids(device_ids: Sequence[str], chunk_size: int = TUYA_MAX_DEVICE_IDS) -> list[list[str]]:
+    """Split device IDs into chunks of at most chunk_size IDs and TUYA_MAX_DEVICE_IDS_LENGTH characters once joined
+    with commas, in the same order.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+    chunks: list[list[str]] = []
+    chunk: list[str] = []
+    length = 0
+    for device_id in device_ids:
+        if chunk and (len(chunk) >= chunk_size or length + 1 + len(device_id) > TUYA_MAX_DEVICE_IDS_LENGTH):
+            chunks.append(chunk)
+            chunk = []
+        length = len(device_id) if not chunk else length + 1 + len(device_id)
+        chunk.append(device_id)
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _result_items(response: dict[str, Any]) -> list[Any]:
+    """Items of a batch response: "result" of /v1.0/devices/factory-infos, "result"/"devices" of /v1.0/devices/."""
+    result = response.get("result")
+    if isinstance(result, list):
+        return result
+    if isinstance(result, dict) and isinstance(result.get("devices"), list):
+        devices: list[Any] = result["devices"]
+        return devices
+    return []
+
+
+def merge_chunk_responses(
+        chunks: Sequence[Sequence[str]],
+        outcomes: Sequence[Union[dict[str, Any], BaseException]]
+) -> dict[str, Any]:
+    """Merge the responses of the chunks of a batch request into the response of a single request.
+
+    Args:
+        chunks (Sequence[Sequence[str]]): Device IDs of each chunk.
+        outcomes (Sequence[dict[str, Any] | BaseException]): Response of each chunk, or the exception it raised.
+
+    Returns:
+        The first response, with the items ("result" list, or "result"/"devices" list) of all chunks in the order of
+        the chunks. "total" is summed and "has_more" is true if any chunk has more. If a chunk was answered with
+        "success" false, its response is returned as is, like for a single request.
+
+    Raises:
+        BatchRequestError: Some chunks failed. Its "results" attribute maps the device IDs of the other chunks to
+            their item, and its "errors" attribute maps every device ID of the failed chunks to the exception.
+    """
+    responses = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+    errors = {
+        device_id: outcome
+        for chunk, outcome in zip(chunks, outcomes) if isinstance(outcome, BaseException)
+        for device_id in chunk
+    }
+    if errors:
+        results = {
+            item["id"]: item
+            for response in responses
+            for item in _result_items(response)
+            if isinstance(item, dict) and "id" in item
+        }
+        raise BatchRequestError(results, errors)
+
+    for response in responses:
+        if response.get("success") is False:
+            return response
+
+    merged = dict(responses[0])
+    items = [item for response in responses for item in _result_items(response)]
+    first_result = merged.get("result")
+    if isinstance(first_result, dict):
+        result = dict(first_result)
+        result["devices"] = items
+        if "total" in result:
+            result["total"] = sum(int(response["result"].get("total") or 0) for response in responses)
+        if "has_more" in result:
+            result["has_more"] = any(response["result"].get("has_more") for response in responses)
+        merged["result"] = result
+    else:
+        merged["result"] = items
+    return merged
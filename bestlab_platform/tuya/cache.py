@@ -0,0 +1,218 @@
+"""Cache of the device metadata APIs (specification, functions, factory information), whose responses practically
+never change. See SmartHomeDeviceAPI.
+"""
+
+from __future__ import annotations
+
+import copy
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from ..jsoncodec import JSONCodec, get_json_codec
+from .openlogging import logger
+
+SPECIFICATION = "specification"
+"""Endpoint name of SmartHomeDeviceAPI.get_device_specification(), cached by device ID."""
+FUNCTIONS = "functions"
+"""Endpoint name of SmartHomeDeviceAPI.get_device_functions(), cached by device ID."""
+CATEGORY_FUNCTIONS = "category_functions"
+"""Endpoint name of SmartHomeDeviceAPI.get_category_functions(), cached by category ID."""
+FACTORY_INFO = "factory_info"
+"""Endpoint name of SmartHomeDeviceAPI.get_factory_info(), cached by device ID (one item of the result each)."""
+
+DEFAULT_TTLS: dict[str, float] = {
+    SPECIFICATION: 24 * 3600,
+    FUNCTIONS: 24 * 3600,
+    CATEGORY_FUNCTIONS: 7 * 24 * 3600,
+    FACTORY_INFO: 7 * 24 * 3600,
+}
+"""Default time to live in seconds of each endpoint."""
+
+# (expiry as a unix timestamp, value)
+_Entry = Tuple[float, Any]
+
+
+class MetadataCache:
+    """In-memory LRU cache with a time to live per endpoint, optionally persisted to a JSON file.
+
+    Entries are keyed by (endpoint name, device or category ID). Values are copied in and out, so callers may modify
+    the responses they get. Thread-safe.
+
+    With a path, the cache is loaded from the file when created and the file is rewritten after every change, so that
+    metadata fetched by one run is reused by the next runs and by other processes started later. Processes writing the
+    same file concurrently may drop each other's entries, which are then fetched again.
+
+    Example:
+        cache = MetadataCache(path=os.path.expanduser("~/.cache/bestlab_tuya_metadata.json"))
+        device_api = SmartHomeDeviceAPI(tuya_api, cache=cache)
+        device_api.get_device_specification(device_id)  # request
+        device_api.get_device_specification(device_id)  # no request
+        cache.invalidate(SPECIFICATION, device_id)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        ttls: Optional[dict[str, float]] = None,
+        default_ttl: float = 24 * 3600,
+        path: Optional[str] = None,
+        json_codec: Optional[JSONCodec] = None
+    ):
+        """Init MetadataCache.
+
+        Args:
+            max_entries (int): Maximum number of entries. The least recently used entries are evicted beyond it.
+                Default: 4096.
+            ttls (Optional[dict[str, float]]): Time to live in seconds by endpoint name, updating DEFAULT_TTLS.
+                A TTL of 0 disables the cache of the endpoint.
+            default_ttl (float): Time to live in seconds of the endpoints not in DEFAULT_TTLS or ttls.
+                Default: one day.
+            path (Optional[str]): JSON file persisting the cache. Default: None, memory only.
+            json_codec (Optional[JSONCodec]): Serializes the file. Default: get_json_codec().
+        """
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be at least 1, got {max_entries}")
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.default_ttl = default_ttl
+        self.path = path
+        self.json_codec = json_codec if json_codec is not None else get_json_codec()
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        self._lock = threading.RLock()
+        if path is not None:
+            self._load()
+
+    def ttl(self, endpoint: str) -> float:
+        """Time to live in seconds of the entries of an endpoint."""
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def get(self, endpoint: str, key: str) -> Optional[Any]:
+        """Get a copy of a cached value.
+
+        Args:
+            endpoint (str): Endpoint name, e.g. SPECIFICATION.
+            key (str): Device or category ID.
+
+        Returns:
+            The value, or None if it is not cached or expired.
+        """
+        with self._lock:
+            entry = self._entries.get((endpoint, key))
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[(endpoint, key)]
+                self.misses += 1
+                return None
+            self._entries.move_to_end((endpoint, key))
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def set(self, endpoint: str, key: str, value: Any) -> None:
+        """Cache a copy of a value for the TTL of the endpoint. Ignored if the TTL is 0.
+
+        Args:
+            endpoint (str): Endpoint name, e.g. SPECIFICATION.
+            key (str): Device or category ID.
+            value (Any): Value encodable to JSON.
+        """
+        self.set_many(endpoint, {key: value})
+
+    def set_many(self, endpoint: str, values: dict[str, Any]) -> None:
+        """Cache a copy of several values of an endpoint, writing the file once. Ignored if the TTL is 0.
+
+        Args:
+            endpoint (str): Endpoint name, e.g. FACTORY_INFO.
+            values (dict[str, Any]): Map of device or category ID -> value encodable to JSON.
+        """
+        ttl = self.ttl(endpoint)
+        if ttl <= 0 or not values:
+            return
+        expiry = time.time() + ttl
+        with self._lock:
+            for key, value in values.items():
+                self._entries[(endpoint, key)] = (expiry, copy.deepcopy(value))
+                self._entries.move_to_end((endpoint, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def invalidate(self, endpoint: Optional[str] = None, key: Optional[str] = None) -> int:
+        """Remove entries, e.g. after a firmware update changed the DPs of a device.
+
+        Args:
+            endpoint (Optional[str]): Only remove the entries of this endpoint. Default: all endpoints.
+            key (Optional[str]): Only remove the entries of this device or category ID. Default: all IDs.
+
+        Returns:
+            Number of removed entries.
+        """
+        with self._lock:
+            removed = [
+                entry_key for entry_key in self._entries
+                if (endpoint is None or entry_key[0] == endpoint) and (key is None or entry_key[1] == key)
+            ]
+            for entry_key in removed:
+                del self._entries[entry_key]
+            if removed:
+                self._save()
+        return len(removed)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _load(self) -> None:
+        assert self.path is not None
+        try:
+            with open(self.path, "rb") as f:
+                entries = self.json_codec.loads(f.read())["entries"]
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # Corrupted cache: the metadata will be fetched again.
+            logger.warning(f"Ignoring unreadable metadata cache {self.path}: {e!r}")
+            return
+        if not isinstance(entries, list):
+            logger.warning(f"Ignoring unreadable metadata cache {self.path}: entries is not a list")
+            return
+        now = time.time()
+        skipped = 0
+        # Entries are stored from the least to the most recently used.
+        for entry in entries:
+            try:
+                endpoint, key, expiry, value = entry
+                if not isinstance(endpoint, str) or not isinstance(key, str):
+                    raise TypeError(f"invalid key {endpoint!r}, {key!r}")
+                if float(expiry) > now:
+                    self._entries[(endpoint, key)] = (float(expiry), value)
+            except (ValueError, TypeError):
+                skipped += 1
+        if skipped:
+            logger.warning(f"Ignored {skipped} invalid entries of the metadata cache {self.path}")
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        data = self.json_codec.dumps({
+            "entries": [[endpoint, key, expiry, value] for (endpoint, key), (expiry, value) in self._entries.items()]
+        })
+        directory = os.path.dirname(os.path.abspath(self.path))
+        # Write to a temporary file and rename it, so that readers never see a partially written file.
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".metadata-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
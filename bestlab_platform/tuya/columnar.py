@@ -0,0 +1,151 @@
+"""Columnar (NumPy/pandas) conversion of Tuya device logs. Requires the optional ``numpy`` and ``pandas`` packages."""
+
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# DP type -> NumPy conversion. See "type" of the status set in get_device_specification().
+# https://developer.tuya.com/en/docs/iot/datatypedescription?id=K9i5ql2jo7j1k
+DP_TYPE_BOOLEAN = "Boolean"
+DP_TYPE_INTEGER = "Integer"
+DP_TYPE_BITMAP = "Bitmap"
+
+# DP code -> (DP type, scale). Integer values are divided by 10 ** scale.
+DPTypes = Dict[str, Tuple[str, int]]
+
+
+def dp_types_from_specification(specification: dict[str, Any]) -> DPTypes:
+    """Get the type of every DP code from a get_device_specification() response.
+
+    Args:
+        specification (dict[str, Any]): Response of SmartHomeDeviceAPI.get_device_specification().
+
+    Returns:
+        Map of DP code -> (DP type, scale), e.g. {"va_temperature": ("Integer", 1), "pir": ("Enum", 0)}.
+    """
+    result = specification.get("result") or {}
+    dp_types: DPTypes = {}
+    # The status set describes the reported values; functions only complete it.
+    for dp in (result.get("functions") or []) + (result.get("status") or []):
+        values = dp.get("values") or "{}"
+        try:
+            properties = json.loads(values) if isinstance(values, str) else values
+            scale = int(properties.get("scale", 0)) if isinstance(properties, dict) else 0
+        except ValueError:
+            scale = 0
+        dp_types[dp["code"]] = (dp.get("type", ""), scale)
+    return dp_types
+
+
+def _convert_values(values: list[Any], dp_type: Optional[Tuple[str, int]]) -> np.ndarray[Any, Any]:
+    """Convert the values of one DP code in one vectorized operation. Falls back to type inference, then to an
+    object array, if the values do not match the type.
+    """
+    import numpy as np
+
+    strings = np.asarray([str(value) for value in values]) if values else np.asarray([], dtype=str)
+    if dp_type is not None:
+        type_, scale = dp_type
+        try:
+            if type_ == DP_TYPE_BOOLEAN:
+                lowered = np.char.lower(strings)
+                if np.isin(lowered, ("true", "false")).all():
+                    booleans: np.ndarray[Any, Any] = lowered == "true"
+                    return booleans
+            elif type_ in (DP_TYPE_INTEGER, DP_TYPE_BITMAP):
+                integers = strings.astype(np.int64)
+                return integers / 10 ** scale if type_ == DP_TYPE_INTEGER and scale else integers
+            else:
+                # Enum, String, Json, Raw
+                return np.asarray(values, dtype=object)
+        except ValueError:
+            pass
+
+    # Unknown type: int64, float64, bool or object, whichever fits all values.
+    for dtype in (np.int64, np.float64):
+        try:
+            return strings.astype(dtype)
+        except ValueError:
+            pass
+    lowered = np.char.lower(strings)
+    if len(strings) and np.isin(lowered, ("true", "false")).all():
+        inferred_booleans: np.ndarray[Any, Any] = lowered == "true"
+        return inferred_booleans
+    return np.asarray(values, dtype=object)
+
+
+def device_log_to_arrays(
+        device_log: Iterable[dict[str, Any]],
+        dp_types: Optional[DPTypes] = None
+) -> dict[str, dict[str, np.ndarray[Any, Any]]]:
+    """Convert the device log of one device to NumPy arrays per DP code, in ascending order of event_time.
+
+    Args:
+        device_log (Iterable[dict[str, Any]]):
+            Device log records as returned by SmartHomeDeviceAPI.get_device_log().
+        dp_types (Optional[DPTypes]):
+            DP types from dp_types_from_specification(). Codes without a type are converted to int64, float64 or bool
+            if all their values fit, and kept as objects (str) otherwise.
+
+    Returns:
+        Map of DP code -> {"event_time": int64 array in milliseconds, "value": typed array}.
+    """
+    import numpy as np
+
+    # Single pass over the records, then one vectorized conversion per code.
+    times: dict[str, list[int]] = {}
+    values: dict[str, list[Any]] = {}
+    for record in device_log:
+        code = record["code"]
+        if code not in times:
+            times[code] = []
+            values[code] = []
+        times[code].append(int(record["event_time"]))
+        values[code].append(record["value"])
+
+    arrays: dict[str, dict[str, np.ndarray[Any, Any]]] = {}
+    for code, code_times in times.items():
+        event_time = np.asarray(code_times, dtype=np.int64)
+        value = _convert_values(values[code], dp_types.get(code) if dp_types else None)
+        order = np.argsort(event_time, kind="stable")
+        arrays[code] = {"event_time": event_time[order], "value": value[order]}
+    return arrays
+
+
+def device_logs_to_dataframe(
+        device_logs: dict[str, Iterable[dict[str, Any]]],
+        dp_types: Optional[dict[str, DPTypes]] = None
+) -> pd.DataFrame:
+    """Pivot the device logs of several devices into one DataFrame.
+
+    Args:
+        device_logs (dict[str, Iterable[dict[str, Any]]]):
+            Map of device name -> device log, as returned by TuyaDeviceManager.get_device_log_in_batch().
+        dp_types (Optional[dict[str, DPTypes]]):
+            Map of device name -> DP types. See device_log_to_arrays().
+
+    Returns:
+        A DataFrame indexed by event_time (UTC datetime64), with one column per (device name, DP code).
+        Cells are NaN where a device did not report the code at that time. If a code is reported several times with
+        the same event_time, the last record is kept.
+    """
+    import pandas as pd
+
+    columns: dict[Tuple[str, str], pd.Series[Any]] = {}
+    for device_name, device_log in device_logs.items():
+        arrays = device_log_to_arrays(device_log, dp_types.get(device_name) if dp_types else None)
+        for code, code_arrays in arrays.items():
+            index = pd.DatetimeIndex(pd.to_datetime(code_arrays["event_time"], unit="ms", utc=True), name="event_time")
+            series = pd.Series(code_arrays["value"], index=index)
+            columns[(device_name, code)] = series[~series.index.duplicated(keep="last")]
+
+    if not columns:
+        return pd.DataFrame(index=pd.DatetimeIndex([], tz="UTC", name="event_time"))
+    dataframe = pd.concat(columns, axis=1, sort=True).sort_index()
+    dataframe.columns.names = ["device", "code"]
+    return dataframe
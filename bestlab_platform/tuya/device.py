@@ -2,10 +2,84 @@
 
 from __future__ import annotations
 
-from typing import Any, Iterator, Optional
-
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional
+
+from ..exceptions import BatchRequestError, OutcomeUnknownError
+from ..records import compact_device_log
+from .batch import TUYA_MAX_DEVICE_IDS, chunk_device_ids, merge_chunk_responses
+from .cache import (CATEGORY_FUNCTIONS, FACTORY_INFO, FUNCTIONS, SPECIFICATION,
+                    MetadataCache)
+from .columnar import (DPTypes, device_log_to_arrays, device_logs_to_dataframe,
+                       dp_types_from_specification)
 from .openapi import TuyaOpenAPI
 from .openlogging import logger
+from .polling import PollSchedule, StatusChange, StatusSnapshot
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+
+def _to_millisecond_timestamp(timestamp: int | float | str) -> int:
+    """Convert a 10 digit or 13 digit unix timestamp to milliseconds."""
+    value = float(timestamp)
+    if value < 1e11:
+        value *= 1000
+    return int(value)
+
+
+def _split_time_range(
+        start_timestamp: int | float | str,
+        end_timestamp: int | float | str,
+        num_windows: int
+) -> list[tuple[int, int]]:
+    """Split [start_timestamp, end_timestamp] into at most num_windows adjacent, non-overlapping windows in
+    milliseconds. Both ends of a window are inclusive.
+    """
+    start = _to_millisecond_timestamp(start_timestamp)
+    end = _to_millisecond_timestamp(end_timestamp)
+    num_windows = max(1, min(num_windows, end - start + 1))
+    span = (end - start + 1) / num_windows
+    bounds = [start + int(span * i) for i in range(num_windows)] + [end + 1]
+    return [(bounds[i], bounds[i + 1] - 1) for i in range(num_windows)]
+
+
+def _stitch_windows(window_logs: list[list[Any]]) -> list[Any]:
+    """Concatenate device logs of adjacent time windows (given in ascending time order) into one list,
+    ordered the same way as the API orders the records within a window, with duplicates at the window boundaries
+    removed.
+    """
+    # Detect whether the API returns the records in ascending or descending order of event_time
+    descending = False
+    for logs in window_logs:
+        if logs and logs[0]["event_time"] != logs[-1]["event_time"]:
+            descending = logs[0]["event_time"] > logs[-1]["event_time"]
+            break
+    if descending:
+        window_logs = window_logs[::-1]
+
+    device_logs: list[Any] = []
+    for logs in window_logs:
+        skip = 0
+        if device_logs:
+            # Records at the boundary may be returned for both windows.
+            boundary_time = device_logs[-1]["event_time"]
+            boundary_records = set()
+            for record in reversed(device_logs):
+                if record["event_time"] != boundary_time:
+                    break
+                boundary_records.add(repr(sorted(record.items())))
+            while (
+                skip < len(logs)
+                and logs[skip]["event_time"] == boundary_time
+                and repr(sorted(logs[skip].items())) in boundary_records
+            ):
+                skip += 1
+        device_logs.extend(logs[skip:])
+    return device_logs
 
 
 class SmartHomeDeviceAPI:
@@ -18,8 +92,28 @@ class SmartHomeDeviceAPI:
         print(device_api.get_device_status("YOUR_DEVICE_ID_HERE"))
     """
 
-    def __init__(self, api: TuyaOpenAPI):
+    def __init__(self, api: TuyaOpenAPI, cache: Optional[MetadataCache] = None):
+        """Init SmartHomeDeviceAPI.
+
+        Args:
+            api (TuyaOpenAPI): API client.
+            cache (Optional[MetadataCache]): Cache of the successful responses of get_device_specification(),
+                get_device_functions(), get_category_functions() and get_factory_info(). Share one cache between
+                instances. Default: None, always request.
+        """
         self.api = api
+        self.cache = cache
+
+    def _get_cached(self, endpoint: str, key: str, path: str) -> dict[str, Any]:
+        """GET path, or use the cached response of (endpoint, key)."""
+        if self.cache is None:
+            return self.api.get(path)
+        response: Optional[dict[str, Any]] = self.cache.get(endpoint, key)
+        if response is None:
+            response = self.api.get(path)
+            if response.get("success"):
+                self.cache.set(endpoint, key, response)
+        return response
 
     def get_device_info(self, device_id: str, include_device_status: bool = True) -> dict[str, Any]:
         """Get device details, including properties and the latest status of the device.
@@ -36,17 +130,58 @@ class SmartHomeDeviceAPI:
             response["result"].pop("status")
         return response
 
-    def get_device_list_info(self, device_ids: list[str], include_device_status: bool = True) -> dict[str, Any]:
+    def _get_in_chunks(
+            self,
+            path: str,
+            device_ids: list[str],
+            chunk_size: int,
+            max_workers: int
+    ) -> dict[str, Any]:
+        """GET a batch API accepting a limited number of device IDs, in chunks requested in parallel, and merge the
+        responses into the response of a single request. See batch.merge_chunk_responses().
+
+        Raises:
+            BatchRequestError: Some chunks failed.
+        """
+        chunks = chunk_device_ids(device_ids, chunk_size)
+        if len(chunks) <= 1:
+            return self.api.get(path, {"device_ids": ",".join(device_ids)})
+
+        outcomes: list[dict[str, Any] | BaseException] = []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+            futures = [executor.submit(self.api.get, path, {"device_ids": ",".join(chunk)}) for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                try:
+                    outcomes.append(future.result())
+                except Exception as e:
+                    logger.error(f"Request failed for devices {','.join(chunk)}: {e!r}")
+                    outcomes.append(e)
+        return merge_chunk_responses(chunks, outcomes)
+
+    def get_device_list_info(
+            self,
+            device_ids: list[str],
+            include_device_status: bool = True,
+            chunk_size: int = TUYA_MAX_DEVICE_IDS,
+            max_workers: int = 4
+    ) -> dict[str, Any]:
         """Get device info for a list of devices.
 
         Args:
             device_ids (list[str]): a list of device ids.
             include_device_status: Include device status in the return fields. Default: True
+            chunk_size (int): Maximum number of device IDs per request. Longer lists are split into chunks requested
+                in parallel, and the responses merged. Default: TUYA_MAX_DEVICE_IDS (20), the limit of the API.
+            max_workers (int): Maximum number of chunks requested at the same time. Default: 4.
 
         Returns:
             API Response in a dictionary.
+
+        Raises:
+            BatchRequestError: Some chunks failed. The info of the devices of the other chunks is available in its
+                "results" attribute, by device ID.
         """
-        response = self.api.get("/v1.0/devices/", {"device_ids": ",".join(device_ids)})
+        response = self._get_in_chunks("/v1.0/devices/", device_ids, chunk_size, max_workers)
         if response["success"] and not include_device_status:
             for info in response["result"]["devices"]:
                 info.pop("status")
@@ -66,16 +201,27 @@ class SmartHomeDeviceAPI:
         response["result"] = response["result"]["status"]
         return response
 
-    def get_device_list_status(self, device_ids: list[str]) -> dict[str, Any]:
+    def get_device_list_status(
+            self,
+            device_ids: list[str],
+            chunk_size: int = TUYA_MAX_DEVICE_IDS,
+            max_workers: int = 4
+    ) -> dict[str, Any]:
         """Get device status for a list of devices.
 
         Args:
             device_ids (list[str]): List of Device IDs.
+            chunk_size (int): See get_device_list_info().
+            max_workers (int): See get_device_list_info().
 
         Returns:
             API Response in a dictionary.
+
+        Raises:
+            BatchRequestError: Some chunks failed. The info of the devices of the other chunks is available in its
+                "results" attribute, by device ID.
         """
-        response = self.api.get("/v1.0/devices/", {"device_ids": ",".join(device_ids)})
+        response = self._get_in_chunks("/v1.0/devices/", device_ids, chunk_size, max_workers)
         status_list = []
         if response["success"]:
             for info in response["result"]["devices"]:
@@ -84,19 +230,52 @@ class SmartHomeDeviceAPI:
         response["result"] = status_list
         return response
 
-    def get_factory_info(self, device_ids: list[str]) -> dict[str, Any]:
+    def get_factory_info(
+            self,
+            device_ids: list[str],
+            chunk_size: int = TUYA_MAX_DEVICE_IDS,
+            max_workers: int = 4
+    ) -> dict[str, Any]:
         """Query the factory information of the device.
         Possible return fields are: id, uuid, sn, mac.
 
         Args:
             device_ids (list[str]): List of Device IDs.
+            chunk_size (int): See get_device_list_info().
+            max_workers (int): See get_device_list_info().
 
         Returns:
             API Response in a dictionary.
+
+        Raises:
+            BatchRequestError: Some chunks failed. The factory information of the devices of the other chunks is
+                available in its "results" attribute, by device ID.
         """
-        return self.api.get(
-            "/v1.0/devices/factory-infos", {"device_ids": ",".join(device_ids)}
-        )
+        if self.cache is None:
+            return self._get_in_chunks("/v1.0/devices/factory-infos", device_ids, chunk_size, max_workers)
+
+        # Only request the devices which are not cached, and cache each device separately.
+        cached = {}
+        for device_id in device_ids:
+            info = self.cache.get(FACTORY_INFO, device_id)
+            if info is not None:
+                cached[device_id] = info
+        missing = [device_id for device_id in device_ids if device_id not in cached]
+        if not missing:
+            return {"success": True, "result": [cached[device_id] for device_id in device_ids],
+                    "t": int(time.time() * 1000)}
+
+        response = self._get_in_chunks("/v1.0/devices/factory-infos", missing, chunk_size, max_workers)
+        if not response.get("success"):
+            return response
+        fetched = {info["id"]: info for info in response["result"]}
+        self.cache.set_many(FACTORY_INFO, fetched)
+        # Devices unknown to the server are not in the result.
+        response["result"] = [
+            cached[device_id] if device_id in cached else fetched[device_id]
+            for device_id in device_ids if device_id in cached or device_id in fetched
+        ]
+        return response
 
     # def factory_reset(self, device_id: str) -> dict[str, Any]:
     #     return self.api.post(f"/v1.0/devices/{device_id}/reset-factory")
@@ -113,7 +292,7 @@ class SmartHomeDeviceAPI:
         Returns:
             API Response in a dictionary.
         """
-        return self.api.get(f"/v1.0/devices/{device_id}/functions")
+        return self._get_cached(FUNCTIONS, device_id, f"/v1.0/devices/{device_id}/functions")
 
     def get_category_functions(self, category_id: str) -> dict[str, Any]:
         """Query the instruction set supported by Tuya Platform in the given category.
@@ -128,7 +307,7 @@ class SmartHomeDeviceAPI:
         Returns:
             API Response in a dictionary.
         """
-        return self.api.get(f"/v1.0/functions/{category_id}")
+        return self._get_cached(CATEGORY_FUNCTIONS, category_id, f"/v1.0/functions/{category_id}")
 
     # https://developer.tuya.com/en/docs/cloud/device-control?id=K95zu01ksols7#title-27-Get%20the%20specifications%20and%20properties%20of%20the%20device%2C%20including%20the%20instruction%20set%20and%20status%20set
     def get_device_specification(self, device_id: str) -> dict[str, str]:
@@ -140,7 +319,18 @@ class SmartHomeDeviceAPI:
         Returns:
             API Response in a dictionary.
         """
-        return self.api.get(f"/v1.0/devices/{device_id}/specifications")
+        return self._get_cached(SPECIFICATION, device_id, f"/v1.0/devices/{device_id}/specifications")
+
+    def get_dp_types(self, device_id: str) -> DPTypes:
+        """Get the type of every DP code of the device, from its specification.
+
+        Args:
+            device_id (str): Device ID.
+
+        Returns:
+            Map of DP code -> (DP type, scale). See columnar.dp_types_from_specification().
+        """
+        return dp_types_from_specification(self.get_device_specification(device_id))
 
     # def get_device_stream_allocate(
     #     self, device_id: str, stream_type: Literal["flv", "hls", "rtmp", "rtsp"]
@@ -190,9 +380,11 @@ class SmartHomeDeviceAPI:
             device_id (str):
                 Device ID.
             start_time (int | float | str):
-                Start timestamp for log to be queried. Note that free version of Tuya only keeps one week's data.
+                Start timestamp for log to be queried, 10 digit (seconds) or 13 digit (milliseconds). Note that free
+                version of Tuya only keeps one week's data.
             end_time (int | float | str):
-                End timestamp for log to be queried. Note that free version of Tuya only keeps one week's data.
+                End timestamp for log to be queried, 10 digit (seconds) or 13 digit (milliseconds). Note that free
+                version of Tuya only keeps one week's data.
             size (int):
                 Page size. Although not documented anywhere, Tuya's limit for page size is <= 100.
             type_ (int):
@@ -204,13 +396,16 @@ class SmartHomeDeviceAPI:
         Returns:
             An iterator which produces one page's result each time. Stops when there are no more pages.
         """
+        # Tuya expects 13 digit timestamps: normalize here so that every path sends the same request.
         params = {
             "type": type_,
-            "start_time": str(start_time),
-            "end_time": str(end_time),
+            "start_time": str(_to_millisecond_timestamp(start_time)),
+            "end_time": str(_to_millisecond_timestamp(end_time)),
             "size": size
         }
-        first_page = self.api.get(path=f"/v1.0/devices/{device_id}/logs", params=params)
+        # Only start_row_key changes between pages: the request is prepared once.
+        request = self.api.prepare("GET", f"/v1.0/devices/{device_id}/logs", params)
+        first_page = self.api.send_prepared(request)
 
         # Warn on empty result if warn_on_empty_data = True
         if warn_on_empty_data and not first_page["result"]["logs"]:
@@ -222,15 +417,16 @@ class SmartHomeDeviceAPI:
             flag = True
             current_page = first_page
             while flag:
-                params["start_row_key"] = current_page["result"]["next_row_key"]
-                next_page = self.api.get(path=f"/v1.0/devices/{device_id}/logs", params=params)
+                next_page = self.api.send_prepared(
+                    request, {"start_row_key": current_page["result"]["next_row_key"]}
+                )
                 yield next_page["result"]["logs"]
 
                 current_page = next_page
                 if not current_page["result"]["has_next"]:
                     flag = False
 
-    def get_device_log(
+    def iter_device_log(
             self,
             device_id: str,
             start_timestamp: int | float | str,
@@ -238,17 +434,21 @@ class SmartHomeDeviceAPI:
             device_name: Optional[str] = None,
             warn_on_empty_data: bool = False,
             type_: int = 7
-    ) -> list[Any]:
-        """Get device log stored on the Tuya platform. Note that free version of Tuya Platform only stores 7 days' data.
+    ) -> Iterator[dict[str, Any]]:
+        """Iterate over device log records stored on the Tuya platform, one record at a time.
+        Pages are requested lazily, so records can be processed (e.g. written to storage) while they are fetched
+        without holding the entire log in memory.
 
         Args:
             device_id (str):
                 Device ID.
             start_timestamp (int | float | str):
-                Start timestamp for log to be queried. Must be an 10 digit or 13 digit unix timestamp.
+                Start timestamp for log to be queried. Must be an 10 digit or 13 digit unix timestamp,
+                seconds are converted to milliseconds.
                 Note that free version of Tuya only keeps one week's data.
             end_timestamp (int | float | str):
-                End timestamp for log to be queried. Must be an 10 digit or 13 digit unix timestamp
+                End timestamp for log to be queried. Must be an 10 digit or 13 digit unix timestamp,
+                seconds are converted to milliseconds.
                 Note that free version of Tuya only keeps one week's data.
             device_name (str):
                 User friendly name for your convenience. It can be any string you like, such as "PIR3"
@@ -260,13 +460,12 @@ class SmartHomeDeviceAPI:
                 See https://developer.tuya.com/en/docs/cloud/device-management?id=K9g6rfntdz78a#sjlx1
 
         Returns:
-            A list of device logs. Note that the return type is not a dictionary and is not the raw response, because
-            multiple page is expected.
+            An iterator of device log records, in the order returned by the API.
         """
         result_device_name = device_name if device_name else device_id
         logger.info(f"Start fetching historical data for device {result_device_name}")
         page_num = 1
-        device_logs: list[Any] = []
+        is_empty = True
         for page in self._yield_device_log_page(
                 device_id,
                 start_timestamp,
@@ -276,65 +475,334 @@ class SmartHomeDeviceAPI:
         ):
             logger.info(f"Fetched historical data for device {result_device_name}, page {page_num}")
             page_num += 1
-            device_logs = device_logs + page
+            if page:
+                is_empty = False
+            yield from page
+
+        # Warn on empty result if warn_on_empty_data = True
+        if warn_on_empty_data and is_empty:
+            logger.warning(f"Detected empty result for device {str(result_device_name)}")
+
+    def get_device_log(
+            self,
+            device_id: str,
+            start_timestamp: int | float | str,
+            end_timestamp: int | float | str,
+            device_name: Optional[str] = None,
+            warn_on_empty_data: bool = False,
+            type_: int = 7,
+            num_windows: int = 1,
+            compact: bool = False
+    ) -> list[Any]:
+        """Get device log stored on the Tuya platform. Note that free version of Tuya Platform only stores 7 days' data.
+
+        Args:
+            device_id (str):
+                Device ID.
+            start_timestamp (int | float | str):
+                Start timestamp for log to be queried. Must be an 10 digit or 13 digit unix timestamp,
+                seconds are converted to milliseconds.
+                Note that free version of Tuya only keeps one week's data.
+            end_timestamp (int | float | str):
+                End timestamp for log to be queried. Must be an 10 digit or 13 digit unix timestamp,
+                seconds are converted to milliseconds.
+                Note that free version of Tuya only keeps one week's data.
+            device_name (str):
+                User friendly name for your convenience. It can be any string you like, such as "PIR3"
+            warn_on_empty_data (bool):
+                If True, print a warning message to the logger an empty page or empty final result is detected.
+                Default: False.
+            type_ (int):
+                Usually this field should be 7 ("the actual data" from the device), unless you want something else.
+                See https://developer.tuya.com/en/docs/cloud/device-management?id=K9g6rfntdz78a#sjlx1
+            num_windows (int):
+                Split the time range into this many sub-windows and fetch them in parallel threads. Since pages of
+                one window must be requested one after another, this cuts the time needed for devices with a lot of
+                data. The result is the same as with a single window. Default: 1.
+            compact (bool):
+                If True, return records.TuyaLogRecord tuples with interned strings instead of dicts, which take much
+                less memory for long logs. Default: False.
+
+        Returns:
+            A list of device logs. Note that the return type is not a dictionary and is not the raw response, because
+            multiple page is expected.
+        """
+        if num_windows <= 1:
+            records = self.iter_device_log(
+                device_id,
+                start_timestamp,
+                end_timestamp,
+                device_name=device_name,
+                warn_on_empty_data=warn_on_empty_data,
+                type_=type_
+            )
+            # Records are converted page by page: the dicts of the whole log are never held at the same time.
+            return compact_device_log(device_id, records) if compact else list(records)
+
+        result_device_name = device_name if device_name else device_id
+
+        def fetch_window(window: tuple[int, int]) -> list[Any]:
+            return list(self.iter_device_log(
+                device_id,
+                window[0],
+                window[1],
+                device_name=f"{result_device_name} (window {window[0]} - {window[1]})",
+                type_=type_
+            ))
+
+        windows = _split_time_range(start_timestamp, end_timestamp, num_windows)
+        with ThreadPoolExecutor(max_workers=len(windows)) as executor:
+            window_logs = list(executor.map(fetch_window, windows))
+
+        device_logs = _stitch_windows(window_logs)
 
         # Warn on empty result if warn_on_empty_data = True
         if warn_on_empty_data and not device_logs:
             logger.warning(f"Detected empty result for device {str(result_device_name)}")
 
-        return device_logs
+        return compact_device_log(device_id, device_logs) if compact else device_logs
+
+    def get_device_log_arrays(
+            self,
+            device_id: str,
+            start_timestamp: int | float | str,
+            end_timestamp: int | float | str,
+            device_name: Optional[str] = None,
+            type_: int = 7,
+            num_windows: int = 1,
+            typed: bool = True
+    ) -> dict[str, dict[str, np.ndarray[Any, Any]]]:
+        """Get device log as NumPy arrays per DP code. Requires numpy.
+
+        Args:
+            device_id (str):
+                Device ID.
+            start_timestamp (int | float | str):
+                See get_device_log().
+            end_timestamp (int | float | str):
+                See get_device_log().
+            device_name (str):
+                See get_device_log().
+            type_ (int):
+                See get_device_log().
+            num_windows (int):
+                See get_device_log().
+            typed (bool):
+                If True, convert the values according to the DP types in the device specification (one more
+                request). Otherwise the types are inferred from the values. Default: True.
+
+        Returns:
+            Map of DP code -> {"event_time": int64 array in milliseconds, "value": typed array}, in ascending order of
+            event_time.
+        """
+        dp_types = self.get_dp_types(device_id) if typed else None
+        device_log = self.get_device_log(
+            device_id, start_timestamp, end_timestamp, device_name=device_name, type_=type_, num_windows=num_windows
+        )
+        return device_log_to_arrays(device_log, dp_types)
 
 
 class TuyaDeviceManager:
     """Manages multiple devices and provides functions to call APIs for all devices in batch
     Note: This is different from upstream Tuya SDK.
+
+    Args:
+        api (TuyaOpenAPI): API client.
+        device_map (dict[str, str]): Map of device name -> device id.
+        device_list (list[str]): List of device ids. Specify either device_map or device_list.
+        cache (Optional[MetadataCache]): Cache of the device metadata, see SmartHomeDeviceAPI. Default: None.
     """
 
     def __init__(
         self,
         api: TuyaOpenAPI,
         device_map: Optional[dict[str, str]] = None,
-        device_list: Optional[list[str]] = None
+        device_list: Optional[list[str]] = None,
+        cache: Optional[MetadataCache] = None
     ):
         if (not device_map and not device_list) or (device_map and device_list):
             raise ValueError("You mut specify either device_map or device_list")
 
         self.api = api
+        self.cache = cache
 
         if device_map:
             self.device_map: dict[str, str] = device_map
-            self.device_idsL: list[str] = list(device_map.values())
         elif device_list:
-            self.device_map: dict[str, str] = {device_id: device_id for device_id in device_list}  # type: ignore
-            self.device_ids: list[str] = device_list
+            self.device_map = {device_id: device_id for device_id in device_list}
         else:
             raise ValueError("You must specify either device_map or device_list")
+        self.device_ids: list[str] = list(self.device_map.values())
 
-    def get_device_status_in_batch(self) -> dict[str, Any]:
+    def get_device_status_in_batch(
+            self,
+            chunk_size: int = TUYA_MAX_DEVICE_IDS,
+            max_workers: int = 4
+    ) -> dict[str, Any]:
         """Get device status for all devices in this instance in batch
 
+        Args:
+            chunk_size (int): See SmartHomeDeviceAPI.get_device_list_info().
+            max_workers (int): See SmartHomeDeviceAPI.get_device_list_info().
+
         Returns:
             API response in a dictionary.
+
+        Raises:
+            BatchRequestError: Some chunks failed.
         """
-        response = SmartHomeDeviceAPI(self.api) \
-            .get_device_list_status(self.device_ids)
+        response = SmartHomeDeviceAPI(self.api, self.cache) \
+            .get_device_list_status(self.device_ids, chunk_size=chunk_size, max_workers=max_workers)
         return response
 
+    def poll_status(
+            self,
+            interval: float,
+            max_polls: Optional[int] = None,
+            stop_event: Optional[threading.Event] = None,
+            snapshot: Optional[StatusSnapshot] = None,
+            emit_initial: bool = True,
+            chunk_size: int = TUYA_MAX_DEVICE_IDS,
+            max_workers: int = 4
+    ) -> Iterator[list[StatusChange]]:
+        """Poll the status of all devices every interval seconds, and yield only the DP values which changed.
+
+        Polls run at a fixed rate (start + n * interval) rather than interval seconds after the previous poll, so the
+        cadence does not drift by the duration of each poll. If a poll takes longer than the interval, the missed
+        polls are skipped. A failed poll is logged and the next one is attempted; if only some chunks failed (see
+        get_device_status_in_batch()), the devices of the other chunks are still compared.
+
+        Example:
+            stop = threading.Event()
+            for changes in device_group.poll_status(5, stop_event=stop):
+                for change in changes:
+                    print(change.device_name, change.code, change.value, change.timestamp)
+
+        Args:
+            interval (float): Seconds between the starts of two polls.
+            max_polls (Optional[int]): Stop after this many polls. Default: None, poll until stop_event is set or the
+                generator is closed.
+            stop_event (Optional[threading.Event]): Set it (e.g. from another thread) to stop polling without
+                waiting for the end of the current interval.
+            snapshot (Optional[StatusSnapshot]): Last known values to compare the polls with, updated in place.
+                Pass the same snapshot to resume polling without emitting the values again. Default: a new snapshot.
+            emit_initial (bool): If True, every DP of the first successful poll is emitted (with previous_value None).
+                Otherwise the first successful poll only fills the snapshot. Default: True.
+            chunk_size (int): See get_device_status_in_batch().
+            max_workers (int): See get_device_status_in_batch().
+
+        Yields:
+            The changes of one poll, in the order of device_map. Polls without changes yield nothing.
+        """
+        if snapshot is None:
+            snapshot = StatusSnapshot()
+        device_names = {device_id: device_name for device_name, device_id in self.device_map.items()}
+        schedule = PollSchedule(interval, stop_event)
+        polls = 0
+        emit = emit_initial
+        while stop_event is None or not stop_event.is_set():
+            statuses = self._poll_status_once(chunk_size, max_workers)
+            polls += 1
+            if statuses is not None:
+                timestamp, device_statuses = statuses
+                changes = [
+                    StatusChange(device_names.get(device_id, device_id), device_id, code, value, previous, timestamp)
+                    for device_id, status in device_statuses
+                    for code, value, previous in snapshot.update(device_id, status)
+                ]
+                if changes and emit:
+                    yield changes
+                emit = True
+            if max_polls is not None and polls >= max_polls:
+                return
+            if not schedule.wait():
+                return
+
+    def watch_status(
+            self,
+            interval: float,
+            callback: Callable[[list[StatusChange]], Any],
+            max_polls: Optional[int] = None,
+            stop_event: Optional[threading.Event] = None,
+            snapshot: Optional[StatusSnapshot] = None,
+            emit_initial: bool = True,
+            chunk_size: int = TUYA_MAX_DEVICE_IDS,
+            max_workers: int = 4
+    ) -> None:
+        """Same as poll_status(), but call callback with the changes of each poll instead of yielding them. Blocks
+        until max_polls is reached or stop_event is set, e.g. run it in a thread.
+
+        Args:
+            interval (float): See poll_status().
+            callback (Callable[[list[StatusChange]], Any]): Called with the changes of each poll which has changes.
+            max_polls (Optional[int]): See poll_status().
+            stop_event (Optional[threading.Event]): See poll_status().
+            snapshot (Optional[StatusSnapshot]): See poll_status().
+            emit_initial (bool): See poll_status().
+            chunk_size (int): See poll_status().
+            max_workers (int): See poll_status().
+        """
+        for changes in self.poll_status(
+            interval, max_polls=max_polls, stop_event=stop_event, snapshot=snapshot, emit_initial=emit_initial,
+            chunk_size=chunk_size, max_workers=max_workers
+        ):
+            callback(changes)
+
+    def _poll_status_once(
+            self,
+            chunk_size: int,
+            max_workers: int
+    ) -> Optional[tuple[int, list[tuple[str, list[dict[str, Any]]]]]]:
+        """Get the status of all devices for poll_status().
+
+        Returns:
+            A tuple of (timestamp in milliseconds, list of (device ID, status)), or None if the poll failed. If some
+            chunks failed, only the devices of the other chunks are listed; None if no chunk succeeded.
+        """
+        try:
+            response = self.get_device_status_in_batch(chunk_size=chunk_size, max_workers=max_workers)
+        except BatchRequestError as e:
+            # Items of the successful chunks are device info dicts
+            statuses = [
+                (device_id, e.results[device_id]["status"]) for device_id in self.device_ids
+                if device_id in e.results and "status" in e.results[device_id]
+            ]
+            if not statuses:
+                logger.error(f"Failed to poll device status: {e!r}")
+                return None
+            logger.warning(f"Failed to poll the status of {len(e.errors)} devices: {e!r}")
+            return int(time.time() * 1000), statuses
+        except Exception as e:
+            logger.error(f"Failed to poll device status: {e!r}")
+            return None
+        if not response.get("success"):
+            logger.error(f"Failed to poll device status: {response}")
+            return None
+        return int(response.get("t") or time.time() * 1000), [
+            (item["id"], item["status"]) for item in response["result"]
+        ]
+
     def get_device_log_in_batch(
             self,
             start_timestamp: int | float | str,
             end_timestamp: int | float | str,
             warn_on_empty_data: bool = False,
-            type_: int = 7
+            type_: int = 7,
+            max_workers: Optional[int] = None,
+            return_exceptions: bool = False,
+            num_windows: int = 1,
+            compact: bool = False
     ) -> dict[str, Any]:
         """Get device log stored on the Tuya platform. Note that free version of Tuya Platform only stores 7 days' data.
 
         Args:
             start_timestamp (int | float | str):
-                Start timestamp for log to be queried. Must be an 10 digit or 13 digit unix timestamp.
+                Start timestamp for log to be queried. Must be an 10 digit or 13 digit unix timestamp,
+                seconds are converted to milliseconds.
                 Note that free version of Tuya only keeps one week's data.
             end_timestamp (int | float | str):
-                End timestamp for log to be queried. Must be an 10 digit or 13 digit unix timestamp
+                End timestamp for log to be queried. Must be an 10 digit or 13 digit unix timestamp,
+                seconds are converted to milliseconds.
                 Note that free version of Tuya only keeps one week's data.
             warn_on_empty_data (bool):
                 If True, print a warning message to the logger an empty page or empty final result is detected.
@@ -342,61 +810,229 @@ class TuyaDeviceManager:
             type_ (int):
                 Usually this field should be 7 ("the actual data" from the device), unless you want something else.
                 See https://developer.tuya.com/en/docs/cloud/device-management?id=K9g6rfntdz78a#sjlx1
+            max_workers (Optional[int]):
+                If specified, fetch the logs of up to max_workers devices in parallel with a thread pool sharing
+                the session of the API client. A failed device does not abort the others.
+                Default: None, fetch one device after another.
+            return_exceptions (bool):
+                Only used when max_workers is specified. If True, the exception raised for a failed device is
+                stored in the returned map in place of its log. Otherwise BatchRequestError is raised after all
+                devices have been processed. Default: False.
+            num_windows (int):
+                Split the time range of each device into this many sub-windows fetched in parallel.
+                See SmartHomeDeviceAPI.get_device_log(). Default: 1.
+            compact (bool):
+                Return records.TuyaLogRecord tuples instead of dicts. See SmartHomeDeviceAPI.get_device_log().
+                Default: False.
 
         Returns:
             Map of device name -> device log.
+
+        Raises:
+            BatchRequestError: Some devices failed and return_exceptions is False. The logs of the other devices are
+                available in its "results" attribute.
         """
-        devices_log_map = {}
-        for device_name, device_id in self.device_map.items():
-            device_log = SmartHomeDeviceAPI(self.api).get_device_log(
+        def fetch(device_name: str, device_id: str) -> list[Any]:
+            return SmartHomeDeviceAPI(self.api, self.cache).get_device_log(
                 device_id,
                 start_timestamp=start_timestamp,
                 end_timestamp=end_timestamp,
                 device_name=device_name,
                 warn_on_empty_data=warn_on_empty_data,
-                type_=type_
+                type_=type_,
+                num_windows=num_windows,
+                compact=compact
             )
-            devices_log_map[device_name] = device_log
 
-        return devices_log_map
+        if max_workers is None:
+            devices_log_map = {}
+            for device_name, device_id in self.device_map.items():
+                devices_log_map[device_name] = fetch(device_name, device_id)
+            return devices_log_map
+
+        return self._run_in_parallel(fetch, max_workers, return_exceptions)
+
+    def get_device_log_dataframe(
+            self,
+            start_timestamp: int | float | str,
+            end_timestamp: int | float | str,
+            type_: int = 7,
+            max_workers: Optional[int] = None,
+            num_windows: int = 1,
+            typed: bool = True
+    ) -> pd.DataFrame:
+        """Get device logs of all devices as one pivoted DataFrame. Requires pandas.
+
+        Args:
+            start_timestamp (int | float | str):
+                See get_device_log_in_batch().
+            end_timestamp (int | float | str):
+                See get_device_log_in_batch().
+            type_ (int):
+                See get_device_log_in_batch().
+            max_workers (Optional[int]):
+                See get_device_log_in_batch().
+            num_windows (int):
+                See get_device_log_in_batch().
+            typed (bool):
+                If True, convert the values according to the DP types in the specification of each device (one more
+                request per device). Otherwise the types are inferred from the values. Default: True.
+
+        Returns:
+            A DataFrame indexed by event_time (UTC), with one column per (device name, DP code).
+            See columnar.device_logs_to_dataframe().
+
+        Raises:
+            BatchRequestError: Some devices failed.
+        """
+        device_logs = self.get_device_log_in_batch(
+            start_timestamp, end_timestamp, type_=type_, max_workers=max_workers, num_windows=num_windows
+        )
+
+        dp_types: Optional[dict[str, DPTypes]] = None
+        if typed:
+            def fetch_dp_types(device_name: str, device_id: str) -> DPTypes:
+                return SmartHomeDeviceAPI(self.api, self.cache).get_dp_types(device_id)
+
+            dp_types = self._run_in_parallel(fetch_dp_types, max_workers or 1, return_exceptions=False)
 
-    def get_device_info_in_batch(self, include_device_status: bool = True) -> dict[str, Any]:
+        return device_logs_to_dataframe(device_logs, dp_types)
+
+    def _run_in_parallel(
+            self,
+            func: Callable[[str, str], Any],
+            max_workers: int,
+            return_exceptions: bool,
+            timeout: Optional[float] = None
+    ) -> dict[str, Any]:
+        """Call func(device_name, device_id) for every device with a thread pool.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for all devices. When it expires, all the calls not started
+                yet are cancelled at once and fail with TimeoutError. The calls still running fail with
+                OutcomeUnknownError and are left to finish in the background. Default: None, wait for all devices.
+
+        Returns:
+            Map of device name -> return value (or exception if return_exceptions is True), in the order of
+            device_map.
+
+        Raises:
+            BatchRequestError: Some devices failed and return_exceptions is False.
+        """
+        results: dict[str, Any] = {}
+        errors: dict[str, BaseException] = {}
+        deadline = None if timeout is None else time.monotonic() + timeout
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {
+                device_name: executor.submit(func, device_name, device_id)
+                for device_name, device_id in self.device_map.items()
+            }
+            _, not_done = wait(futures.values(), None if deadline is None else max(0.0, deadline - time.monotonic()))
+            # Cancel all the calls not started yet before looking at the results, so that none starts meanwhile.
+            cancelled = {future for future in not_done if future.cancel()}
+            for device_name, future in futures.items():
+                error: BaseException
+                if future in cancelled:
+                    logger.error(f"Request cancelled for device {device_name}: not started after {timeout}s")
+                    error = TimeoutError(f"Not started within the timeout of {timeout}s")
+                elif future in not_done:
+                    logger.error(f"Request timed out for device {device_name} after {timeout}s, outcome unknown")
+                    error = OutcomeUnknownError(f"Not done within the timeout of {timeout}s, it may still be applied")
+                else:
+                    try:
+                        results[device_name] = future.result()
+                        continue
+                    except Exception as e:
+                        logger.error(f"Request failed for device {device_name}: {e!r}")
+                        error = e
+                errors[device_name] = error
+                if return_exceptions:
+                    results[device_name] = error
+        finally:
+            # Do not wait for the calls still running after the timeout.
+            executor.shutdown(wait=deadline is None)
+
+        if errors and not return_exceptions:
+            raise BatchRequestError(results, errors)
+        return results
+
+    def get_device_info_in_batch(
+            self,
+            include_device_status: bool = True,
+            chunk_size: int = TUYA_MAX_DEVICE_IDS,
+            max_workers: int = 4
+    ) -> dict[str, Any]:
         """Get device info in batch
 
         Args:
             include_device_status (bool): Include device status in the return fields. Default: True
+            chunk_size (int): See SmartHomeDeviceAPI.get_device_list_info().
+            max_workers (int): See SmartHomeDeviceAPI.get_device_list_info().
 
         Returns:
             API response in a dictionary.
+
+        Raises:
+            BatchRequestError: Some chunks failed.
         """
-        response = SmartHomeDeviceAPI(self.api).get_device_list_info(
-            self.device_ids, include_device_status=include_device_status
+        response = SmartHomeDeviceAPI(self.api, self.cache).get_device_list_info(
+            self.device_ids, include_device_status=include_device_status, chunk_size=chunk_size,
+            max_workers=max_workers
         )
         return response
 
-    def get_factory_info_in_batch(self) -> dict[str, Any]:
+    def get_factory_info_in_batch(
+            self,
+            chunk_size: int = TUYA_MAX_DEVICE_IDS,
+            max_workers: int = 4
+    ) -> dict[str, Any]:
         """"Query the factory information of the devices.
         Possible return fields are: id, uuid, sn, mac.
 
+        Args:
+            chunk_size (int): See SmartHomeDeviceAPI.get_device_list_info().
+            max_workers (int): See SmartHomeDeviceAPI.get_device_list_info().
+
         Returns:
             API response in a dictionary.
+
+        Raises:
+            BatchRequestError: Some chunks failed.
         """
-        response = SmartHomeDeviceAPI(self.api) \
-            .get_factory_info(self.device_ids)
+        response = SmartHomeDeviceAPI(self.api, self.cache) \
+            .get_factory_info(self.device_ids, chunk_size=chunk_size, max_workers=max_workers)
         return response
 
-    def send_command_in_batch(self, commands: list[dict[str, Any]]) -> dict[str, Any]:
-        """Issue standard instructions to control equipments.
+    def send_command_in_batch(
+            self,
+            commands: list[dict[str, Any]],
+            max_workers: int = 8,
+            timeout: Optional[float] = None,
+            return_exceptions: bool = True
+    ) -> dict[str, Any]:
+        """Issue standard instructions to control equipments, to up to max_workers devices at a time.
+        A failed device does not abort the others.
 
         Args:
             commands (list): issue commands.
+            max_workers (int): Maximum number of devices the commands are sent to at the same time. Default: 8.
+            timeout (Optional[float]): Deadline of the whole batch in seconds. When it expires, the commands not sent
+                yet are all cancelled and their devices fail with TimeoutError. The devices whose command was being
+                sent fail with OutcomeUnknownError (a subclass of TimeoutError): the command may still be applied, so
+                check their status before sending it again. Default: None, wait for all devices.
+            return_exceptions (bool): If True, the exception raised for a failed device is stored in the returned
+                map in place of its response. Otherwise BatchRequestError is raised after all devices have been
+                processed. Default: True.
 
         Returns:
-            API response in a dictionary.
+            Map of device name -> API response (check its "success" field), or exception if the device failed.
+
+        Raises:
+            BatchRequestError: Some devices failed and return_exceptions is False. The responses of the other devices
+                are available in its "results" attribute.
         """
-        device_response_map: dict[str, Any] = {}
-        for device_name, device_id in self.device_map.items():
-            device_response = SmartHomeDeviceAPI(self.api).send_commands(device_id, commands)
-            device_response_map[device_name] = device_response
+        def send(device_name: str, device_id: str) -> dict[str, Any]:
+            return SmartHomeDeviceAPI(self.api, self.cache).send_commands(device_id, commands)
 
-        return device_response_map
+        return self._run_in_parallel(send, max_workers, return_exceptions, timeout=timeout)
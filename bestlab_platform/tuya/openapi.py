@@ -2,18 +2,27 @@
 
 from __future__ import annotations
 
-import hashlib
-import hmac
-import json
+import logging
+import threading
 import time
 from typing import Any, Dict, Optional, Tuple
 
 import requests
 
 from ..exceptions import ResponseError
-from .openlogging import filter_logger, logger
+from ..jsoncodec import JSONCodec, get_json_codec
+from ..metrics import CLIENT_TUYA, RequestMetrics
+from ..retry import (RETRY_RATE_LIMIT, RETRY_TOKEN, RETRY_TRANSIENT,
+                     RetryPolicy, RetryStats)
+from ..token_store import InMemoryTokenStore, TokenStore
+from ..transport import RequestsTransport, Transport
+from .openlogging import filter_dumps, logger
+from .ratelimit import TuyaRateLimiter, is_rate_limited
+from .signing import TuyaRequestSigner, TuyaRequestTemplate
 
 TUYA_ERROR_CODE_TOKEN_INVALID = 1010
+# Error codes meaning that the request should be signed again with a new token
+TUYA_ERROR_CODES_TOKEN = frozenset({TUYA_ERROR_CODE_TOKEN_INVALID, 1011})
 GET_TOKEN_API = "/v1.0/token"
 REFRESH_TOKEN_API = "/v1.0/token/{}"
 
@@ -41,6 +50,95 @@ class TuyaTokenInfo:
         self.uid = result.get("uid", "")
         # self.platform_url = result.get("platform_url", "")
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Token info as a dict, e.g. to save it in a TokenStore."""
+        return {
+            "access_token": self.access_token,
+            "expire_time": self.expire_time,
+            "refresh_token": self.refresh_token,
+            "uid": self.uid,
+        }
+
+    @classmethod
+    def from_dict(cls, token: Dict[str, Any]) -> TuyaTokenInfo:
+        """Load token info saved by to_dict()."""
+        token_info = cls({})
+        token_info.access_token = token.get("access_token", "")
+        token_info.expire_time = token.get("expire_time", 0)
+        token_info.refresh_token = token.get("refresh_token", "")
+        token_info.uid = token.get("uid", "")
+        return token_info
+
+
+# https://developer.tuya.com/docs/iot/open-api/api-reference/singnature?id=Ka43a5mtx1gsc
+def calculate_sign(
+    access_id: str,
+    access_secret: str,
+    access_token: str,
+    method: str,
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    body: Optional[Dict[str, Any] | bytes] = None,
+    json_codec: Optional[JSONCodec] = None,
+) -> Tuple[str, int]:
+    """Calculate the request signature. Shared by the blocking and the asyncio client.
+
+    Args:
+        access_id (str): Client ID of the cloud project.
+        access_secret (str): Client secret of the cloud project.
+        access_token (str): Current access token, or an empty string when requesting a new token.
+        method (str): HTTP method
+        path (str): relative path starting with "/"
+        params (Optional[Dict[str, Any]]): HTTP parameters
+        body (Optional[Dict[str, Any] | bytes]): HTTP body, or the encoded JSON body exactly as it is sent.
+            Pass the encoded body when it is sent with another codec than json_codec: the hash must match the bytes.
+        json_codec (Optional[JSONCodec]): Encodes a dict body. Default: get_json_codec().
+
+    Returns:
+        A tuple of (sign, timestamp in milliseconds).
+    """
+    if isinstance(body, dict) and body:
+        data = (json_codec if json_codec is not None else get_json_codec()).dumps(body)
+        template = TuyaRequestTemplate(method, path, params, data, body)
+    else:
+        template = TuyaRequestTemplate(method, path, params, body if isinstance(body, bytes) else None)
+    return TuyaRequestSigner(access_id, access_secret).sign(access_token, template.string_to_sign())
+
+
+class PreparedTuyaRequest(TuyaRequestTemplate):
+    """Request prepared by TuyaOpenAPI.prepare(), to be sent once or several times by TuyaOpenAPI.send_prepared().
+
+    On top of the signing work done once by TuyaRequestTemplate, the requests.PreparedRequest (URL, body and session
+    headers) and the environment settings (proxies, certificates) are built once, then copied for each send.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session,
+        endpoint: str,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[bytes] = None,
+        body: Optional[Dict[str, Any]] = None
+    ):
+        super().__init__(method, path, params, data, body)
+        headers = {"Content-Type": "application/json"} if data is not None else None
+        self.http_request = session.prepare_request(
+            requests.Request(method, endpoint + path, data=data, headers=headers)
+        )
+        self.send_kwargs = session.merge_environment_settings(self.http_request.url, {}, None, None, None)
+        self._url_separator = "&" if "?" in str(self.http_request.url) else "?"
+
+    def build(self, headers: Dict[str, str], params: Optional[Dict[str, Any]] = None) -> requests.PreparedRequest:
+        """Copy of the prepared HTTP request with the signature headers, and the parameters updated with params."""
+        http_request = self.http_request.copy()
+        query = self.url_query(params)
+        if query:
+            http_request.url = f"{self.http_request.url}{self._url_separator}{query}"
+        http_request.headers.update(headers)
+        return http_request
+
 
 class TuyaOpenAPI:
     """Open Api.
@@ -55,22 +153,60 @@ class TuyaOpenAPI:
         access_id: str,
         access_secret: str,
         lang: str = "en",
-        auto_connect: bool = True
+        auto_connect: bool = True,
+        rate_limiter: Optional[TuyaRateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        token_store: Optional[TokenStore] = None,
+        json_codec: Optional[JSONCodec] = None,
+        metrics: Optional[RequestMetrics] = None,
+        transport: Optional[Transport] = None
     ):
-        """Init TuyaOpenAPI."""
-        self.session = requests.session()
+        """Init TuyaOpenAPI.
+
+        Args:
+            endpoint (str): Tuya endpoint, such as "https://openapi.tuyaus.com".
+            access_id (str): Client ID of the cloud project.
+            access_secret (str): Client secret of the cloud project.
+            lang (str): Language. Default: "en".
+            auto_connect (bool): Get the token on initialization, unless a valid token is cached in token_store.
+                Default: True.
+            rate_limiter (Optional[TuyaRateLimiter]): Client-side rate limits, shared by all threads using this
+                instance. Default: no limit, but frequency limit errors are still retried with backoff.
+            retry_policy (Optional[RetryPolicy]): When to retry failed requests. Default: RetryPolicy().
+            token_store (Optional[TokenStore]): Token cache shared with other clients using the same credentials,
+                e.g. FileTokenStore to share the token between processes. Default: a cache private to this instance.
+            json_codec (Optional[JSONCodec]): Encodes request bodies and decodes responses.
+                Default: get_json_codec(), i.e. orjson or ujson if installed, the json module otherwise.
+            metrics (Optional[RequestMetrics]): Request metrics, possibly shared with other clients.
+                Default: metrics private to this instance.
+            transport (Optional[Transport]): Creates the HTTP session: connection pool size, keep-alive, timeouts.
+                Share a RequestsTransport between clients to share its connection pool. Default: RequestsTransport(),
+                with the defaults of requests.
+        """
+        self.transport = transport if transport is not None else RequestsTransport()
+        self.session = self.transport.create_session()
+        self.json_codec = json_codec if json_codec is not None else get_json_codec()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else TuyaRateLimiter()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        # Number of retries per kind of failure
+        self.retry_stats = RetryStats()
+        self.metrics = metrics if metrics is not None else RequestMetrics()
 
         self.endpoint = endpoint
         self.access_id = access_id
         self.access_secret = access_secret
+        self.signer = TuyaRequestSigner(access_id, access_secret)
         self.lang = lang
 
         self.__login_path = GET_TOKEN_API
         self.__refresh_token_path = REFRESH_TOKEN_API
 
         self.token_info: TuyaTokenInfo | None = None
+        self._token_lock = threading.RLock()
+        self.token_store = token_store if token_store is not None else InMemoryTokenStore()
+        self._token_key = f"tuya:{endpoint}:{access_id}"
         if auto_connect:
-            self.connect()
+            self._get_token_if_need()
 
     # https://developer.tuya.com/docs/iot/open-api/api-reference/singnature?id=Ka43a5mtx1gsc
     def _calculate_sign(
@@ -78,57 +214,21 @@ class TuyaOpenAPI:
         method: str,
         path: str,
         params: Optional[Dict[str, Any]] = None,
-        body: Optional[Dict[str, Any]] = None,
+        body: Optional[Dict[str, Any] | bytes] = None,
     ) -> Tuple[str, int]:
-
-        # HTTPMethod
-        str_to_sign = method
-        str_to_sign += "\n"
-
-        # Content-SHA256
-        content_to_sha256 = (
-            "" if body is None or len(body.keys()) == 0 else json.dumps(body)
-        )
-
-        str_to_sign += (
-            hashlib.sha256(content_to_sha256.encode(
-                "utf8")).hexdigest().lower()
-        )
-        str_to_sign += "\n"
-
-        # Header
-        str_to_sign += "\n"
-
-        # URL
-        str_to_sign += path
-
-        if params is not None and len(params.keys()) > 0:
-            str_to_sign += "?"
-
-            query_builder = ""
-            params_keys = sorted(params.keys())
-
-            for key in params_keys:
-                query_builder += f"{key}={params[key]}&"
-            str_to_sign += query_builder[:-1]
-
-        # Sign
-        t = int(time.time() * 1000)
-
-        message = self.access_id
-        if self.token_info is not None:
-            message += self.token_info.access_token
-        message += str(t) + str_to_sign
-        sign = (
-            hmac.new(
-                self.access_secret.encode("utf8"),
-                msg=message.encode("utf8"),
-                digestmod=hashlib.sha256,
-            )
-            .hexdigest()
-            .upper()
-        )
-        return sign, t
+        access_token = self.token_info.access_token if self.token_info is not None else ""
+        if isinstance(body, dict) and body:
+            template = TuyaRequestTemplate(method, path, params, self.json_codec.dumps(body), body)
+        else:
+            template = TuyaRequestTemplate(method, path, params, body if isinstance(body, bytes) else None)
+        return self.signer.sign(access_token, template.string_to_sign())
+
+    def _need_refresh(self) -> bool:
+        if self.token_info is None:
+            return True
+        now = int(time.time() * 1000)
+        expired_time: int = self.token_info.expire_time
+        return expired_time - 60 * 1000 <= now  # 1min
 
     def _refresh_access_token_if_need(self, path: str) -> None:
         if path.startswith(self.__login_path):
@@ -137,23 +237,60 @@ class TuyaOpenAPI:
         if path.startswith(self.__refresh_token_path):
             return
 
-        if self.token_info is None:
-            self.connect()
-            return
-
-        # should use refresh token?
-        now = int(time.time() * 1000)
-        expired_time = self.token_info.expire_time
+        self._get_token_if_need()
 
-        if expired_time - 60 * 1000 > now:  # 1min
+    def _get_token_if_need(self) -> None:
+        if not self._need_refresh():
             return
 
-        self.token_info.access_token = ""
-        response = self.get(
-            self.__refresh_token_path.format(self.token_info.refresh_token)
-        )
-
-        self.token_info = TuyaTokenInfo(response)
+        # Only one thread (or process, depending on the token store) refreshes the token, the others wait for it and
+        # reuse the new token.
+        with self._token_lock, self.token_store.lock(self._token_key):
+            self._load_token()
+            if not self._need_refresh():
+                return
+
+            if self.token_info is None:
+                self._connect()
+                return
+
+            # should use refresh token
+            refresh_token = self.token_info.refresh_token
+            self.token_info.access_token = ""
+            try:
+                response = self.get(
+                    self.__refresh_token_path.format(refresh_token)
+                )
+            except ResponseError as e:
+                # The refresh token is expired or revoked: refreshing it again would fail forever.
+                logger.warning(f"Failed to refresh the access token, requesting a new token: {e!r}")
+                self._discard_token(refresh_token)
+                self._connect()
+                return
+
+            self.token_info = TuyaTokenInfo(response)
+            self.token_store.save(self._token_key, self.token_info.to_dict())
+            self.metrics.record_token_refresh(CLIENT_TUYA)
+
+    def _discard_token(self, refresh_token: str) -> None:
+        """Forget the token whose refresh token was rejected, and remove it from the token store unless another client
+        already replaced it. Must be called with the token store lock held.
+        """
+        self.token_info = None
+        cached = self.token_store.load(self._token_key)
+        if cached is not None and cached.get("refresh_token") == refresh_token:
+            self.token_store.delete(self._token_key)
+
+    def _load_token(self) -> None:
+        """Use the cached token if it expires later than ours. Must be called with the token store lock held."""
+        cached = self.token_store.load(self._token_key)
+        if cached is None:
+            return
+        token_info = TuyaTokenInfo.from_dict(cached)
+        if token_info.access_token and (
+            self.token_info is None or token_info.expire_time > self.token_info.expire_time
+        ):
+            self.token_info = token_info
 
     def connect(
         self
@@ -163,6 +300,11 @@ class TuyaOpenAPI:
         Returns:
             response: connect response
         """
+        with self._token_lock, self.token_store.lock(self._token_key):
+            return self._connect()
+
+    def _connect(self) -> Dict[str, Any]:
+        # Must be called with the token lock and the token store lock held.
         # Fix signature invalid bug when the user explicitly calls connect()
         self.token_info = None
         response = self.get(
@@ -174,6 +316,8 @@ class TuyaOpenAPI:
 
         # Cache token info.
         self.token_info = TuyaTokenInfo(response)
+        self.token_store.save(self._token_key, self.token_info.to_dict())
+        self.metrics.record_token_refresh(CLIENT_TUYA)
 
         return response
 
@@ -184,6 +328,118 @@ class TuyaOpenAPI:
         """
         return self.token_info is not None and len(self.token_info.access_token) > 0
 
+    def _build_headers(
+        self,
+        request: TuyaRequestTemplate,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, str]:
+        """Sign the request, with the parameters of the template updated with params, and build the request headers."""
+        access_token = self.token_info.access_token if self.token_info else ""
+        sign, t = self.signer.sign(access_token, request.string_to_sign(params))
+        return {
+            "client_id": self.access_id,
+            "sign": sign,
+            "sign_method": "HMAC-SHA256",
+            "access_token": access_token,
+            "t": str(t),
+            "lang": self.lang,
+        }
+
+    def __send(
+        self,
+        request: PreparedTuyaRequest,
+        params: Optional[Dict[str, Any]],
+        headers: Dict[str, str]
+    ) -> Tuple[requests.Response, Any]:
+        """Wait for the rate limiter, then send the request and record its metrics.
+
+        Returns:
+            A tuple of (response, decoded JSON or None).
+        """
+        method, path = request.method, request.path
+        self.rate_limiter.acquire(path)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"Request: method = {method}, "
+                f"url = {self.endpoint + path}, "
+                f"params = {request.merged_params(params)}, "
+                f"body = {filter_dumps(request.body)}, "
+                f"t = {int(time.time()*1000)}"
+            )
+
+        sent = time.perf_counter()
+        try:
+            response = self.session.send(request.build(headers, params), **request.send_kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            self.metrics.record_request(CLIENT_TUYA, method, path, None, time.perf_counter() - sent)
+            raise
+        content = response.content
+        duration = time.perf_counter() - sent
+
+        result = self.__json_or_none(response)
+        error_code = result.get("code") if isinstance(result, dict) and result.get("success") is False else None
+        self.metrics.record_request(
+            CLIENT_TUYA, method, path, response.status_code, duration, len(content), error_code
+        )
+        return response, result
+
+    def __json_or_none(self, response: requests.Response) -> Any:
+        """Decode the response body once, or None if it is not JSON."""
+        try:
+            return self.json_codec.loads(response.content)
+        except ValueError:
+            return None
+
+    def prepare(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        body: Optional[Dict[str, Any]] = None
+    ) -> PreparedTuyaRequest:
+        """Prepare a request, to send it with send_prepared(). Preparing once a request which is sent several times
+        with new values of some parameters (e.g. the pages of a paginated API) saves most of the client-side work:
+        the body is encoded, the parameters are sorted and the HTTP request is built only once.
+
+        Example:
+            request = openapi.prepare("GET", f"/v1.0/devices/{device_id}/logs", params)
+            page = openapi.send_prepared(request)
+            while page["result"]["has_next"]:
+                page = openapi.send_prepared(request, {"start_row_key": page["result"]["next_row_key"]})
+
+        Args:
+            method (str): HTTP method
+            path (str): relative path starting with "/"
+            params (Optional[Dict[str, Any]]): HTTP parameters
+            body (Optional[Dict[str, Any]]): HTTP body
+
+        Returns:
+            The prepared request. It can be sent concurrently by several threads.
+        """
+        # Encoded once: the signature is calculated on the bytes which are sent.
+        data = self.json_codec.dumps(body) if body is not None else None
+        return PreparedTuyaRequest(self.session, self.endpoint, method, path, params, data, body)
+
+    def send_prepared(
+        self,
+        request: PreparedTuyaRequest,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Sign and send a request prepared by prepare().
+
+        Args:
+            request (PreparedTuyaRequest): The prepared request.
+            params (Optional[Dict[str, Any]]): Parameters to add to, or to replace in the prepared parameters.
+
+        Returns:
+            response: response body
+
+        Raises:
+            ResponseError: HTTP status code and response text
+        """
+        return self.__request_prepared(request, params)
+
     def __request(
         self,
         method: str,
@@ -206,60 +462,109 @@ class TuyaOpenAPI:
         Raises:
             ResponseError: HTTP status code and response text
         """
-        self._refresh_access_token_if_need(path)
+        return self.__request_prepared(self.prepare(method, path, params, body), None)
 
-        access_token = self.token_info.access_token if self.token_info else ""
-        sign, t = self._calculate_sign(method, path, params, body)
-        headers = {
-            "client_id": self.access_id,
-            "sign": sign,
-            "sign_method": "HMAC-SHA256",
-            "access_token": access_token,
-            "t": str(t),
-            "lang": self.lang,
-        }
+    def __request_prepared(
+        self,
+        request: PreparedTuyaRequest,
+        params: Optional[Dict[str, Any]]
+    ) -> dict[str, Any]:
+        """Sign and send a prepared request, retrying failures according to the retry policy."""
+        path = request.path
+        self._refresh_access_token_if_need(path)
 
-        logger.debug(
-            f"Request: method = {method}, "
-            f"url = {self.endpoint + path}, "
-            f"params = {params}, "
-            f"body = {filter_logger(body)}, "
-            f"t = {int(time.time()*1000)}"
-        )
+        started = time.monotonic()
+        attempt = 1
+        rate_limit_attempt = 0
+        while True:
+            headers = self._build_headers(request, params)
+            response: Optional[requests.Response] = None
+            try:
+                response, result = self.__send(request, params, headers)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error: BaseException = e
+                failure: Optional[str] = RETRY_TRANSIENT
+            else:
+                failure = self._classify_failure(path, response.status_code, result)
+                if failure is None:
+                    break
+
+            if failure == RETRY_RATE_LIMIT and rate_limit_attempt < self.rate_limiter.max_retries:
+                # Frequency limit errors are not caused by the token: wait for the rate limiter and send again.
+                rate_limit_attempt += 1
+                delay = self.rate_limiter.on_rate_limited(path, rate_limit_attempt)
+                self.retry_stats.increment(failure)
+                self.metrics.record_retry(CLIENT_TUYA, failure)
+                logger.warning(
+                    f"Request frequency limit exceeded, retrying in at least {delay:.1f}s: "
+                    f"path={path}, t = {int(time.time() * 1000)}"
+                )
+                continue
+
+            if failure in (RETRY_TOKEN, RETRY_TRANSIENT):
+                delay = 0.0 if failure == RETRY_TOKEN else self.retry_policy.backoff_delay(attempt)
+                if self.retry_policy.can_retry(attempt, started, delay):
+                    attempt += 1
+                    self.retry_stats.increment(failure)
+                    self.metrics.record_retry(CLIENT_TUYA, failure)
+                    logger.warning(
+                        f"Request failed ({failure}), retrying in {delay:.1f}s: "
+                        f"code={response.status_code if response is not None else error!r}, "
+                        f"body={response.text if response is not None else ''}, "
+                        f"t = {int(time.time() * 1000)}"
+                    )
+                    if failure == RETRY_TOKEN:
+                        self._reconnect(headers["access_token"])
+                    else:
+                        time.sleep(delay)
+                    continue
+
+            if response is None:
+                logger.error(f"Request failed: {error!r}")
+                raise error
+            logger.error(
+                f"Response error: code={response.status_code}, body={response.text}"
+            )
+            raise ResponseError(response.status_code, response.text)
 
-        response = self.session.request(
-            method, self.endpoint + path, params=params, json=body, headers=headers
-        )
+        response_body: dict[str, Any] = result
 
-        # Tuya returns HTTP 200 OK even if there is an error.
-        # They use their own error code to indicate the error.
-        if response.ok is False or response.json().get("success", False) is False:
-            # Retry
-            logger.warning(
-                f"Response error, trying to reconnect: "
-                f"code={response.status_code}, "
-                f"body={response.text}, "
-                f"t = {int(time.time() * 1000)}"
-            )
-            self.token_info = None
-            response = self.session.request(
-                method, self.endpoint + path, params=params, json=body, headers=headers
-            )
-            # Somehow failed again.
-            if response.ok is False or response.json().get("success", False) is False:
-                logger.error(
-                    f"Response error: code={response.status_code}, body={response.text}"
-                )
-                raise ResponseError(response.status_code, response.text)
-            # otherwise persist the response
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Response: {filter_dumps(response_body, indent=2)}")
 
-        result: dict[str, Any] = response.json()
+        return response_body
 
-        logger.debug(
-            f"Response: {json.dumps(filter_logger(result), ensure_ascii=False, indent=2)}"
-        )
+    def _classify_failure(self, path: str, status_code: int, result: Any) -> Optional[str]:
+        """Classify the response.
 
-        return result
+        Returns:
+            None if the request succeeded, RETRY_TOKEN, RETRY_TRANSIENT or RETRY_RATE_LIMIT if it is worth retrying,
+            otherwise "fatal".
+        """
+        if self.retry_policy.is_transient_status(status_code):
+            return RETRY_TRANSIENT
+        if status_code >= 400 or not isinstance(result, dict):
+            return "fatal"
+        # Tuya returns HTTP 200 OK even if there is an error.
+        # They use their own error code to indicate the error.
+        if result.get("success", False) is not False:
+            return None
+        if is_rate_limited(result):
+            return RETRY_RATE_LIMIT
+        if (
+            result.get("code") in TUYA_ERROR_CODES_TOKEN
+            and not path.startswith(self.__login_path)
+            and not path.startswith(self.__refresh_token_path)
+        ):
+            return RETRY_TOKEN
+        return "fatal"
+
+    def _reconnect(self, stale_access_token: str) -> None:
+        """Get a new token after the server rejected stale_access_token, unless another client already did."""
+        with self._token_lock, self.token_store.lock(self._token_key):
+            self._load_token()
+            if self.token_info is None or self.token_info.access_token == stale_access_token:
+                self._connect()
 
     def get(
         self, path: str, params: Optional[Dict[str, Any]] = None
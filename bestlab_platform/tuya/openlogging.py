@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
-import copy
+import json
 import logging
+import re
 from typing import Any, Optional
 
 logger = logging.getLogger(__package__)
@@ -18,28 +19,116 @@ TUYA_LOGGER = logger
 
 FILTER_LIST = ["access_token", "client_id", "ip", "lat", "link_id",
                "local_key", "lon", "password", "refresh_token", "uid"]
+_FILTER_SET = frozenset(FILTER_LIST)
 
 STAR = "***"
+_JSON_STAR = json.dumps(STAR)
+_QUOTED_FILTER_KEYS = [f'"{key}"' for key in FILTER_LIST]
+# A sensitive key (not inside a string) followed by a scalar value (group 2), or by an object / array (group 3).
+_FILTER_PATTERN = re.compile(
+    r'(?<!\\)("(?:' + "|".join(re.escape(key) for key in FILTER_LIST) + r')"): '
+    r'(?:("(?:[^"\\]|\\.)*"|-?[0-9][0-9.eE+-]*|true|false|null|NaN|-?Infinity)|([\[{]))'
+)
 
 
 def filter_logger(result_info: Optional[dict[str, Any]]) -> Any:
-    """Filter log, hide sensitive info."""
+    """Filter log, hide sensitive info.
+    Only the containers holding sensitive keys are copied, the input is never modified.
+    """
     if result_info is None:
         return result_info
-    filter_info_original = copy.deepcopy(result_info)
-    if "result" in filter_info_original:
-        filter_info = filter_info_original["result"]
-    else:
-        filter_info = filter_info_original
-    if isinstance(filter_info, list):
-        for item in filter_info:
-            for filter_key in FILTER_LIST:
-                if filter_key in item:
-                    item[filter_key] = STAR
 
+    def filter_dict(info: dict[str, Any]) -> dict[str, Any]:
+        if _FILTER_SET.isdisjoint(info):
+            return info
+        return {key: STAR if key in _FILTER_SET else value for key, value in info.items()}
+
+    if "result" not in result_info:
+        return filter_dict(result_info)
+
+    filter_info = result_info["result"]
+    if isinstance(filter_info, list):
+        filter_info = [filter_dict(item) if isinstance(item, dict) else item for item in filter_info]
     elif isinstance(filter_info, dict):
-        for filter_key in FILTER_LIST:
-            if filter_key in filter_info:
-                filter_info[filter_key] = STAR
+        filter_info = filter_dict(filter_info)
+    else:
+        return result_info
 
+    filter_info_original = dict(result_info)
+    filter_info_original["result"] = filter_info
     return filter_info_original
+
+
+def filter_dumps(obj: Any, indent: Optional[int] = None) -> str:
+    """Serialize obj to a JSON string for logging, hiding sensitive info at any nesting level.
+    Nothing is copied: the values of sensitive keys are masked in the serialized output.
+
+    Args:
+        obj (Any): JSON serializable object, usually a request body or a response.
+        indent (Optional[int]): Same as json.dumps(). Default: None, compact output.
+
+    Returns:
+        JSON string.
+    """
+    text = json.dumps(obj, ensure_ascii=False, indent=indent, default=str)
+    if not any(key in text for key in _QUOTED_FILTER_KEYS):
+        return text
+
+    has_nested_value = False
+
+    def mask(match: re.Match[str]) -> str:
+        nonlocal has_nested_value
+        if match.group(3):
+            has_nested_value = True
+            return match.group(0)
+        return f"{match.group(1)}: {_JSON_STAR}"
+
+    text = _FILTER_PATTERN.sub(mask, text)
+    if has_nested_value:
+        # A sensitive key holds an object or an array, which cannot be masked in the text.
+        parts: list[str] = []
+        _write_filtered(obj, parts, indent, 0)
+        return "".join(parts)
+    return text
+
+
+def _write_filtered(obj: Any, parts: list[str], indent: Optional[int], level: int) -> None:
+    if isinstance(obj, dict):
+        if not obj:
+            parts.append("{}")
+            return
+        inner, outer, separator = _whitespace(indent, level)
+        parts.append("{")
+        first = True
+        for key, value in obj.items():
+            parts.append(inner if first else separator)
+            first = False
+            parts.append(json.dumps(str(key), ensure_ascii=False))
+            parts.append(": ")
+            if key in _FILTER_SET:
+                parts.append(_JSON_STAR)
+            else:
+                _write_filtered(value, parts, indent, level + 1)
+        parts.append(outer + "}")
+    elif isinstance(obj, (list, tuple)):
+        if not obj:
+            parts.append("[]")
+            return
+        inner, outer, separator = _whitespace(indent, level)
+        parts.append("[")
+        first = True
+        for value in obj:
+            parts.append(inner if first else separator)
+            first = False
+            _write_filtered(value, parts, indent, level + 1)
+        parts.append(outer + "]")
+    else:
+        parts.append(json.dumps(obj, ensure_ascii=False, default=str))
+
+
+def _whitespace(indent: Optional[int], level: int) -> tuple[str, str, str]:
+    """Whitespace after the opening bracket, before the closing bracket and between items, same as json.dumps()."""
+    if indent is None:
+        return "", "", ", "
+    inner = "\n" + " " * (indent * (level + 1))
+    return inner, "\n" + " " * (indent * level), "," + inner
@@ -0,0 +1,114 @@
+"""Change detection for device status polling. See TuyaDeviceManager.poll_status()."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Iterable, NamedTuple, Optional
+
+from .openlogging import logger
+
+
+class StatusChange(NamedTuple):
+    """A DP value which changed between two polls. Use change._asdict() to get a dict back."""
+    device_name: str
+    device_id: str
+    code: str
+    value: Any
+    # None if the DP was not known before (first poll)
+    previous_value: Any
+    # Time of the poll in milliseconds: the "t" of the response, server time
+    timestamp: int
+
+
+_MISSING = object()
+
+
+class StatusSnapshot:
+    """Last known value of every DP, indexed by device ID then DP code.
+
+    Updating a device costs one dict lookup per DP, whatever the number of devices.
+    """
+
+    def __init__(self) -> None:
+        self._values: dict[str, dict[str, Any]] = {}
+
+    def update(self, device_id: str, status: Iterable[dict[str, Any]]) -> list[tuple[str, Any, Any]]:
+        """Store the status of a device and return what changed.
+
+        A value only changes if it is not equal or of another type (True and 1 are different values).
+
+        Args:
+            device_id (str): Device ID.
+            status (Iterable[dict[str, Any]]): Status of the device: dicts with "code" and "value", as returned by
+                SmartHomeDeviceAPI.get_device_list_status().
+
+        Returns:
+            A list of (code, value, previous value or None), in the order of status.
+        """
+        values = self._values.get(device_id)
+        if values is None:
+            values = self._values[device_id] = {}
+        changes = []
+        for item in status:
+            code = item["code"]
+            value = item.get("value")
+            previous = values.get(code, _MISSING)
+            if previous is _MISSING or type(previous) is not type(value) or previous != value:
+                values[code] = value
+                changes.append((code, value, None if previous is _MISSING else previous))
+        return changes
+
+    def get(self, device_id: str, code: str, default: Any = None) -> Any:
+        """Get the last known value of a DP, or default if unknown."""
+        return self._values.get(device_id, {}).get(code, default)
+
+    def to_dict(self) -> dict[str, dict[str, Any]]:
+        """Copy of the snapshot: map of device ID -> DP code -> value."""
+        return {device_id: dict(values) for device_id, values in self._values.items()}
+
+    def clear(self) -> None:
+        """Forget all values, so that the next update reports every DP."""
+        self._values.clear()
+
+
+class PollSchedule:
+    """Fixed-rate schedule: the n-th tick is at start + n * interval, whatever the time spent between ticks, so that
+    the cadence does not drift. Ticks missed because the work took longer than the interval are skipped rather than
+    run late in a burst.
+    """
+
+    def __init__(self, interval: float, stop_event: Optional[threading.Event] = None):
+        """Init PollSchedule. The first tick is now.
+
+        Args:
+            interval (float): Seconds between two ticks.
+            stop_event (Optional[threading.Event]): Set it to stop waiting for the next tick from another thread.
+        """
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got {interval}")
+        self.interval = interval
+        self.stop_event = stop_event
+        self.start = time.monotonic()
+        self.ticks = 0
+        self.missed_ticks = 0
+
+    def wait(self) -> bool:
+        """Sleep until the next tick.
+
+        Returns:
+            False if stop_event was set, True otherwise.
+        """
+        now = time.monotonic()
+        ticks = self.ticks + 1
+        if now > self.start + ticks * self.interval:
+            missed = int((now - self.start) // self.interval) + 1 - ticks
+            self.missed_ticks += missed
+            logger.warning(f"Polling took longer than the interval of {self.interval}s, skipping {missed} polls")
+            ticks += missed
+        self.ticks = ticks
+        timeout = self.start + ticks * self.interval - now
+        if self.stop_event is not None:
+            return not self.stop_event.wait(timeout)
+        time.sleep(timeout)
+        return True
@@ -0,0 +1,172 @@
+"""Client-side rate limiting for Tuya Open API."""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from typing import Any, Optional
+
+# Error codes Tuya returns (with HTTP 200 OK) when the request frequency limit is exceeded.
+TUYA_ERROR_CODES_RATE_LIMIT = frozenset({40000309})
+# Also recognize frequency limit errors by their message, in case Tuya adds codes.
+_RATE_LIMIT_MESSAGE_PATTERN = re.compile(r"frequen|too many requests|rate limit", re.IGNORECASE)
+
+# Endpoint family -> path pattern. The first matching family is used, "default" matches everything else.
+TUYA_ENDPOINT_FAMILIES = {
+    "token": re.compile(r"^/v1\.0/token"),
+    "device_logs": re.compile(r"^/v1\.0/devices/[^/]+/logs"),
+    "commands": re.compile(r"^/v1\.0/devices/[^/]+/commands"),
+}
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    Attributes:
+        rate: Tokens added per second.
+        capacity: Maximum number of tokens, i.e. the allowed burst.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take tokens from the bucket, going into debt if needed.
+
+        Returns:
+            Seconds the caller must wait before sending the request. Callers are served in the order they reserve.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now > self._updated:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until tokens are available.
+
+        Returns:
+            Seconds waited.
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class TuyaRateLimiter:
+    """Client-side rate limiter shared by all threads and asyncio tasks using one TuyaOpenAPI/AsyncTuyaOpenAPI.
+
+    Each endpoint family ("token", "device_logs", "commands" and "default", see TUYA_ENDPOINT_FAMILIES) has its own
+    token bucket. When Tuya answers with a frequency limit error, all requests of the family are paused, and the
+    request is sent again once the pause is over. Without any rate, the limiter only handles the pauses.
+
+    Example:
+        limiter = TuyaRateLimiter({"device_logs": 10, "commands": 5}, default_rate=20)
+        tuya_api = TuyaOpenAPI(ENDPOINT, CLIENT_ID, CLIENT_SECRET, rate_limiter=limiter)
+    """
+
+    def __init__(
+        self,
+        rates: Optional[dict[str, float]] = None,
+        default_rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        max_retries: int = 5
+    ):
+        """Init TuyaRateLimiter.
+
+        Args:
+            rates (Optional[dict[str, float]]): Endpoint family -> requests per second.
+            default_rate (Optional[float]): Requests per second for families not in rates. Default: None, unlimited.
+            burst (Optional[float]): Bucket capacity of every family. Default: one second worth of requests.
+            backoff (float): Pause in seconds after the first frequency limit error, doubled for every consecutive
+                error of the same request. Default: 1.
+            max_backoff (float): Upper limit of the pause in seconds. Default: 30.
+            max_retries (int): How many times a request is sent again after frequency limit errors before giving up.
+                Default: 5.
+        """
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        self.burst = burst
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retries = max_retries
+        self._buckets: dict[str, Optional[TokenBucket]] = {}
+        self._paused_until: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def family(path: str) -> str:
+        """Endpoint family of a request path."""
+        for name, pattern in TUYA_ENDPOINT_FAMILIES.items():
+            if pattern.match(path):
+                return name
+        return "default"
+
+    def _bucket(self, family: str) -> Optional[TokenBucket]:
+        # Must be called with the lock held.
+        if family not in self._buckets:
+            rate = self.rates.get(family, self.default_rate)
+            self._buckets[family] = TokenBucket(rate, self.burst) if rate else None
+        return self._buckets[family]
+
+    def reserve(self, path: str) -> float:
+        """Reserve a request slot for the path.
+
+        Returns:
+            Seconds to wait before sending the request.
+        """
+        family = self.family(path)
+        with self._lock:
+            bucket = self._bucket(family)
+            pause = self._paused_until.get(family, 0.0) - time.monotonic()
+        delay = bucket.reserve() if bucket is not None else 0.0
+        # Requests queued during a pause are still spaced by the rate after the pause.
+        return delay + max(pause, 0.0)
+
+    def acquire(self, path: str) -> None:
+        """Block until a request to the path may be sent."""
+        delay = self.reserve(path)
+        if delay > 0:
+            time.sleep(delay)
+
+    def on_rate_limited(self, path: str, attempt: int) -> float:
+        """Record a frequency limit error for the path and pause its endpoint family.
+
+        Args:
+            path (str): Request path.
+            attempt (int): Number of consecutive frequency limit errors for this request, starting at 1.
+
+        Returns:
+            Pause in seconds.
+        """
+        delay = min(self.max_backoff, self.backoff * 2.0 ** (attempt - 1))
+        family = self.family(path)
+        with self._lock:
+            self._paused_until[family] = max(self._paused_until.get(family, 0.0), time.monotonic() + delay)
+        return delay
+
+
+def is_rate_limited(result: Any) -> bool:
+    """Whether a decoded Tuya response is a frequency limit error."""
+    if not isinstance(result, dict) or result.get("success", True) is not False:
+        return False
+    try:
+        if int(result.get("code", 0)) in TUYA_ERROR_CODES_RATE_LIMIT:
+            return True
+    except (TypeError, ValueError):
+        pass
+    return bool(_RATE_LIMIT_MESSAGE_PATTERN.search(str(result.get("msg", ""))))
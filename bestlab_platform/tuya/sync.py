@@ -0,0 +1,344 @@
+"""Incremental local synchronization of Tuya device logs."""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, Optional
+
+from ..exceptions import BatchRequestError
+from ..jsoncodec import JSONCodec, get_json_codec
+from .device import (SmartHomeDeviceAPI, TuyaDeviceManager,
+                     _to_millisecond_timestamp)
+from .openlogging import logger
+
+DEFAULT_OVERLAP_MS = 10 * 60 * 1000
+"""Default of TuyaLogSync.sync(overlap_ms): records reach the platform up to a few minutes after their event_time."""
+
+
+class TuyaLogStore:
+    """Storage of device log records, with a high-water mark on event_time per device.
+    Subclass it to use another storage backend. See SQLiteTuyaLogStore for the default implementation.
+    """
+
+    def get_watermark(self, device_id: str) -> Optional[int]:
+        """Get the greatest event_time stored for the device.
+
+        Args:
+            device_id (str): Device ID.
+
+        Returns:
+            Timestamp in milliseconds, or None if nothing is stored for the device.
+        """
+        raise NotImplementedError
+
+    def save(self, device_id: str, records: Iterable[dict[str, Any]]) -> int:
+        """Store device log records and advance the watermark. Records already stored are ignored.
+
+        Args:
+            device_id (str): Device ID.
+            records (Iterable[dict[str, Any]]): Device log records as returned by SmartHomeDeviceAPI.get_device_log().
+
+        Returns:
+            Number of new records.
+        """
+        raise NotImplementedError
+
+    def query(
+        self,
+        device_id: str,
+        start_timestamp: Optional[int | float | str] = None,
+        end_timestamp: Optional[int | float | str] = None,
+        code: Optional[str] = None
+    ) -> list[dict[str, Any]]:
+        """Read stored device log records in ascending order of event_time.
+
+        Args:
+            device_id (str): Device ID.
+            start_timestamp (Optional[int | float | str]): 10 digit or 13 digit unix timestamp, inclusive.
+            end_timestamp (Optional[int | float | str]): 10 digit or 13 digit unix timestamp, inclusive.
+            code (Optional[str]): Only return records of this DP code, e.g. "pir".
+
+        Returns:
+            A list of device log records.
+        """
+        raise NotImplementedError
+
+    def get_synced_through(self, device_id: str) -> Optional[int]:
+        """Get the end of the latest time range synced for the device, with or without records.
+
+        The default implementation stores nothing, so that devices without new records are fetched again from the
+        watermark. Override it with set_synced_through() to skip them.
+
+        Args:
+            device_id (str): Device ID.
+
+        Returns:
+            Timestamp in milliseconds, or None if unknown.
+        """
+        return None
+
+    def set_synced_through(self, device_id: str, timestamp: int) -> None:
+        """Record that the device log was fetched up to timestamp. Never moves backwards.
+
+        Args:
+            device_id (str): Device ID.
+            timestamp (int): Timestamp in milliseconds.
+        """
+
+    def close(self) -> None:
+        """Release the resources held by the store."""
+
+
+class SQLiteTuyaLogStore(TuyaLogStore):
+    """Device log store in a local SQLite database file.
+
+    Example:
+        store = SQLiteTuyaLogStore("tuya_logs.sqlite3")
+    """
+
+    def __init__(self, path: str = "tuya_logs.sqlite3", json_codec: Optional[JSONCodec] = None):
+        """Open (and create if needed) the database.
+
+        Args:
+            path (str): Path of the database file. Use ":memory:" for a temporary in-memory database.
+            json_codec (Optional[JSONCodec]): Serializes the stored records. Default: get_json_codec().
+        """
+        self.path = path
+        self.json_codec = json_codec if json_codec is not None else get_json_codec()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS device_log ("
+                "device_id TEXT NOT NULL, "
+                "event_time INTEGER NOT NULL, "
+                "code TEXT NOT NULL, "
+                "value TEXT NOT NULL, "
+                "record TEXT NOT NULL, "
+                "PRIMARY KEY (device_id, event_time, code, value))"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS watermark ("
+                "device_id TEXT PRIMARY KEY, "
+                "event_time INTEGER NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS synced_through ("
+                "device_id TEXT PRIMARY KEY, "
+                "end_time INTEGER NOT NULL)"
+            )
+
+    def get_watermark(self, device_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT event_time FROM watermark WHERE device_id = ?", (device_id,)
+            ).fetchone()
+        return int(row[0]) if row else None
+
+    def get_synced_through(self, device_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT end_time FROM synced_through WHERE device_id = ?", (device_id,)
+            ).fetchone()
+        return int(row[0]) if row else None
+
+    def set_synced_through(self, device_id: str, timestamp: int) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO synced_through (device_id, end_time) VALUES (?, ?)", (device_id, timestamp)
+            )
+            self._connection.execute(
+                "UPDATE synced_through SET end_time = MAX(end_time, ?) WHERE device_id = ?", (timestamp, device_id)
+            )
+
+    def save(self, device_id: str, records: Iterable[dict[str, Any]]) -> int:
+        rows = [
+            (
+                device_id,
+                int(record["event_time"]),
+                str(record.get("code", "")),
+                str(record.get("value", "")),
+                self.json_codec.dumps(record).decode("utf8")
+            )
+            for record in records
+        ]
+        if not rows:
+            return 0
+
+        with self._lock, self._connection:
+            before = self._connection.total_changes
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO device_log (device_id, event_time, code, value, record) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            inserted = self._connection.total_changes - before
+            latest = max(row[1] for row in rows)
+            self._connection.execute(
+                "INSERT OR IGNORE INTO watermark (device_id, event_time) VALUES (?, ?)", (device_id, latest)
+            )
+            self._connection.execute(
+                "UPDATE watermark SET event_time = MAX(event_time, ?) WHERE device_id = ?", (latest, device_id)
+            )
+        return inserted
+
+    def query(
+        self,
+        device_id: str,
+        start_timestamp: Optional[int | float | str] = None,
+        end_timestamp: Optional[int | float | str] = None,
+        code: Optional[str] = None
+    ) -> list[dict[str, Any]]:
+        sql = "SELECT record FROM device_log WHERE device_id = ?"
+        args: list[Any] = [device_id]
+        if start_timestamp is not None:
+            sql += " AND event_time >= ?"
+            args.append(_to_millisecond_timestamp(start_timestamp))
+        if end_timestamp is not None:
+            sql += " AND event_time <= ?"
+            args.append(_to_millisecond_timestamp(end_timestamp))
+        if code is not None:
+            sql += " AND code = ?"
+            args.append(code)
+        sql += " ORDER BY event_time"
+
+        with self._lock:
+            rows = self._connection.execute(sql, args).fetchall()
+        return [self.json_codec.loads(row[0]) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class TuyaLogSync:
+    """Keeps a local copy of the device logs of all devices in a TuyaDeviceManager up to date.
+    Each sync() only fetches the records newer than what is already stored, and the accumulated history can be read
+    back with query() without calling the API.
+
+    Example:
+        device_group = TuyaDeviceManager(tuya_api, device_map=devices)
+        log_sync = TuyaLogSync(device_group, SQLiteTuyaLogStore("tuya_logs.sqlite3"))
+        log_sync.sync(start_timestamp=int(time.time() - 7 * 24 * 3600))
+        pir3_log = log_sync.query("PIR3")
+    """
+
+    def __init__(self, manager: TuyaDeviceManager, store: Optional[TuyaLogStore] = None):
+        """Init TuyaLogSync.
+
+        Args:
+            manager (TuyaDeviceManager): Devices to synchronize.
+            store (Optional[TuyaLogStore]): Where to store the logs. Default: SQLiteTuyaLogStore("tuya_logs.sqlite3").
+        """
+        self.manager = manager
+        self.store = store if store is not None else SQLiteTuyaLogStore()
+
+    def sync(
+        self,
+        start_timestamp: int | float | str,
+        end_timestamp: Optional[int | float | str] = None,
+        overlap_ms: int = DEFAULT_OVERLAP_MS,
+        max_workers: Optional[int] = None,
+        type_: int = 7
+    ) -> dict[str, int]:
+        """Fetch the device logs which are not stored yet.
+
+        For each device, fetching starts from the watermark (the latest stored event_time) or the end of the previous
+        sync, whichever is later, minus overlap_ms; or from start_timestamp if nothing was synced for the device or if
+        that is older than start_timestamp. Records fetched again are de-duplicated by the store. A failed device does
+        not abort the others: the records of the other devices are saved, then BatchRequestError is raised.
+
+        Args:
+            start_timestamp (int | float | str):
+                10 digit or 13 digit unix timestamp. Note that free version of Tuya only keeps one week's data.
+            end_timestamp (Optional[int | float | str]):
+                10 digit or 13 digit unix timestamp. Default: now.
+            overlap_ms (int):
+                Fetch again this many milliseconds before the watermark or the end of the previous sync, since
+                records may reach the platform after later records, or after the previous sync. Records arriving
+                later than that are missed. Default: DEFAULT_OVERLAP_MS, 10 minutes.
+            max_workers (Optional[int]):
+                If specified, fetch up to max_workers devices in parallel. Default: None, one device after another.
+            type_ (int):
+                See SmartHomeDeviceAPI.get_device_log().
+
+        Returns:
+            Map of device name -> number of new records.
+
+        Raises:
+            BatchRequestError: Some devices failed. The numbers of new records of the other devices, which are saved,
+                are available in its "results" attribute.
+        """
+        now = int(time.time() * 1000)
+        start = _to_millisecond_timestamp(start_timestamp)
+        end = _to_millisecond_timestamp(end_timestamp) if end_timestamp is not None else now
+
+        def fetch(device_name: str, device_id: str) -> list[Any]:
+            synced = [
+                timestamp
+                for timestamp in (self.store.get_watermark(device_id), self.store.get_synced_through(device_id))
+                if timestamp is not None
+            ]
+            device_start = max(start, max(synced) - overlap_ms) if synced else start
+            if device_start > end:
+                return []
+            logger.info(f"Syncing device log for device {device_name} since {device_start}")
+            return SmartHomeDeviceAPI(self.manager.api).get_device_log(
+                device_id, device_start, end, device_name=device_name, type_=type_
+            )
+
+        def save(device_name: str, records: list[Any]) -> None:
+            device_id = self.manager.device_map[device_name]
+            new_records[device_name] = self.store.save(device_id, records)
+            # Also when there are no records, so that idle devices are not fetched again from the same time. Not beyond
+            # now: the records of the future are not there yet.
+            self.store.set_synced_through(device_id, min(end, now))
+
+        new_records: dict[str, int] = {}
+        errors: dict[str, BaseException] = {}
+        if max_workers is None:
+            for device_name, device_id in self.manager.device_map.items():
+                try:
+                    save(device_name, fetch(device_name, device_id))
+                except Exception as e:
+                    logger.error(f"Failed to sync device {device_name}: {e!r}")
+                    errors[device_name] = e
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    device_name: executor.submit(fetch, device_name, device_id)
+                    for device_name, device_id in self.manager.device_map.items()
+                }
+                for device_name, future in futures.items():
+                    try:
+                        save(device_name, future.result())
+                    except Exception as e:
+                        logger.error(f"Failed to sync device {device_name}: {e!r}")
+                        errors[device_name] = e
+
+        if errors:
+            raise BatchRequestError(new_records, errors)
+        return new_records
+
+    def query(
+        self,
+        device_name: str,
+        start_timestamp: Optional[int | float | str] = None,
+        end_timestamp: Optional[int | float | str] = None,
+        code: Optional[str] = None
+    ) -> list[dict[str, Any]]:
+        """Read locally stored device log records of a device in ascending order of event_time.
+
+        Args:
+            device_name (str): Device name in the device map of the manager.
+            start_timestamp (Optional[int | float | str]): 10 digit or 13 digit unix timestamp, inclusive.
+            end_timestamp (Optional[int | float | str]): 10 digit or 13 digit unix timestamp, inclusive.
+            code (Optional[str]): Only return records of this DP code, e.g. "pir".
+
+        Returns:
+            A list of device log records.
+        """
+        return self.store.query(self.manager.device_map[device_name], start_timestamp, end_timestamp, code)
@@ -0,0 +1 @@
+"""Tests of bestlab_platform, run offline against the in-memory clouds of tests.fakes."""
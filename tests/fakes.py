@@ -0,0 +1,285 @@
+"""In-memory stand-ins for the Tuya and HOBO clouds.
+
+The blocking clients reach them through an InMemoryTransport (FakeCloud.transport()), the asyncio clients through a
+local aiohttp server (serve()). Signatures are not checked.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import hmac
+import re
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import (Any, AsyncIterator, Callable, Dict, List, Optional,
+                    Pattern, Tuple)
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+from bestlab_platform.jsoncodec import get_json_codec
+from bestlab_platform.transport import InMemoryTransport
+
+ENDPOINT = "https://cloud.test"
+
+
+class FakeRequest:
+    """Request received by a fake cloud."""
+
+    def __init__(self, method: str, url: str, headers: Dict[str, str], data: Optional[bytes]):
+        parts = urlsplit(url)
+        self.method = method
+        self.path = parts.path
+        self.query = dict(parse_qsl(parts.query))
+        self.headers = headers
+        self.data = data
+        self.body: Any = None
+        if data:
+            try:
+                self.body = get_json_codec().loads(data)
+            except ValueError:
+                # Form data
+                self.body = dict(parse_qsl(data.decode("utf8")))
+        self.match: Optional[re.Match[str]] = None
+
+
+# Returns a JSON body (status 200), or a tuple of (status, JSON body)
+Handler = Callable[[FakeRequest], Any]
+
+
+def ok(result: Any) -> Dict[str, Any]:
+    """Successful Tuya response."""
+    return {"success": True, "result": result, "t": int(time.time() * 1000)}
+
+
+def error(code: int, msg: str = "error") -> Dict[str, Any]:
+    """Tuya error response, sent with HTTP 200 like the real API."""
+    return {"success": False, "code": code, "msg": msg, "t": int(time.time() * 1000)}
+
+
+def check_tuya_sign(request: FakeRequest, access_id: str = "id", access_secret: str = "secret") -> None:
+    """Check the signature of a Tuya request, computed from scratch following the Tuya documentation."""
+    headers = request.headers
+    query = "&".join(f"{key}={request.query[key]}" for key in sorted(request.query))
+    url = f"{request.path}?{query}" if query else request.path
+    string_to_sign = f"{request.method}\n{hashlib.sha256(request.data or b'').hexdigest()}\n\n{url}"
+    message = f"{access_id}{headers['access_token']}{headers['t']}{string_to_sign}".encode("utf8")
+    expected = hmac.new(access_secret.encode("utf8"), message, hashlib.sha256).hexdigest().upper()
+    assert headers["sign"] == expected, f"invalid signature of {request.method} {request.path}"
+
+
+class FakeCloud:
+    """Routes requests to handlers by method and path regular expression, and records them."""
+
+    def __init__(self) -> None:
+        self.requests: List[FakeRequest] = []
+        self._routes: List[Tuple[str, Pattern[str], Handler]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def paths(self) -> List[str]:
+        """Paths of the received requests, in order."""
+        with self._lock:
+            return [request.path for request in self.requests]
+
+    def route(self, method: str, pattern: str, handler: Handler) -> None:
+        """Answer the requests whose path fully matches pattern. The latest route wins."""
+        self._routes.insert(0, (method, re.compile(pattern), handler))
+
+    def handle(self, request: FakeRequest) -> Tuple[int, Any]:
+        with self._lock:
+            self.requests.append(request)
+        for method, pattern, handler in self._routes:
+            match = pattern.fullmatch(request.path)
+            if method == request.method and match:
+                request.match = match
+                response = handler(request)
+                return response if isinstance(response, tuple) else (200, response)
+        return 404, {"success": False, "code": 404, "msg": f"no route for {request.method} {request.path}"}
+
+    def transport(self, latency: float = 0.0) -> InMemoryTransport:
+        """Transport of the blocking clients."""
+        def handler(request: requests.PreparedRequest) -> Tuple[int, Any]:
+            data = request.body.encode("utf8") if isinstance(request.body, str) else request.body
+            return self.handle(FakeRequest(str(request.method), str(request.url), dict(request.headers), data))
+
+        return InMemoryTransport(handler, latency=latency, record_requests=False)
+
+
+class FakeTuyaCloud(FakeCloud):
+    """Tuya cloud issuing tokens "A1"/"R1", "A2"/"R2"... valid for expire_time seconds.
+
+    Attributes:
+        expire_time: Validity in seconds of the next tokens. Tokens valid for less than a minute are refreshed by the
+            clients before every request.
+        reject_refresh: Answer refresh token requests with an invalid token error.
+        device_logs: Device log records by device ID, served by /v1.0/devices/{device_id}/logs newest first.
+        devices: Device info by device ID (see tuya_device()), served by /v1.0/devices/{device_id}, the batch
+            /v1.0/devices/?device_ids=... and /v1.0/devices/factory-infos?device_ids=...
+    """
+
+    def __init__(self, expire_time: int = 7200) -> None:
+        super().__init__()
+        self.expire_time = expire_time
+        self.reject_refresh = False
+        self.tokens = 0
+        self.device_logs: Dict[str, List[Dict[str, Any]]] = {}
+        self.devices: Dict[str, Dict[str, Any]] = {}
+        self.route("GET", r"/v1.0/token", self._token)
+        self.route("GET", r"/v1.0/token/(?P<refresh_token>[^/]+)", self._refresh_token)
+        self.route("GET", r"/v1.0/devices/(?P<device_id>[^/]+)/logs", self._device_log)
+        self.route("GET", r"/v1.0/devices/(?P<device_id>[^/]+)", self._device)
+        self.route("GET", r"/v1.0/devices/?", self._device_list)
+        self.route("GET", r"/v1.0/devices/factory-infos", self._factory_infos)
+
+    @property
+    def log_requests(self) -> List[Tuple[str, int, int]]:
+        """(device ID, start_time, end_time) of the first page of each device log query, in order."""
+        with self._lock:
+            return [
+                (request.path.split("/")[3], int(request.query["start_time"]), int(request.query["end_time"]))
+                for request in self.requests
+                if request.path.endswith("/logs") and "start_row_key" not in request.query
+            ]
+
+    def _new_token(self) -> Dict[str, Any]:
+        with self._lock:
+            self.tokens += 1
+            number = self.tokens
+        return ok({
+            "access_token": f"A{number}",
+            "refresh_token": f"R{number}",
+            "expire_time": self.expire_time,
+            "uid": "uid",
+        })
+
+    def _token(self, request: FakeRequest) -> Dict[str, Any]:
+        return self._new_token()
+
+    def _refresh_token(self, request: FakeRequest) -> Dict[str, Any]:
+        if self.reject_refresh:
+            return error(1010, "token invalid")
+        return self._new_token()
+
+    def _requested_devices(self, request: FakeRequest) -> List[Dict[str, Any]]:
+        """Known devices among the device_ids parameter, in order. Unknown devices are left out like by Tuya."""
+        device_ids = request.query.get("device_ids", "").split(",")
+        return [copy.deepcopy(self.devices[device_id]) for device_id in device_ids if device_id in self.devices]
+
+    def _device(self, request: FakeRequest) -> Dict[str, Any]:
+        assert request.match is not None
+        device = self.devices.get(request.match.group("device_id"))
+        if device is None:
+            return error(1106, "permission deny")
+        return ok(copy.deepcopy(device))
+
+    def _device_list(self, request: FakeRequest) -> Dict[str, Any]:
+        devices = self._requested_devices(request)
+        return ok({"devices": devices, "has_more": False, "total": len(devices)})
+
+    def _factory_infos(self, request: FakeRequest) -> Dict[str, Any]:
+        return ok([
+            {"id": device["id"], "uuid": f"uuid-{device['id']}", "sn": "", "mac": ""}
+            for device in self._requested_devices(request)
+        ])
+
+    def _device_log(self, request: FakeRequest) -> Dict[str, Any]:
+        assert request.match is not None
+        device_id = request.match.group("device_id")
+        start, end = int(request.query["start_time"]), int(request.query["end_time"])
+        records = sorted(
+            (record for record in self.device_logs.get(device_id, []) if start <= record["event_time"] <= end),
+            key=lambda record: -int(record["event_time"])
+        )
+        offset = int(request.query.get("start_row_key", 0))
+        size = int(request.query.get("size", 100))
+        page = records[offset:offset + size]
+        return ok({
+            "device_id": device_id,
+            "logs": page,
+            "has_next": offset + size < len(records),
+            "next_row_key": str(offset + size),
+            "current_row_key": str(offset),
+        })
+
+
+def tuya_record(event_time: int, code: str = "pir", value: str = "pir") -> Dict[str, Any]:
+    """Device log record at a time in milliseconds."""
+    return {"code": code, "value": value, "event_time": event_time, "event_from": "1", "event_id": 7, "status": "1"}
+
+
+def tuya_device(device_id: str, **status: Any) -> Dict[str, Any]:
+    """Device info with a status, by default {"pir": "none"}."""
+    return {
+        "id": device_id,
+        "name": device_id,
+        "online": True,
+        "status": [{"code": code, "value": value} for code, value in (status or {"pir": "none"}).items()],
+    }
+
+
+class FakeHoboCloud(FakeCloud):
+    """HOBO cloud answering data requests with the stored observations of the requested loggers and time range.
+
+    Attributes:
+        observations: Observations, with "logger_sn" and a "timestamp" such as "2021-10-15T04:00:00Z".
+    """
+
+    def __init__(self, observations: Optional[List[Dict[str, Any]]] = None) -> None:
+        super().__init__()
+        self.observations = list(observations or [])
+        self.route("POST", r"/ws/auth/token", self._token)
+        self.route("GET", r"/ws/data/file/JSON/user/(?P<user_id>[^/]+)", self._data)
+
+    @property
+    def data_requests(self) -> List[Tuple[str, str, str]]:
+        """(loggers, start_date_time, end_date_time) of the received data requests, in order."""
+        with self._lock:
+            return [
+                (request.query["loggers"], request.query["start_date_time"], request.query["end_date_time"])
+                for request in self.requests if request.path.startswith("/ws/data/")
+            ]
+
+    def _token(self, request: FakeRequest) -> Dict[str, Any]:
+        return {"access_token": "H1", "token_type": "bearer", "expires_in": 600}
+
+    def _data(self, request: FakeRequest) -> Dict[str, Any]:
+        loggers = request.query["loggers"].split(",")
+        start, end = request.query["start_date_time"], request.query["end_date_time"]
+        observations = [
+            observation for observation in self.observations
+            if observation["logger_sn"] in loggers and start <= observation["timestamp"].replace("T", " ")[:19] <= end
+        ]
+        return {"message": f"OK: Found: {len(observations)} results.", "observation_list": observations}
+
+
+def hobo_observation(logger_sn: str, timestamp: str, value: float = 1.0, sensor_sn: str = "s1") -> Dict[str, Any]:
+    """HOBO observation at a time in yyyy-MM-dd HH:mm:ss format."""
+    return {
+        "logger_sn": logger_sn,
+        "sensor_sn": sensor_sn,
+        "timestamp": timestamp.replace(" ", "T") + "Z",
+        "data_type": "TEMPERATURE",
+        "si_value": value,
+        "si_unit": "°C",
+    }
+
+
+@asynccontextmanager
+async def serve(cloud: FakeCloud) -> AsyncIterator[str]:
+    """Serve a fake cloud over HTTP on localhost for the asyncio clients. Yields the endpoint."""
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    async def handler(http_request: web.Request) -> web.Response:
+        data = await http_request.read()
+        request = FakeRequest(http_request.method, str(http_request.rel_url), dict(http_request.headers), data)
+        status, body = cloud.handle(request)
+        return web.Response(status=status, body=get_json_codec().dumps(body), content_type="application/json")
+
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler)
+    async with TestServer(app) as server:
+        yield str(server.make_url("")).rstrip("/")
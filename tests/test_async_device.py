@@ -0,0 +1,60 @@
+"""Batch calls of AsyncTuyaDeviceManager."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+
+import pytest
+
+from bestlab_platform.exceptions import BatchRequestError
+from bestlab_platform.tuya import (AsyncSmartHomeDeviceAPI,
+                                   AsyncTuyaDeviceManager, AsyncTuyaOpenAPI)
+from tests.fakes import FakeTuyaCloud, error, serve, tuya_record
+
+pytest.importorskip("aiohttp")
+
+
+def _cloud() -> FakeTuyaCloud:
+    cloud = FakeTuyaCloud()
+    now = int(time.time() * 1000)
+    cloud.device_logs["d1"] = [tuya_record(now - 1000)]
+    cloud.device_logs["d3"] = [tuya_record(now - 2000), tuya_record(now - 3000)]
+    cloud.route("GET", r"/v1.0/devices/d2/logs", lambda request: error(1106, "permission deny"))
+    return cloud
+
+
+async def _get_logs(cloud: FakeTuyaCloud, **kwargs: Any) -> dict[str, Any]:
+    async with serve(cloud) as endpoint:
+        async with AsyncTuyaOpenAPI(endpoint, "id", "secret") as api:
+            manager = AsyncTuyaDeviceManager(api, device_map={"A": "d1", "B": "d2", "C": "d3"}, max_concurrency=2)
+            now = int(time.time() * 1000)
+            return await manager.get_device_log_in_batch(now - 60000, now, **kwargs)
+
+
+def test_failed_device_does_not_abort_the_batch() -> None:
+    with pytest.raises(BatchRequestError) as e:
+        asyncio.run(_get_logs(_cloud()))
+    assert {name: len(log) for name, log in e.value.results.items()} == {"A": 1, "C": 2}
+    assert list(e.value.errors) == ["B"]
+
+
+def test_return_exceptions_keeps_the_failure_in_the_results() -> None:
+    results = asyncio.run(_get_logs(_cloud(), return_exceptions=True))
+    assert list(results) == ["A", "B", "C"]
+    assert isinstance(results["B"], Exception)
+    assert len(results["C"]) == 2
+
+
+def test_second_timestamps_are_sent_in_milliseconds() -> None:
+    cloud = _cloud()
+    now = int(time.time())
+
+    async def get_log() -> list[Any]:
+        async with serve(cloud) as endpoint:
+            async with AsyncTuyaOpenAPI(endpoint, "id", "secret") as api:
+                return await AsyncSmartHomeDeviceAPI(api).get_device_log("d3", now - 60, now)
+
+    assert len(asyncio.run(get_log())) == 2
+    assert cloud.log_requests == [("d3", (now - 60) * 1000, now * 1000)]
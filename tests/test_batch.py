@@ -0,0 +1,98 @@
+"""Chunked batch device queries."""
+
+from __future__ import annotations
+
+from typing import List
+
+import pytest
+
+from bestlab_platform.exceptions import BatchRequestError
+from bestlab_platform.tuya import TuyaDeviceManager, TuyaOpenAPI
+from bestlab_platform.tuya.batch import (TUYA_MAX_DEVICE_IDS,
+                                         TUYA_MAX_DEVICE_IDS_LENGTH,
+                                         chunk_device_ids)
+from tests.fakes import ENDPOINT, FakeTuyaCloud, error, tuya_device
+
+DEVICE_IDS = [f"device{number:03d}" for number in range(45)]
+
+
+def test_chunks_respect_the_count_and_length_limits() -> None:
+    assert [len(chunk) for chunk in chunk_device_ids(DEVICE_IDS)] == [20, 20, 5]
+    assert sum(chunk_device_ids(DEVICE_IDS, 7), []) == DEVICE_IDS
+    long_ids = ["x" * 300 + str(number) for number in range(7)]
+    chunks = chunk_device_ids(long_ids)
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert all(len(",".join(chunk)) <= TUYA_MAX_DEVICE_IDS_LENGTH for chunk in chunks)
+    assert chunk_device_ids([]) == []
+    with pytest.raises(ValueError):
+        chunk_device_ids(DEVICE_IDS, 0)
+
+
+def _cloud() -> FakeTuyaCloud:
+    cloud = FakeTuyaCloud()
+    cloud.devices = {device_id: tuya_device(device_id) for device_id in DEVICE_IDS}
+    return cloud
+
+
+def _manager(cloud: FakeTuyaCloud) -> TuyaDeviceManager:
+    return TuyaDeviceManager(TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport()), device_list=DEVICE_IDS)
+
+
+def _requested_chunks(cloud: FakeTuyaCloud, path: str) -> List[List[str]]:
+    return sorted(request.query["device_ids"].split(",") for request in cloud.requests if request.path == path)
+
+
+def test_device_info_is_requested_in_chunks_and_merged() -> None:
+    cloud = _cloud()
+
+    response = _manager(cloud).get_device_info_in_batch(include_device_status=False)
+
+    assert _requested_chunks(cloud, "/v1.0/devices/") == chunk_device_ids(DEVICE_IDS, TUYA_MAX_DEVICE_IDS)
+    assert [device["id"] for device in response["result"]["devices"]] == DEVICE_IDS
+    assert response["result"]["total"] == 45
+    assert response["result"]["has_more"] is False
+    assert "status" not in response["result"]["devices"][0]
+
+
+def test_device_status_and_factory_info_in_batch() -> None:
+    cloud = _cloud()
+    manager = _manager(cloud)
+
+    status = manager.get_device_status_in_batch(chunk_size=10)
+    factory_info = manager.get_factory_info_in_batch()
+
+    assert status["result"][0] == {"id": "device000", "status": [{"code": "pir", "value": "none"}]}
+    assert [item["id"] for item in status["result"]] == DEVICE_IDS
+    assert len(_requested_chunks(cloud, "/v1.0/devices/")) == 5
+    assert [item["uuid"] for item in factory_info["result"]] == [f"uuid-{device_id}" for device_id in DEVICE_IDS]
+
+
+def test_a_failed_chunk_keeps_the_other_devices() -> None:
+    cloud = _cloud()
+    device_list = cloud._device_list
+    cloud.route(
+        "GET", r"/v1.0/devices/",
+        lambda request: (500, {}) if "device020" in request.query["device_ids"] else device_list(request)
+    )
+    api = TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport())
+    api.retry_policy.max_attempts = 1
+
+    with pytest.raises(BatchRequestError) as e:
+        TuyaDeviceManager(api, device_list=DEVICE_IDS).get_device_info_in_batch()
+    assert sorted(e.value.errors) == DEVICE_IDS[20:40]
+    assert sorted(e.value.results) == DEVICE_IDS[:20] + DEVICE_IDS[40:]
+
+
+def test_an_api_error_of_a_chunk_fails_its_devices_only() -> None:
+    cloud = _cloud()
+    device_list = cloud._device_list
+    cloud.route(
+        "GET", r"/v1.0/devices/",
+        lambda request: error(1106, "permission deny") if "device040" in request.query["device_ids"]
+        else device_list(request)
+    )
+
+    with pytest.raises(BatchRequestError) as e:
+        _manager(cloud).get_device_status_in_batch()
+    assert sorted(e.value.errors) == DEVICE_IDS[40:]
+    assert len(e.value.results) == 40
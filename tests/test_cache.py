@@ -0,0 +1,112 @@
+"""Cache of the Tuya device metadata."""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import pytest
+
+from bestlab_platform.exceptions import ResponseError
+from bestlab_platform.tuya import (SmartHomeDeviceAPI, TuyaDeviceManager,
+                                   TuyaOpenAPI)
+from bestlab_platform.tuya.cache import (FACTORY_INFO, FUNCTIONS,
+                                         SPECIFICATION, MetadataCache)
+from tests.fakes import (ENDPOINT, FakeRequest, FakeTuyaCloud, error, ok,
+                         tuya_device)
+
+
+def _specification(request: FakeRequest) -> Any:
+    return ok({"category": "pir", "functions": [], "status": [{"code": "pir", "type": "Enum", "values": "{}"}]})
+
+
+def _cloud() -> FakeTuyaCloud:
+    cloud = FakeTuyaCloud()
+    cloud.devices = {device_id: tuya_device(device_id) for device_id in ("d1", "d2", "d3")}
+    cloud.route("GET", r"/v1.0/devices/(?P<device_id>[^/]+)/specifications", _specification)
+    return cloud
+
+
+def _device_api(cloud: FakeTuyaCloud, cache: MetadataCache) -> SmartHomeDeviceAPI:
+    return SmartHomeDeviceAPI(TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport()), cache=cache)
+
+
+def test_cached_responses_are_not_requested_again() -> None:
+    cloud = _cloud()
+    cache = MetadataCache()
+    device_api = _device_api(cloud, cache)
+
+    first = device_api.get_device_specification("d1")
+    first["result"]["category"] = "modified by the caller"
+    second = device_api.get_device_specification("d1")
+
+    assert second["result"]["category"] == "pir"
+    assert cloud.paths.count("/v1.0/devices/d1/specifications") == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.invalidate(SPECIFICATION, "d1") == 1
+    device_api.get_device_specification("d1")
+    assert cloud.paths.count("/v1.0/devices/d1/specifications") == 2
+
+
+def test_factory_info_only_requests_the_missing_devices() -> None:
+    cloud = _cloud()
+    cache = MetadataCache()
+    api = TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport())
+
+    SmartHomeDeviceAPI(api, cache).get_factory_info(["d1", "d2"])
+    response = TuyaDeviceManager(api, device_list=["d3", "d1", "d2"], cache=cache).get_factory_info_in_batch()
+
+    assert [item["id"] for item in response["result"]] == ["d3", "d1", "d2"]
+    device_ids = [request.query["device_ids"] for request in cloud.requests if request.path.endswith("factory-infos")]
+    assert device_ids == ["d1,d2", "d3"]
+    assert cache.get(FACTORY_INFO, "d3") == {"id": "d3", "uuid": "uuid-d3", "sn": "", "mac": ""}
+
+
+def test_failed_responses_are_not_cached() -> None:
+    cloud = _cloud()
+    cloud.route("GET", r"/v1.0/devices/d1/functions", lambda request: error(1106, "permission deny"))
+    cache = MetadataCache()
+
+    with pytest.raises(ResponseError):
+        _device_api(cloud, cache).get_device_functions("d1")
+    assert len(cache) == 0
+
+
+def test_entries_expire_and_the_least_recently_used_are_evicted(monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = MetadataCache(max_entries=2, ttls={FUNCTIONS: 0, SPECIFICATION: 60})
+    cache.set(SPECIFICATION, "d1", 1)
+    cache.set(SPECIFICATION, "d2", 2)
+    assert cache.get(SPECIFICATION, "d1") == 1
+    cache.set(SPECIFICATION, "d3", 3)
+
+    assert cache.get(SPECIFICATION, "d2") is None
+    assert cache.get(SPECIFICATION, "d1") == 1
+    # A TTL of 0 disables the cache of the endpoint.
+    cache.set(FUNCTIONS, "d1", 1)
+    assert cache.get(FUNCTIONS, "d1") is None
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get(SPECIFICATION, "d3") is None
+
+
+def test_file_cache_is_reused_by_a_new_instance(tmp_path: Any) -> None:
+    path = str(tmp_path / "metadata.json")
+    cloud = _cloud()
+    _device_api(cloud, MetadataCache(path=path)).get_device_specification("d1")
+
+    cache = MetadataCache(path=path)
+    assert _device_api(cloud, cache).get_device_specification("d1")["success"]
+    assert cloud.paths.count("/v1.0/devices/d1/specifications") == 1
+    assert cache.hits == 1
+
+
+def test_unreadable_file_is_ignored(tmp_path: Any) -> None:
+    path = tmp_path / "metadata.json"
+    path.write_text('{"entries": [["specification", "d1"], "not an entry"]}')
+
+    cache = MetadataCache(path=str(path))
+
+    assert len(cache) == 0
+    cache.set(SPECIFICATION, "d1", {"success": True})
+    assert MetadataCache(path=str(path)).get(SPECIFICATION, "d1") == {"success": True}
@@ -0,0 +1,177 @@
+"""The bestlab-export command."""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+
+import pytest
+import requests
+
+from bestlab_platform import export
+from bestlab_platform.hobo import HoboAPI
+from bestlab_platform.transport import InMemoryTransport
+from tests.fakes import (ENDPOINT, FakeHoboCloud, FakeTuyaCloud, error,
+                         hobo_observation, tuya_device, tuya_record)
+
+# 2021-10-15 00:00:00 UTC in milliseconds
+START_MS = int(datetime(2021, 10, 15, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _write_config(tmp_path: str, config: dict[str, object]) -> str:
+    path = os.path.join(tmp_path, "config.json")
+    with open(path, "w", encoding="utf8") as f:
+        json.dump(config, f)
+    return path
+
+
+class _CloudTransport(InMemoryTransport):
+    """Transport of main(), answering the Tuya paths with one fake cloud and the HOBO paths with the other."""
+
+    def __init__(self, tuya: FakeTuyaCloud, hobo: FakeHoboCloud):
+        tuya_handler = tuya.transport().handler
+        hobo_handler = hobo.transport().handler
+
+        def handler(request: requests.PreparedRequest) -> Tuple[int, Any]:
+            if request.path_url.startswith("/ws/"):
+                return hobo_handler(request)
+            return tuya_handler(request)
+
+        super().__init__(handler)
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def clouds(monkeypatch: pytest.MonkeyPatch) -> Tuple[FakeTuyaCloud, FakeHoboCloud]:
+    tuya, hobo = FakeTuyaCloud(), FakeHoboCloud()
+    tuya.devices = {"dev1": tuya_device("dev1"), "dev2": tuya_device("dev2")}
+    tuya.device_logs = {
+        "dev1": [tuya_record(START_MS + i * 1000) for i in range(250)],
+        "dev2": [tuya_record(START_MS - 1000), tuya_record(START_MS + 5000, value="none")],
+    }
+    hobo.observations = [
+        hobo_observation("L1", "2021-10-15 04:00:00", 20.5),
+        hobo_observation("L1", "2021-10-15 16:00:00", 21.5),
+        hobo_observation("L1", "2021-10-16 00:00:01", 22.5),
+        hobo_observation("L2", "2021-10-15 04:00:00", 30.0),
+    ]
+    transport = _CloudTransport(tuya, hobo)
+    monkeypatch.setattr(export, "RequestsTransport", lambda **kwargs: transport)
+    return tuya, hobo
+
+
+def _config(tmp_path: str, tuya_devices: Any = None) -> str:
+    return _write_config(tmp_path, {
+        "tuya": {"endpoint": ENDPOINT, "client_id": "id", "client_secret": "secret",
+                 "devices": tuya_devices or {"PIR 1": "dev1", "PIR2": "dev2"}},
+        "hobo": {"endpoint": ENDPOINT, "client_id": "id", "client_secret": "secret", "user_id": "user",
+                 "loggers": ["L1", 12345], "chunk_hours": 12},
+    })
+
+
+def _read_ndjson(path: str) -> List[Dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_main_exports_every_device_and_logger(
+        clouds: Tuple[FakeTuyaCloud, FakeHoboCloud], tmp_path: str
+) -> None:
+    tuya, hobo = clouds
+    output = os.path.join(tmp_path, "out")
+
+    status = export.main([
+        _config(tmp_path), "--start", "2021-10-15", "--end", "2021-10-16", "--utc", "--output", output
+    ])
+
+    assert status == 0
+    assert sorted(os.listdir(os.path.join(output, "tuya"))) == ["PIR2.ndjson.gz", "PIR_1.ndjson.gz"]
+    assert sorted(os.listdir(os.path.join(output, "hobo"))) == ["12345.ndjson.gz", "L1.ndjson.gz"]
+
+    pir1 = _read_ndjson(os.path.join(output, "tuya", "PIR_1.ndjson.gz"))
+    assert sorted(record["event_time"] for record in pir1) == [START_MS + i * 1000 for i in range(250)]
+    assert {(record["device_name"], record["device_id"]) for record in pir1} == {("PIR 1", "dev1")}
+    assert list(pir1[0]) == [name for name, _ in export.TUYA_FIELDS]
+    pir2 = _read_ndjson(os.path.join(output, "tuya", "PIR2.ndjson.gz"))
+    assert [(record["event_time"], record["value"]) for record in pir2] == [(START_MS + 5000, "none")]
+    assert {(device, start, end) for device, start, end in tuya.log_requests} == {
+        ("dev1", START_MS, START_MS + 86400 * 1000), ("dev2", START_MS, START_MS + 86400 * 1000)
+    }
+
+    l1 = _read_ndjson(os.path.join(output, "hobo", "L1.ndjson.gz"))
+    assert [(record["timestamp"], record["si_value"]) for record in l1] == [
+        ("2021-10-15T04:00:00Z", 20.5), ("2021-10-15T16:00:00Z", 21.5)
+    ]
+    assert _read_ndjson(os.path.join(output, "hobo", "12345.ndjson.gz")) == []
+    assert sorted(hobo.data_requests) == sorted(
+        (logger_sn, start, end)
+        for logger_sn in ("L1", "12345")
+        for start, end in [("2021-10-15 00:00:00", "2021-10-15 11:59:59"),
+                           ("2021-10-15 12:00:00", "2021-10-15 23:59:59"),
+                           ("2021-10-16 00:00:00", "2021-10-16 00:00:00")]
+    )
+
+
+def test_main_exports_one_platform_as_csv(clouds: Tuple[FakeTuyaCloud, FakeHoboCloud], tmp_path: str) -> None:
+    tuya, hobo = clouds
+    output = os.path.join(tmp_path, "out")
+
+    status = export.main([
+        _config(tmp_path, tuya_devices=["dev2"]), "--start", "2021-10-15 02:00:00+02:00",
+        "--end", "2021-10-16 02:00:00+02:00", "--output", output, "--format", "csv", "--compression", "none",
+        "--platform", "tuya"
+    ])
+
+    assert status == 0
+    assert os.listdir(output) == ["tuya"]
+    with open(os.path.join(output, "tuya", "dev2.csv"), encoding="utf8", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == [name for name, _ in export.TUYA_FIELDS]
+    assert rows[1:] == [["dev2", "dev2", "pir", "none", str(START_MS + 5000), "1", "7", "1"]]
+    assert hobo.data_requests == []
+
+
+def test_main_reports_failed_exports_without_partial_files(
+        clouds: Tuple[FakeTuyaCloud, FakeHoboCloud], tmp_path: str
+) -> None:
+    tuya, _ = clouds
+    tuya.route("GET", r"/v1.0/devices/dev2/logs", lambda request: error(1106, "permission deny"))
+    output = os.path.join(tmp_path, "out")
+
+    status = export.main([
+        _config(tmp_path), "--start", "2021-10-15", "--end", "2021-10-16", "--utc", "--output", output,
+        "--platform", "tuya"
+    ])
+
+    assert status == 1
+    assert os.listdir(os.path.join(output, "tuya")) == ["PIR_1.ndjson.gz"]
+
+
+@pytest.mark.parametrize("chunk_hours", [0, -1])
+def test_invalid_chunk_hours_is_a_configuration_error(
+        chunk_hours: float, tmp_path: str, capsys: pytest.CaptureFixture[str]
+) -> None:
+    config = _write_config(tmp_path, {"hobo": {
+        "endpoint": ENDPOINT, "client_id": "id", "client_secret": "secret", "user_id": "user",
+        "loggers": ["L1"], "chunk_hours": chunk_hours,
+    }})
+    assert export.main([config, "--start", "2021-10-15", "--end", "2021-10-16", "--output", str(tmp_path)]) == 2
+    assert "chunk_hours" in capsys.readouterr().err
+
+
+def test_export_hobo_logger_rejects_an_empty_chunk_period(tmp_path: str) -> None:
+    cloud = FakeHoboCloud()
+    api = HoboAPI("id", "secret", "user", endpoint=ENDPOINT, transport=cloud.transport())
+    writer = export.open_writer(os.path.join(tmp_path, "L1"), export.HOBO_FIELDS, "ndjson")
+    with pytest.raises(ValueError):
+        export.export_hobo_logger(
+            api, "L1", datetime(2021, 10, 15), datetime(2021, 10, 16), writer, chunk_period=timedelta(0)
+        )
+    writer.abort()
+    assert cloud.data_requests == []
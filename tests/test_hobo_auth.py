@@ -0,0 +1,74 @@
+"""Lazy authentication of HoboAPI."""
+
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+import pytest
+
+from bestlab_platform.exceptions import BatchRequestError
+from bestlab_platform.hobo import HoboAPI
+from tests.fakes import ENDPOINT, FakeHoboCloud, FakeRequest
+
+
+def _api(cloud: FakeHoboCloud, client_id: str = "id", user_id: str = "user", **kwargs: Any) -> HoboAPI:
+    return HoboAPI(client_id, "secret", user_id, endpoint=ENDPOINT, transport=cloud.transport(), **kwargs)
+
+
+def test_auto_connect_false_defers_the_token_to_the_first_request() -> None:
+    cloud = FakeHoboCloud()
+    api = _api(cloud, auto_connect=False)
+
+    assert cloud.paths == []
+    assert not api.is_connect()
+    api.get_data(["L1"], "2021-10-15 00:00:00", "2021-10-15 23:59:59")
+    assert cloud.paths == ["/ws/auth/token", "/ws/data/file/JSON/user/user"]
+    assert api.is_connect()
+
+
+def test_connect_is_a_no_op_with_a_valid_token() -> None:
+    cloud = FakeHoboCloud()
+    api = _api(cloud)
+
+    api.connect()
+    assert cloud.paths == ["/ws/auth/token"]
+
+
+def test_prewarm_gets_the_tokens_concurrently() -> None:
+    cloud = FakeHoboCloud()
+    apis = [_api(cloud, client_id=f"client-{number}", user_id=f"u{number}", auto_connect=False) for number in range(4)]
+    # Every token request waits for the others: requesting them one after another would never get past it.
+    barrier = threading.Barrier(len(apis), timeout=5)
+
+    def token(request: FakeRequest) -> Any:
+        barrier.wait()
+        return {"access_token": request.body["client_id"], "token_type": "bearer", "expires_in": 600}
+
+    cloud.route("POST", r"/ws/auth/token", token)
+
+    HoboAPI.prewarm(apis, max_workers=len(apis))
+
+    assert [api.token_info.access_token for api in apis if api.token_info is not None] == [
+        "client-0", "client-1", "client-2", "client-3"
+    ]
+    # Connected instances are skipped.
+    HoboAPI.prewarm(apis)
+    assert cloud.paths.count("/ws/auth/token") == 4
+
+
+def test_prewarm_reports_the_failures_by_user() -> None:
+    cloud = FakeHoboCloud()
+    cloud.route(
+        "POST", r"/ws/auth/token",
+        lambda request: (401, {"error": "invalid_client"}) if request.body["client_id"] == "bad" else
+        {"access_token": "H1", "token_type": "bearer", "expires_in": 600}
+    )
+    good = _api(cloud, client_id="good", user_id="u1", auto_connect=False)
+    bad = _api(cloud, client_id="bad", user_id="u2", auto_connect=False)
+
+    with pytest.raises(BatchRequestError) as e:
+        HoboAPI.prewarm([good, bad])
+    assert list(e.value.errors) == ["u2"]
+    assert good.is_connect()
+    assert not bad.is_connect()
@@ -0,0 +1,71 @@
+"""Columnar (NumPy/pandas) conversion of HOBO observations."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import pytest
+
+from bestlab_platform.hobo import HoboAPI
+from bestlab_platform.hobo.columnar import (observations_to_arrays,
+                                            observations_to_dataframe)
+from tests.fakes import ENDPOINT, FakeHoboCloud, hobo_observation
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+
+def _observations() -> List[Dict[str, Any]]:
+    observations = [
+        hobo_observation("L1", "2021-10-15 00:00:00", 20.5, "s1"),
+        hobo_observation("L1", "2021-10-15 00:00:00", 55.0, "s2"),
+        hobo_observation("L1", "2021-10-15 00:01:00", 21.0, "s1"),
+        hobo_observation("L1", "2021-10-15 00:01:00", 56.0, "s2"),
+    ]
+    observations[1]["si_unit"] = "%"
+    observations[3]["si_unit"] = "%"
+    # A field missing in some observations
+    observations[2]["sensor_measurement_type"] = "Temperature"
+    return observations
+
+
+def test_arrays_per_sensor() -> None:
+    arrays = observations_to_arrays({"observation_list": _observations()})
+
+    assert list(arrays) == ["s1", "s2"]
+    s1 = arrays["s1"]
+    assert s1["timestamp"].astype(np.int64).tolist() == [1634256000, 1634256060]
+    assert s1["si_value"].tolist() == [20.5, 21.0]
+    assert np.isnan(s1["us_value"]).all()
+    assert s1["si_unit_categories"][s1["si_unit"]].tolist() == ["°C", "°C"]
+    assert s1["sensor_measurement_type_categories"][s1["sensor_measurement_type"]].tolist() == [None, "Temperature"]
+    assert arrays["s2"]["si_unit_categories"].tolist() == ["%"]
+
+
+def test_dataframe_has_one_row_per_observation() -> None:
+    dataframe = observations_to_dataframe(_observations())
+
+    assert list(dataframe["sensor_sn"]) == ["s1", "s1", "s2", "s2"]
+    assert str(dataframe["sensor_sn"].dtype) == "category"
+    assert str(dataframe["si_unit"].dtype) == "category"
+    assert list(dataframe["si_unit"]) == ["°C", "°C", "%", "%"]
+    assert list(dataframe["si_value"]) == [20.5, 21.0, 55.0, 56.0]
+    assert dataframe["timestamp"].iloc[1] == pd.Timestamp("2021-10-15 00:01:00", tz="UTC")
+    # Missing values of a categorical field
+    assert dataframe["sensor_measurement_type"].isna().tolist() == [True, False, True, True]
+
+
+def test_empty_dataframe_has_the_value_columns() -> None:
+    dataframe = observations_to_dataframe({"observation_list": []})
+
+    assert dataframe.empty
+    assert {"sensor_sn", "timestamp", "si_value", "us_value", "scaled_value"} <= set(dataframe.columns)
+
+
+def test_get_data_dataframe() -> None:
+    cloud = FakeHoboCloud(_observations())
+    api = HoboAPI("id", "secret", "user", endpoint=ENDPOINT, transport=cloud.transport())
+
+    dataframe = api.get_data_dataframe(["L1"], "2021-10-15 00:00:00", "2021-10-15 00:00:59")
+
+    assert list(dataframe["si_value"]) == [20.5, 55.0]
@@ -0,0 +1,60 @@
+"""Incremental synchronization of HOBO observations."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from bestlab_platform.hobo import (HoboAPI, HoboDataSync,
+                                   SQLiteHoboObservationStore)
+from bestlab_platform.hobo.webapi import HOBO_DATETIME_FORMAT
+from tests.fakes import ENDPOINT, FakeHoboCloud, hobo_observation
+
+
+def _sync(cloud: FakeHoboCloud, loggers: list[str]) -> HoboDataSync:
+    api = HoboAPI("id", "secret", "user", endpoint=ENDPOINT, transport=cloud.transport())
+    return HoboDataSync(api, loggers, SQLiteHoboObservationStore(":memory:"))
+
+
+def _ago(delta: timedelta) -> str:
+    return (datetime.utcnow() - delta).strftime(HOBO_DATETIME_FORMAT)
+
+
+def test_synced_ranges_are_not_requested_again_even_without_data() -> None:
+    cloud = FakeHoboCloud([hobo_observation("L1", "2021-10-15 05:00:00")])
+    hobo_sync = _sync(cloud, ["L1", "L2"])
+
+    assert hobo_sync.sync("2021-10-15 00:00:00", "2021-10-15 10:00:00") == 1
+    assert cloud.data_requests == [("L1,L2", "2021-10-15 00:00:00", "2021-10-15 10:00:00")]
+
+    # L2 has no observation, L1 none after 05:00: nothing is requested again.
+    assert hobo_sync.sync("2021-10-15 00:00:00", "2021-10-15 10:00:00") == 0
+    assert len(cloud.data_requests) == 1
+
+
+def test_gaps_between_syncs_are_filled() -> None:
+    cloud = FakeHoboCloud([hobo_observation("L1", "2021-10-15 12:00:00")])
+    hobo_sync = _sync(cloud, ["L1"])
+    hobo_sync.sync("2021-10-15 00:00:00", "2021-10-15 10:00:00")
+    hobo_sync.sync("2021-10-15 20:00:00", "2021-10-15 23:00:00")
+
+    assert hobo_sync.sync("2021-10-15 00:00:00", "2021-10-16 00:00:00") == 1
+    assert cloud.data_requests[2:] == [
+        ("L1", "2021-10-15 10:00:01", "2021-10-15 19:59:59"),
+        ("L1", "2021-10-15 23:00:01", "2021-10-16 00:00:00"),
+    ]
+    assert [row["timestamp"] for row in hobo_sync.query(logger_sn="L1")] == ["2021-10-15T12:00:00Z"]
+
+
+def test_recent_ranges_are_requested_again_for_late_uploads() -> None:
+    cloud = FakeHoboCloud()
+    hobo_sync = _sync(cloud, ["L1"])
+    start = _ago(timedelta(days=3))
+    assert hobo_sync.sync(start, upload_lag=timedelta(hours=1)) == 0
+
+    # Uploaded after the first sync, 30 minutes late
+    cloud.observations.append(hobo_observation("L1", _ago(timedelta(minutes=30))))
+    assert hobo_sync.sync(start, upload_lag=timedelta(hours=1)) == 1
+    assert len(hobo_sync.query(logger_sn="L1")) == 1
+    # Only the last hour (and the seconds elapsed since the first sync) is requested again.
+    second_start = datetime.strptime(cloud.data_requests[1][1], HOBO_DATETIME_FORMAT)
+    assert datetime.utcnow() - second_start < timedelta(hours=1, minutes=1)
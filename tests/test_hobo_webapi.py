@@ -0,0 +1,59 @@
+"""Chunked requests of HoboAPI.get_data()."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+
+from bestlab_platform.hobo import HoboAPI
+from tests.fakes import ENDPOINT, FakeHoboCloud, hobo_observation
+
+
+def _api(cloud: FakeHoboCloud) -> HoboAPI:
+    return HoboAPI("id", "secret", "user", endpoint=ENDPOINT, transport=cloud.transport())
+
+
+def test_chunks_cover_the_range_once_and_are_merged_in_timestamp_order() -> None:
+    cloud = FakeHoboCloud([
+        hobo_observation(logger_sn, f"2021-10-15 {hour:02d}:00:00")
+        for hour in range(0, 24, 5) for logger_sn in ("L1", "L2", "L3")
+    ])
+    response = _api(cloud).get_data(
+        ["L1", "L2", "L3"], "2021-10-15 00:00:00", "2021-10-15 23:59:59",
+        chunk_period=timedelta(hours=10), loggers_per_chunk=2
+    )
+
+    assert sorted(cloud.data_requests) == [
+        ("L1,L2", "2021-10-15 00:00:00", "2021-10-15 09:59:59"),
+        ("L1,L2", "2021-10-15 10:00:00", "2021-10-15 19:59:59"),
+        ("L1,L2", "2021-10-15 20:00:00", "2021-10-15 23:59:59"),
+        ("L3", "2021-10-15 00:00:00", "2021-10-15 09:59:59"),
+        ("L3", "2021-10-15 10:00:00", "2021-10-15 19:59:59"),
+        ("L3", "2021-10-15 20:00:00", "2021-10-15 23:59:59"),
+    ]
+    timestamps = [observation["timestamp"] for observation in response["observation_list"]]
+    assert len(timestamps) == 15
+    assert timestamps == sorted(timestamps)
+    assert response["message"] == "OK: Found: 15 results."
+
+
+def test_single_request_without_chunking() -> None:
+    cloud = FakeHoboCloud([hobo_observation("L1", "2021-10-15 01:00:00")])
+    response = _api(cloud).get_data("L1", "2021-10-15 00:00:00", "2021-10-16 00:00:00")
+    assert cloud.data_requests == [("L1", "2021-10-15 00:00:00", "2021-10-16 00:00:00")]
+    assert len(response["observation_list"]) == 1
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"chunk_period": timedelta(0)},
+    {"chunk_period": timedelta(hours=-1)},
+    {"chunk_period": timedelta(milliseconds=500)},
+    {"loggers_per_chunk": 0},
+    {"loggers_per_chunk": -2},
+])
+def test_invalid_chunking_is_rejected_before_any_request(kwargs: dict[str, object]) -> None:
+    cloud = FakeHoboCloud()
+    with pytest.raises(ValueError):
+        _api(cloud).get_data(["L1"], "2021-10-15 00:00:00", "2021-10-16 00:00:00", **kwargs)
+    assert cloud.data_requests == []
@@ -0,0 +1,112 @@
+"""Request metrics of the API clients."""
+
+from __future__ import annotations
+
+import math
+from typing import List
+
+import pytest
+
+from bestlab_platform.exceptions import ResponseError
+from bestlab_platform.hobo import HoboAPI
+from bestlab_platform.metrics import (CLIENT_HOBO, CLIENT_TUYA, Histogram,
+                                      RequestEvent, RequestMetrics,
+                                      path_template)
+from bestlab_platform.retry import RETRY_TRANSIENT, RetryPolicy
+from bestlab_platform.tuya import TuyaOpenAPI
+from tests.fakes import ENDPOINT, FakeHoboCloud, FakeTuyaCloud, error, ok
+
+
+@pytest.mark.parametrize("path, template", [
+    ("/v1.0/devices/eb0123456789abcdef/logs", "/v1.0/devices/{id}/logs"),
+    ("/v1.0/token/0f1e2d3c4b5a69788796", "/v1.0/token/{id}"),
+    ("/v1.0/devices/d1,d2", "/v1.0/devices/{id}"),
+    ("/ws/data/file/JSON/user/12345", "/ws/data/file/JSON/user/{id}"),
+    ("/v1.0/devices", "/v1.0/devices"),
+])
+def test_path_template(path: str, template: str) -> None:
+    assert path_template(path) == template
+
+
+def test_histogram_quantile_interpolates_within_the_bucket() -> None:
+    histogram = Histogram((0.1, 0.2, 0.4))
+    for value in (0.05, 0.15, 0.15, 0.3, 1.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.quantile(0.5) == pytest.approx(0.1 + 0.1 * 1.5 / 2)
+    assert histogram.quantile(0.99) == 0.4
+    assert math.isnan(Histogram((1.0,)).quantile(0.5))
+
+
+def test_shared_metrics_aggregate_both_clients() -> None:
+    metrics = RequestMetrics()
+    events: List[RequestEvent] = []
+    metrics.add_hook(events.append)
+    tuya_cloud = FakeTuyaCloud()
+    tuya_cloud.route("GET", r"/v1.0/devices/eb0123456789abcdef", lambda request: ok({"id": "d1"}))
+    tuya_cloud.route("GET", r"/v1.0/devices/eb0123456789abcdee", lambda request: error(1106, "permission deny"))
+    tuya_api = TuyaOpenAPI(ENDPOINT, "id", "secret", metrics=metrics, transport=tuya_cloud.transport())
+    hobo_cloud = FakeHoboCloud()
+    hobo_cloud.route("GET", r"/ws/data/file/JSON/user/12345", lambda request: (503, {}))
+    hobo_api = HoboAPI(
+        "id", "secret", 12345, endpoint=ENDPOINT, metrics=metrics, transport=hobo_cloud.transport(),
+        retry_policy=RetryPolicy(max_attempts=2, backoff=0.001)
+    )
+
+    tuya_api.get("/v1.0/devices/eb0123456789abcdef")
+    with pytest.raises(ResponseError):
+        tuya_api.get("/v1.0/devices/eb0123456789abcdee")
+    with pytest.raises(ResponseError):
+        hobo_api.get_data(["L1"], "2021-10-15 00:00:00", "2021-10-15 23:59:59")
+
+    assert metrics.requests == {
+        (CLIENT_TUYA, "GET", "/v1.0/token", "200"): 1,
+        (CLIENT_TUYA, "GET", "/v1.0/devices/{id}", "200"): 2,
+        (CLIENT_HOBO, "POST", "/ws/auth/token", "200"): 1,
+        (CLIENT_HOBO, "GET", "/ws/data/file/JSON/user/{id}", "503"): 2,
+    }
+    assert metrics.error_codes == {(CLIENT_TUYA, "1106"): 1}
+    assert metrics.retries == {(CLIENT_HOBO, RETRY_TRANSIENT): 1}
+    assert metrics.token_refreshes == {CLIENT_TUYA: 1, CLIENT_HOBO: 1}
+    assert metrics.latency_histogram(client=CLIENT_TUYA).count == 3
+    assert metrics.response_bytes[(CLIENT_TUYA, "GET", "/v1.0/devices/{id}")] > 0
+    assert [event.endpoint for event in events if event.client == CLIENT_HOBO] == [
+        "/ws/auth/token", "/ws/data/file/JSON/user/{id}", "/ws/data/file/JSON/user/{id}"
+    ]
+
+
+def test_failing_hook_is_ignored() -> None:
+    metrics = RequestMetrics()
+
+    def hook(event: RequestEvent) -> None:
+        raise RuntimeError("broken hook")
+
+    metrics.add_hook(hook)
+    metrics.record_request(CLIENT_TUYA, "GET", "/v1.0/devices", 200, 0.01)
+    metrics.remove_hook(hook)
+
+    assert metrics.requests == {(CLIENT_TUYA, "GET", "/v1.0/devices", "200"): 1}
+
+
+def test_prometheus_export() -> None:
+    metrics = RequestMetrics(latency_buckets=(0.1, 1.0))
+    metrics.record_request(CLIENT_TUYA, "GET", "/v1.0/devices/eb0123456789abcdef/logs", 200, 0.05, 100)
+    metrics.record_request(CLIENT_TUYA, "GET", "/v1.0/devices/eb0123456789abcdef/logs", None, 2.0)
+    metrics.record_retry(CLIENT_TUYA, RETRY_TRANSIENT)
+
+    lines = metrics.to_prometheus().splitlines()
+
+    labels = 'client="tuya",method="GET",endpoint="/v1.0/devices/{id}/logs"'
+    assert f'bestlab_requests_total{{{labels},status="200"}} 1' in lines
+    assert f'bestlab_requests_total{{{labels},status="error"}} 1' in lines
+    assert f'bestlab_request_duration_seconds_bucket{{{labels},le="0.1"}} 1' in lines
+    assert f'bestlab_request_duration_seconds_bucket{{{labels},le="1.0"}} 1' in lines
+    assert f'bestlab_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in lines
+    assert f"bestlab_request_duration_seconds_count{{{labels}}} 2" in lines
+    assert f"bestlab_response_bytes_total{{{labels}}} 100" in lines
+    assert 'bestlab_retries_total{client="tuya",kind="transient"} 1' in lines
+    assert "# TYPE bestlab_request_duration_seconds histogram" in lines
+
+    metrics.reset()
+    assert metrics.requests == {}
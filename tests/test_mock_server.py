@@ -0,0 +1,35 @@
+"""Device log of the benchmark mock server."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Iterator
+
+import pytest
+
+from benchmarks.mock_server import MockConfig, MockHTTPServer
+from bestlab_platform.tuya import SmartHomeDeviceAPI, TuyaOpenAPI
+
+
+@pytest.fixture
+def endpoint() -> Iterator[str]:
+    server = MockHTTPServer(("127.0.0.1", 0), MockConfig(latency=0, log_records=1000))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("num_windows", [1, 4])
+def test_device_log_is_limited_to_the_time_range(endpoint: str, num_windows: int) -> None:
+    device_api = SmartHomeDeviceAPI(TuyaOpenAPI(endpoint, "id", "secret"))
+    end = int(time.time()) * 1000 + 500
+    start = end - 300 * 1000
+
+    logs = device_api.get_device_log("device-0", start, end, num_windows=num_windows)
+
+    assert [log["event_time"] for log in logs] == list(range(end - 500, start, -1000))
+    if num_windows > 1:
+        assert logs == device_api.get_device_log("device-0", start, end)
@@ -0,0 +1,83 @@
+"""Redaction of sensitive values in the debug logs."""
+
+from __future__ import annotations
+
+import copy
+import json
+import logging
+from typing import Any
+
+import pytest
+
+from bestlab_platform.tuya import TuyaOpenAPI, openapi
+from bestlab_platform.tuya.openlogging import STAR, filter_dumps, filter_logger
+from tests.fakes import ENDPOINT, FakeTuyaCloud, ok
+
+RESPONSE = {
+    "success": True,
+    "result": {
+        "access_token": "secret-token",
+        "devices": [{"id": "d1", "ip": "10.0.0.1", "local_key": "k", "name": "PIR1"}],
+        "location": {"lat": 40.1, "lon": -88.2},
+    },
+}
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_filter_dumps_masks_sensitive_values_at_any_level(indent: Any) -> None:
+    original = copy.deepcopy(RESPONSE)
+
+    text = filter_dumps(RESPONSE, indent=indent)
+
+    expected = copy.deepcopy(RESPONSE)
+    expected["result"]["access_token"] = STAR
+    expected["result"]["devices"][0].update(ip=STAR, local_key=STAR)
+    expected["result"]["location"] = {"lat": STAR, "lon": STAR}
+    assert text == json.dumps(expected, ensure_ascii=False, indent=indent)
+    assert RESPONSE == original
+
+
+def test_filter_dumps_masks_sensitive_objects() -> None:
+    text = filter_dumps({"result": {"uid": {"nested": "value"}, "name": "n"}}, indent=2)
+
+    assert json.loads(text) == {"result": {"uid": STAR, "name": "n"}}
+    assert text == json.dumps({"result": {"uid": STAR, "name": "n"}}, indent=2)
+
+
+def test_filter_logger_only_copies_what_it_masks() -> None:
+    response = {"success": True, "result": [{"id": "d1"}, {"id": "d2", "uid": "u"}]}
+
+    filtered = filter_logger(response)
+
+    assert filtered["result"][0] is response["result"][0]
+    assert filtered["result"][1] == {"id": "d2", "uid": STAR}
+    assert response["result"][1]["uid"] == "u"
+    assert filter_logger({"success": True, "result": {"id": "d1"}})["result"] == {"id": "d1"}
+
+
+def _api(cloud: FakeTuyaCloud) -> TuyaOpenAPI:
+    cloud.route("GET", r"/v1.0/devices/d1", lambda request: ok({"id": "d1", "local_key": "device-secret"}))
+    return TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport())
+
+
+def test_debug_log_hides_tokens_and_keys(caplog: pytest.LogCaptureFixture) -> None:
+    with caplog.at_level(logging.DEBUG, logger="bestlab_platform.tuya"):
+        api = _api(FakeTuyaCloud())
+        assert api.get("/v1.0/devices/d1")["result"]["local_key"] == "device-secret"
+
+    assert '"access_token": "***"' in caplog.text
+    assert "device-secret" not in caplog.text
+    assert '"A1"' not in caplog.text
+
+
+def test_nothing_is_serialized_for_the_log_when_debug_is_disabled(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    def fail(*args: Any, **kwargs: Any) -> str:
+        raise AssertionError("serialized for a disabled log level")
+
+    monkeypatch.setattr(openapi, "filter_dumps", fail)
+
+    with caplog.at_level(logging.INFO, logger="bestlab_platform.tuya"):
+        api = _api(FakeTuyaCloud())
+        assert api.get("/v1.0/devices/d1")["success"]
@@ -0,0 +1,113 @@
+"""Change-driven status polling of TuyaDeviceManager."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, List
+
+from bestlab_platform.retry import RetryPolicy
+from bestlab_platform.tuya import TuyaDeviceManager, TuyaOpenAPI
+from bestlab_platform.tuya.polling import (PollSchedule, StatusChange,
+                                           StatusSnapshot)
+from tests.fakes import ENDPOINT, FakeRequest, FakeTuyaCloud, tuya_device
+
+
+def test_snapshot_reports_new_and_changed_values() -> None:
+    snapshot = StatusSnapshot()
+
+    assert snapshot.update("d1", [{"code": "switch", "value": True}, {"code": "temp", "value": 1}]) == [
+        ("switch", True, None), ("temp", 1, None)
+    ]
+    assert snapshot.update("d1", [{"code": "switch", "value": True}, {"code": "temp", "value": 1}]) == []
+    # Equal values of another type are a change.
+    assert snapshot.update("d1", [{"code": "switch", "value": 1}]) == [("switch", 1, True)]
+    assert snapshot.get("d1", "temp") == 1
+    assert snapshot.to_dict() == {"d1": {"switch": 1, "temp": 1}}
+    snapshot.clear()
+    assert snapshot.get("d1", "temp", "unknown") == "unknown"
+
+
+def test_schedule_keeps_a_fixed_rate_and_skips_missed_ticks() -> None:
+    schedule = PollSchedule(0.05)
+
+    time.sleep(0.02)
+    assert schedule.wait()
+    assert time.monotonic() - schedule.start >= 0.05
+    time.sleep(0.12)
+    assert schedule.wait()
+    assert schedule.missed_ticks == 2
+    assert schedule.ticks == 4
+    assert time.monotonic() - schedule.start >= 0.2
+
+    stop = threading.Event()
+    stop.set()
+    assert not PollSchedule(10, stop).wait()
+
+
+def _manager(cloud: FakeTuyaCloud) -> TuyaDeviceManager:
+    api = TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport(), retry_policy=RetryPolicy(max_attempts=1))
+    return TuyaDeviceManager(api, device_map={"PIR1": "d1", "PIR2": "d2"})
+
+
+def _cloud() -> FakeTuyaCloud:
+    cloud = FakeTuyaCloud()
+    cloud.devices = {"d1": tuya_device("d1", pir="none"), "d2": tuya_device("d2", pir="none")}
+    return cloud
+
+
+def test_only_changes_are_yielded() -> None:
+    cloud = _cloud()
+    polls: List[List[StatusChange]] = []
+
+    for changes in _manager(cloud).poll_status(0.01, max_polls=4):
+        polls.append(changes)
+        cloud.devices["d2"] = tuya_device("d2", pir="pir")
+
+    assert [(change.device_name, change.value, change.previous_value) for change in polls[0]] == [
+        ("PIR1", "none", None), ("PIR2", "none", None)
+    ]
+    assert [(change.device_name, change.code, change.value, change.previous_value) for change in polls[1]] == [
+        ("PIR2", "pir", "pir", "none")
+    ]
+    assert len(polls) == 2
+    assert cloud.paths.count("/v1.0/devices/") == 4
+
+
+def test_failed_poll_does_not_stop_polling() -> None:
+    cloud = _cloud()
+    device_list = cloud._device_list
+    requests = [0]
+
+    def flaky(request: FakeRequest) -> Any:
+        requests[0] += 1
+        return (500, {}) if requests[0] == 2 else device_list(request)
+
+    cloud.route("GET", r"/v1.0/devices/", flaky)
+    polls: List[List[StatusChange]] = []
+    for changes in _manager(cloud).poll_status(0.01, max_polls=3):
+        polls.append(changes)
+        cloud.devices["d1"] = tuya_device("d1", pir="pir")
+
+    assert requests[0] == 3
+    # The change is seen by the poll after the failed one.
+    assert len(polls) == 2
+    assert [(change.device_id, change.value) for change in polls[1]] == [("d1", "pir")]
+
+
+def test_watch_status_stops_with_the_stop_event() -> None:
+    cloud = _cloud()
+    stop = threading.Event()
+    snapshot = StatusSnapshot()
+    received: List[List[StatusChange]] = []
+
+    def callback(changes: List[StatusChange]) -> None:
+        received.append(changes)
+        stop.set()
+
+    _manager(cloud).watch_status(10, callback, stop_event=stop, snapshot=snapshot)
+
+    assert len(received) == 1
+    assert snapshot.to_dict() == {"d1": {"pir": "none"}, "d2": {"pir": "none"}}
+    # Resuming with the same snapshot does not emit the known values again.
+    assert list(_manager(cloud).poll_status(0.01, max_polls=1, snapshot=snapshot)) == []
@@ -0,0 +1,64 @@
+"""Prepared requests of TuyaOpenAPI, sent several times with new parameters."""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from bestlab_platform.tuya import TuyaOpenAPI
+from tests.fakes import (ENDPOINT, FakeRequest, FakeTuyaCloud, check_tuya_sign,
+                         ok)
+
+
+def _cloud() -> FakeTuyaCloud:
+    cloud = FakeTuyaCloud()
+
+    def echo(request: FakeRequest) -> Any:
+        check_tuya_sign(request)
+        return ok({"query": request.query, "body": request.body, "test_header": request.headers.get("X-Test")})
+
+    cloud.route("GET", r"/v1.0/echo", echo)
+    cloud.route("POST", r"/v1.0/echo", echo)
+    return cloud
+
+
+def test_prepared_request_is_sent_with_new_parameters() -> None:
+    cloud = _cloud()
+    api = TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport())
+    api.session.headers["X-Test"] = "session header"
+    request = api.prepare("GET", "/v1.0/echo", {"type": 7, "size": 100})
+    url = request.http_request.url
+
+    first = api.send_prepared(request)["result"]
+    page = api.send_prepared(request, {"start_row_key": "k 1"})["result"]
+    resized = api.send_prepared(request, {"size": 20})["result"]
+
+    assert first["query"] == {"type": "7", "size": "100"}
+    assert page["query"] == {"type": "7", "size": "100", "start_row_key": "k 1"}
+    assert resized["query"] == {"type": "7", "size": "20"}
+    assert first["test_header"] == "session header"
+    # The prepared request itself is not modified by the sends.
+    assert request.http_request.url == url
+    assert request.params == {"type": 7, "size": 100}
+
+
+def test_prepared_body_is_sent_as_signed() -> None:
+    cloud = _cloud()
+    api = TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport())
+    request = api.prepare("POST", "/v1.0/echo", body={"commands": [{"code": "switch", "value": True}]})
+
+    for _ in range(2):
+        assert api.send_prepared(request)["result"]["body"] == {"commands": [{"code": "switch", "value": True}]}
+
+
+def test_prepared_request_is_sent_concurrently() -> None:
+    cloud = _cloud()
+    api = TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport(latency=0.01))
+    request = api.prepare("GET", "/v1.0/echo", {"size": 100})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(
+            lambda key: api.send_prepared(request, {"start_row_key": key})["result"], map(str, range(32))
+        ))
+
+    assert [result["query"]["start_row_key"] for result in results] == [str(key) for key in range(32)]
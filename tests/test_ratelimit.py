@@ -0,0 +1,104 @@
+"""Client-side rate limiting of the Tuya client."""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, List
+
+import pytest
+
+from bestlab_platform.exceptions import ResponseError
+from bestlab_platform.tuya import TuyaOpenAPI
+from bestlab_platform.tuya.ratelimit import (TokenBucket, TuyaRateLimiter,
+                                             is_rate_limited)
+from tests.fakes import ENDPOINT, FakeRequest, FakeTuyaCloud, error, ok
+
+RATE_LIMITED = error(40000309, "request frequency limit exceeded")
+
+
+def test_token_bucket_allows_a_burst_then_spaces_requests() -> None:
+    bucket = TokenBucket(rate=10, capacity=2)
+
+    delays = [bucket.reserve() for _ in range(4)]
+
+    assert delays[:2] == [0.0, 0.0]
+    assert delays[2] == pytest.approx(0.1, abs=0.01)
+    assert delays[3] == pytest.approx(0.2, abs=0.01)
+
+
+def test_concurrent_reservations_get_distinct_slots() -> None:
+    limiter = TuyaRateLimiter({"device_logs": 10}, burst=1)
+    delays: List[float] = []
+    lock = threading.Lock()
+
+    def reserve() -> None:
+        delay = limiter.reserve("/v1.0/devices/d1/logs")
+        with lock:
+            delays.append(delay)
+
+    threads = [threading.Thread(target=reserve) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    delays.sort()
+    assert delays[0] == 0.0
+    assert all(later - earlier == pytest.approx(0.1, abs=0.02) for earlier, later in zip(delays, delays[1:]))
+
+
+def test_families_have_their_own_buckets() -> None:
+    limiter = TuyaRateLimiter({"commands": 1})
+
+    assert limiter.family("/v1.0/devices/d1/logs") == "device_logs"
+    assert limiter.family("/v1.0/devices/d1/commands") == "commands"
+    assert limiter.family("/v1.0/devices/d1") == "default"
+    assert limiter.reserve("/v1.0/devices/d1/commands") == 0.0
+    assert limiter.reserve("/v1.0/devices/d2/commands") > 0.5
+    # Families without a rate are not limited.
+    assert all(limiter.reserve("/v1.0/devices/d1") == 0.0 for _ in range(10))
+
+
+def test_rate_limited_requests_pause_the_family() -> None:
+    limiter = TuyaRateLimiter(backoff=0.5, max_backoff=1.0)
+
+    assert limiter.on_rate_limited("/v1.0/devices/d1/logs", 1) == 0.5
+    assert limiter.on_rate_limited("/v1.0/devices/d1/logs", 3) == 1.0
+    assert limiter.reserve("/v1.0/devices/d2/logs") == pytest.approx(1.0, abs=0.05)
+    assert limiter.reserve("/v1.0/devices/d2") == 0.0
+
+
+def test_is_rate_limited() -> None:
+    assert is_rate_limited(RATE_LIMITED)
+    assert is_rate_limited(error(1, "Too Many Requests"))
+    assert not is_rate_limited(error(1106, "permission deny"))
+    assert not is_rate_limited(ok(True))
+
+
+def _api(cloud: FakeTuyaCloud, failures: int, max_retries: int = 5) -> TuyaOpenAPI:
+    remaining = [failures]
+
+    def status(request: FakeRequest) -> Any:
+        if remaining[0] > 0:
+            remaining[0] -= 1
+            return RATE_LIMITED
+        return ok([{"code": "pir", "value": "none"}])
+
+    cloud.route("GET", r"/v1.0/devices/d1/status", status)
+    limiter = TuyaRateLimiter(backoff=0.01, max_retries=max_retries)
+    return TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport(), rate_limiter=limiter)
+
+
+def test_rate_limited_request_is_sent_again() -> None:
+    cloud = FakeTuyaCloud()
+
+    assert _api(cloud, failures=2).get("/v1.0/devices/d1/status")["success"]
+    assert cloud.paths.count("/v1.0/devices/d1/status") == 3
+
+
+def test_rate_limited_request_gives_up_after_max_retries() -> None:
+    cloud = FakeTuyaCloud()
+
+    with pytest.raises(ResponseError):
+        _api(cloud, failures=10, max_retries=2).get("/v1.0/devices/d1/status")
+    assert cloud.paths.count("/v1.0/devices/d1/status") == 3
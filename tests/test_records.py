@@ -0,0 +1,64 @@
+"""Compact record types of device logs and observations."""
+
+from __future__ import annotations
+
+import json
+import time
+
+from bestlab_platform.hobo import HoboAPI
+from bestlab_platform.records import (HoboObservation, TuyaLogRecord,
+                                      compact_device_log, compact_observations)
+from bestlab_platform.tuya import SmartHomeDeviceAPI, TuyaOpenAPI
+from tests.fakes import (ENDPOINT, FakeHoboCloud, FakeTuyaCloud,
+                         hobo_observation, tuya_record)
+
+
+def test_compact_device_log_keeps_the_fields_and_interns_strings() -> None:
+    # Decoded separately, like records of different pages: equal strings are distinct objects.
+    device_log = [json.loads(json.dumps(tuya_record(event_time, "va_temperature", "215"))) for event_time in (2, 1)]
+    assert device_log[0]["code"] is not device_log[1]["code"]
+
+    records = compact_device_log("d1", device_log)
+
+    assert records[0] == TuyaLogRecord("d1", "va_temperature", "215", 2, "1", 7, "1")
+    assert records[1]._asdict() == {"device_id": "d1", **device_log[1]}
+    assert records[0].code is records[1].code
+    assert records[0].value is records[1].value
+
+
+def test_compact_observations_accepts_the_response_or_the_list() -> None:
+    observations = [json.loads(json.dumps(hobo_observation("L1", f"2021-10-15 00:0{minute}:00"))) for minute in (0, 1)]
+    del observations[1]["si_unit"]
+
+    records = compact_observations({"observation_list": observations})
+
+    assert records == compact_observations(observations)
+    assert records[0] == HoboObservation(
+        "L1", "s1", "2021-10-15T00:00:00Z", data_type="TEMPERATURE", si_value=1.0, si_unit="°C"
+    )
+    assert records[1].si_unit is None
+    assert records[0].sensor_sn is records[1].sensor_sn
+    assert compact_observations({"observation_list": None}) == []
+
+
+def test_get_device_log_compact() -> None:
+    cloud = FakeTuyaCloud()
+    now = int(time.time() * 1000)
+    cloud.device_logs["d1"] = [tuya_record(now - i * 1000) for i in range(1, 250)]
+    device_api = SmartHomeDeviceAPI(TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport()))
+    start = now - 3600 * 1000
+
+    records = device_api.get_device_log("d1", start, now, compact=True)
+
+    assert records == compact_device_log("d1", device_api.get_device_log("d1", start, now))
+    assert records == device_api.get_device_log("d1", start, now, num_windows=3, compact=True)
+    assert all(isinstance(record, TuyaLogRecord) for record in records)
+
+
+def test_get_data_records() -> None:
+    cloud = FakeHoboCloud([hobo_observation("L1", "2021-10-15 00:00:00", 20.5)])
+    api = HoboAPI("id", "secret", "user", endpoint=ENDPOINT, transport=cloud.transport())
+
+    records = api.get_data_records(["L1"], "2021-10-15 00:00:00", "2021-10-15 23:59:59")
+
+    assert [(record.logger_sn, record.si_value) for record in records] == [("L1", 20.5)]
@@ -0,0 +1,151 @@
+"""Retry policy of the Tuya and HOBO clients."""
+
+from __future__ import annotations
+
+import random
+import time
+from typing import Any, Callable, List
+
+import pytest
+import requests
+
+from bestlab_platform.exceptions import ResponseError
+from bestlab_platform.hobo import HoboAPI
+from bestlab_platform.retry import (RETRY_TOKEN, RETRY_TRANSIENT, RetryPolicy,
+                                    RetryStats)
+from bestlab_platform.tuya import TuyaOpenAPI
+from tests.fakes import (ENDPOINT, FakeCloud, FakeHoboCloud, FakeRequest,
+                         FakeTuyaCloud, error, ok)
+
+FAST = RetryPolicy(max_attempts=3, backoff=0.001, max_backoff=0.001)
+
+
+def _failing(responses: List[Any], then: Any) -> Callable[[FakeRequest], Any]:
+    """Handler answering with the given responses first (exceptions are raised), then always with then."""
+    remaining = list(responses)
+
+    def handler(request: FakeRequest) -> Any:
+        response = remaining.pop(0) if remaining else then
+        if isinstance(response, BaseException):
+            raise response
+        return response
+
+    return handler
+
+
+def test_backoff_delay_is_jittered_below_the_exponential_cap() -> None:
+    policy = RetryPolicy(backoff=1.0, max_backoff=5.0)
+    random.seed(0)
+
+    for attempt, cap in [(1, 1.0), (2, 2.0), (3, 4.0), (4, 5.0), (10, 5.0)]:
+        delays = [policy.backoff_delay(attempt) for _ in range(100)]
+        assert all(0 <= delay <= cap for delay in delays)
+        assert max(delays) > cap / 2
+
+
+def test_can_retry_stops_at_max_attempts_and_max_time() -> None:
+    policy = RetryPolicy(max_attempts=3, max_time=10.0)
+    now = time.monotonic()
+
+    assert policy.can_retry(2, now)
+    assert not policy.can_retry(3, now)
+    assert not policy.can_retry(1, now, delay=11.0)
+    assert not policy.can_retry(1, now - 11.0)
+    assert RetryPolicy(max_time=None).can_retry(1, now - 1e6)
+
+
+def test_retry_stats_are_counted_per_kind() -> None:
+    stats = RetryStats()
+    stats.increment(RETRY_TOKEN)
+    stats.increment(RETRY_TRANSIENT)
+    stats.increment(RETRY_TRANSIENT)
+
+    assert stats.counts[RETRY_TRANSIENT] == 2
+    assert stats.total == 3
+
+
+def _tuya(cloud: FakeCloud) -> TuyaOpenAPI:
+    return TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport(), retry_policy=FAST)
+
+
+@pytest.mark.parametrize("failure", [(503, {}), requests.ConnectionError("reset"), requests.Timeout("read")])
+def test_tuya_transient_failures_are_retried(failure: Any) -> None:
+    cloud = FakeTuyaCloud()
+    cloud.route("GET", r"/v1.0/devices/d1", _failing([failure, failure], ok({"id": "d1"})))
+    api = _tuya(cloud)
+
+    assert api.get("/v1.0/devices/d1")["result"] == {"id": "d1"}
+    assert cloud.paths.count("/v1.0/devices/d1") == 3
+    assert api.retry_stats.counts[RETRY_TRANSIENT] == 2
+
+
+def test_tuya_gives_up_after_max_attempts() -> None:
+    cloud = FakeTuyaCloud()
+    cloud.route("GET", r"/v1.0/devices/d1", lambda request: (502, {}))
+
+    with pytest.raises(ResponseError) as e:
+        _tuya(cloud).get("/v1.0/devices/d1")
+    assert e.value.status_code == 502
+    assert cloud.paths.count("/v1.0/devices/d1") == FAST.max_attempts
+
+
+@pytest.mark.parametrize("failure", [(400, {}), error(1106, "permission deny")])
+def test_tuya_client_errors_are_not_retried(failure: Any) -> None:
+    cloud = FakeTuyaCloud()
+    cloud.route("GET", r"/v1.0/devices/d1", _failing([failure], ok({"id": "d1"})))
+    api = _tuya(cloud)
+
+    with pytest.raises(ResponseError):
+        api.get("/v1.0/devices/d1")
+    assert cloud.paths.count("/v1.0/devices/d1") == 1
+    assert api.retry_stats.total == 0
+
+
+def test_tuya_invalid_token_gets_a_new_token_and_retries_at_once() -> None:
+    cloud = FakeTuyaCloud()
+    cloud.route("GET", r"/v1.0/devices/d1", _failing([error(1010, "token invalid")], ok({"id": "d1"})))
+    api = _tuya(cloud)
+
+    assert api.get("/v1.0/devices/d1")["success"]
+    device_requests = [request for request in cloud.requests if request.path == "/v1.0/devices/d1"]
+    assert [request.headers["access_token"] for request in device_requests] == ["A1", "A2"]
+    assert api.retry_stats.counts[RETRY_TOKEN] == 1
+    assert api.retry_stats.total == 1
+
+
+def _hobo(cloud: FakeCloud) -> HoboAPI:
+    return HoboAPI("id", "secret", "user", endpoint=ENDPOINT, transport=cloud.transport(), retry_policy=FAST)
+
+
+DATA_PATH = r"/ws/data/file/JSON/user/user"
+DATA = {"message": "OK: Found: 0 results.", "observation_list": []}
+
+
+@pytest.mark.parametrize("failure", [(500, {}), requests.ConnectionError("reset")])
+def test_hobo_transient_failures_are_retried(failure: Any) -> None:
+    cloud = FakeHoboCloud()
+    cloud.route("GET", DATA_PATH, _failing([failure], DATA))
+    api = _hobo(cloud)
+
+    assert api.get_data(["L1"], "2021-10-15 00:00:00", "2021-10-15 23:59:59") == DATA
+    assert len(cloud.data_requests) == 2
+    assert api.retry_stats.counts[RETRY_TRANSIENT] == 1
+
+
+def test_hobo_unauthorized_gets_a_new_token() -> None:
+    cloud = FakeHoboCloud()
+    cloud.route("GET", DATA_PATH, _failing([(401, {})], DATA))
+    api = _hobo(cloud)
+
+    assert api.get_data(["L1"], "2021-10-15 00:00:00", "2021-10-15 23:59:59") == DATA
+    assert cloud.paths.count("/ws/auth/token") == 2
+    assert api.retry_stats.counts[RETRY_TOKEN] == 1
+
+
+def test_hobo_client_errors_are_not_retried() -> None:
+    cloud = FakeHoboCloud()
+    cloud.route("GET", DATA_PATH, lambda request: (404, {}))
+
+    with pytest.raises(ResponseError):
+        _hobo(cloud).get_data(["L1"], "2021-10-15 00:00:00", "2021-10-15 23:59:59")
+    assert len(cloud.data_requests) == 1
@@ -0,0 +1,116 @@
+"""Request signing of the Tuya clients and the JSON codecs."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, List
+from urllib.parse import urlencode
+
+import pytest
+
+from bestlab_platform.jsoncodec import JSON_CODECS, JSONCodec, get_json_codec
+from bestlab_platform.tuya import TuyaOpenAPI
+from bestlab_platform.tuya.signing import (TuyaRequestSigner,
+                                           TuyaRequestTemplate)
+from tests.fakes import (ENDPOINT, FakeRequest, FakeTuyaCloud, check_tuya_sign,
+                         ok, serve)
+
+SECRET = "secret"
+BODY = {"commands": [{"code": "switch", "value": True}], "name": "Küche / 1"}
+
+
+def _installed_codecs() -> List[str]:
+    names = []
+    for name in JSON_CODECS:
+        try:
+            get_json_codec(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def _signed_cloud() -> FakeTuyaCloud:
+    """Fake cloud checking the signature of every request."""
+    cloud = FakeTuyaCloud()
+
+    def commands(request: FakeRequest) -> Any:
+        check_tuya_sign(request)
+        return ok(request.body == BODY)
+
+    def logs(request: FakeRequest) -> Any:
+        check_tuya_sign(request)
+        return cloud._device_log(request)
+
+    cloud.route("POST", r"/v1.0/devices/d1/commands", commands)
+    cloud.route("GET", r"/v1.0/devices/(?P<device_id>[^/]+)/logs", logs)
+    return cloud
+
+
+def _signed_request(signer: TuyaRequestSigner, access_token: str, string_to_sign: str, url: str) -> FakeRequest:
+    sign, t = signer.sign(access_token, string_to_sign, t=1234)
+    return FakeRequest("GET", url, {"access_token": access_token, "t": str(t), "sign": sign}, None)
+
+
+def test_signer_matches_the_documented_algorithm() -> None:
+    signer = TuyaRequestSigner("id", SECRET)
+    params = {"type": 7, "start_time": "1", "size": 100}
+    template = TuyaRequestTemplate("GET", "/v1.0/devices/d1/logs", params)
+    url = f"{ENDPOINT}/v1.0/devices/d1/logs?"
+
+    for access_token in ("A1", "A1", "A2", ""):
+        check_tuya_sign(_signed_request(signer, access_token, template.string_to_sign(), url + template.url_query()))
+    # Parameters filled in later (page keys) are signed with the others.
+    page_params = {"start_row_key": "abc"}
+    check_tuya_sign(_signed_request(
+        signer, "A2", template.string_to_sign(page_params), url + template.url_query(page_params)
+    ))
+
+
+def test_url_query_is_encoded_like_requests() -> None:
+    template = TuyaRequestTemplate("GET", "/v1.0/devices", {"device_ids": "d1,d2", "name": "a b&c", "skip": None})
+
+    assert template.url_query() == urlencode([("device_ids", "d1,d2"), ("name", "a b&c")])
+    assert template.url_query({"page_no": 2}) == urlencode([("device_ids", "d1,d2"), ("name", "a b&c"), ("page_no", 2)])
+
+
+@pytest.mark.parametrize("codec_name", _installed_codecs())
+def test_requests_are_signed_with_the_bytes_sent(codec_name: str) -> None:
+    cloud = _signed_cloud()
+    api = TuyaOpenAPI(ENDPOINT, "id", SECRET, json_codec=get_json_codec(codec_name), transport=cloud.transport())
+
+    assert api.post("/v1.0/devices/d1/commands", BODY)["result"] is True
+    assert api.get("/v1.0/devices/d1/logs", {"type": 7, "start_time": 0, "end_time": 1, "size": 100})["success"]
+
+
+@pytest.mark.parametrize("codec_name", _installed_codecs())
+def test_async_requests_are_signed_with_the_bytes_sent(codec_name: str) -> None:
+    pytest.importorskip("aiohttp")
+    from bestlab_platform.tuya import AsyncTuyaOpenAPI
+
+    cloud = _signed_cloud()
+
+    async def main() -> Any:
+        async with serve(cloud) as endpoint:
+            async with AsyncTuyaOpenAPI(endpoint, "id", SECRET, json_codec=get_json_codec(codec_name)) as api:
+                return await api.post("/v1.0/devices/d1/commands", BODY)
+
+    assert asyncio.run(main())["result"] is True
+
+
+@pytest.mark.parametrize("codec_name", _installed_codecs())
+def test_codecs_round_trip(codec_name: str) -> None:
+    codec = get_json_codec(codec_name)
+
+    assert codec.loads(codec.dumps(BODY)) == BODY
+    assert codec.loads(codec.dumps(BODY).decode("utf8")) == BODY
+    with pytest.raises(ValueError):
+        codec.loads(b"{not json")
+
+
+def test_get_json_codec() -> None:
+    assert isinstance(get_json_codec(), JSONCodec)
+    assert get_json_codec() is get_json_codec()
+    assert get_json_codec("json").name == "json"
+    with pytest.raises(ValueError):
+        get_json_codec("simplejson")
@@ -0,0 +1,73 @@
+"""Token refresh of the Tuya clients."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from bestlab_platform.token_store import FileTokenStore, InMemoryTokenStore
+from bestlab_platform.tuya import TuyaOpenAPI
+from tests.fakes import ENDPOINT, FakeTuyaCloud, ok, serve
+
+TOKEN_KEY = f"tuya:{ENDPOINT}:id"
+
+
+def _device_route(cloud: FakeTuyaCloud) -> None:
+    cloud.route("GET", r"/v1.0/devices/d1", lambda request: ok({"id": "d1"}))
+
+
+def test_refresh_token_is_used_when_the_token_expires() -> None:
+    # Tokens valid for less than a minute are refreshed before every request.
+    cloud = FakeTuyaCloud(expire_time=30)
+    _device_route(cloud)
+    api = TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport())
+
+    assert api.get("/v1.0/devices/d1")["result"] == {"id": "d1"}
+    assert cloud.paths == ["/v1.0/token", "/v1.0/token/R1", "/v1.0/devices/d1"]
+    assert api.token_info is not None and api.token_info.access_token == "A2"
+
+
+@pytest.mark.parametrize("store_type", ["memory", "file"])
+def test_rejected_refresh_token_falls_back_to_a_new_token(store_type: str, tmp_path: str) -> None:
+    cloud = FakeTuyaCloud(expire_time=30)
+    _device_route(cloud)
+    token_store = InMemoryTokenStore() if store_type == "memory" else FileTokenStore(f"{tmp_path}/tokens.json")
+    api = TuyaOpenAPI(ENDPOINT, "id", "secret", token_store=token_store, transport=cloud.transport())
+    cloud.reject_refresh = True
+    cloud.expire_time = 7200
+
+    assert api.get("/v1.0/devices/d1")["success"]
+    assert api.get("/v1.0/devices/d1")["success"]
+    assert cloud.paths == ["/v1.0/token", "/v1.0/token/R1", "/v1.0/token", "/v1.0/devices/d1", "/v1.0/devices/d1"]
+    cached = token_store.load(TOKEN_KEY)
+    assert cached is not None and cached["refresh_token"] == "R2"
+
+    # Another client sharing the store uses the new token instead of the rejected refresh token.
+    other = TuyaOpenAPI(ENDPOINT, "id", "secret", token_store=token_store, transport=cloud.transport())
+    assert other.get("/v1.0/devices/d1")["success"]
+    assert cloud.paths[5:] == ["/v1.0/devices/d1"]
+
+
+def test_async_rejected_refresh_token_falls_back_to_a_new_token() -> None:
+    pytest.importorskip("aiohttp")
+    from bestlab_platform.tuya import AsyncTuyaOpenAPI
+
+    cloud = FakeTuyaCloud(expire_time=30)
+    _device_route(cloud)
+    token_store = InMemoryTokenStore()
+
+    async def main() -> str:
+        async with serve(cloud) as endpoint:
+            async with AsyncTuyaOpenAPI(endpoint, "id", "secret", token_store=token_store) as api:
+                await api.connect()
+                cloud.reject_refresh = True
+                cloud.expire_time = 7200
+                assert (await api.get("/v1.0/devices/d1"))["success"]
+                assert (await api.get("/v1.0/devices/d1"))["success"]
+        return endpoint
+
+    endpoint = asyncio.run(main())
+    assert cloud.paths == ["/v1.0/token", "/v1.0/token/R1", "/v1.0/token", "/v1.0/devices/d1", "/v1.0/devices/d1"]
+    cached = token_store.load(f"tuya:{endpoint}:id")
+    assert cached is not None and cached["refresh_token"] == "R2"
@@ -0,0 +1,120 @@
+"""Token caches shared by the API clients."""
+
+from __future__ import annotations
+
+import json
+import threading
+from typing import Any, List
+
+import pytest
+
+from bestlab_platform.hobo import HoboAPI
+from bestlab_platform.token_store import (FileTokenStore, InMemoryTokenStore,
+                                          TokenStore)
+from bestlab_platform.tuya import TuyaOpenAPI
+from tests.fakes import ENDPOINT, FakeHoboCloud, FakeTuyaCloud, ok
+
+
+def _run_together(functions: List[Any]) -> None:
+    """Call the functions in threads released at the same time."""
+    barrier = threading.Barrier(len(functions), timeout=5)
+    errors: List[BaseException] = []
+
+    def run(function: Any) -> None:
+        barrier.wait()
+        try:
+            function()
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(function,)) for function in functions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+@pytest.fixture(params=["memory", "file"])
+def token_store(request: Any, tmp_path: Any) -> TokenStore:
+    return InMemoryTokenStore() if request.param == "memory" else FileTokenStore(str(tmp_path / "tokens.json"))
+
+
+def test_clients_sharing_a_store_get_one_token(token_store: TokenStore) -> None:
+    cloud = FakeTuyaCloud()
+    cloud.route("GET", r"/v1.0/devices/d1", lambda request: ok({"id": "d1"}))
+    transport = cloud.transport(latency=0.02)
+    apis = [
+        TuyaOpenAPI(ENDPOINT, "id", "secret", auto_connect=False, token_store=token_store, transport=transport)
+        for _ in range(8)
+    ]
+
+    _run_together([lambda api=api: api.get("/v1.0/devices/d1") for api in apis])
+
+    assert cloud.paths.count("/v1.0/token") == 1
+    assert {api.token_info.access_token for api in apis if api.token_info is not None} == {"A1"}
+
+
+def test_expired_token_is_refreshed_once_by_concurrent_threads() -> None:
+    # Tokens valid for less than a minute are refreshed before the next request.
+    cloud = FakeTuyaCloud(expire_time=30)
+    cloud.route("GET", r"/v1.0/devices/d1", lambda request: ok({"id": "d1"}))
+    api = TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport(latency=0.02))
+    cloud.expire_time = 7200
+
+    _run_together([lambda: api.get("/v1.0/devices/d1")] * 8)
+
+    assert cloud.paths.count("/v1.0/token/R1") == 1
+    assert cloud.paths.count("/v1.0/token") == 1
+    assert cloud.paths.count("/v1.0/devices/d1") == 8
+
+
+def test_cached_token_is_reused_by_a_new_client(tmp_path: Any) -> None:
+    cloud = FakeTuyaCloud()
+    path = str(tmp_path / "tokens.json")
+    TuyaOpenAPI(ENDPOINT, "id", "secret", token_store=FileTokenStore(path), transport=cloud.transport())
+    # A new store on the same file, like in another process
+    api = TuyaOpenAPI(ENDPOINT, "id", "secret", token_store=FileTokenStore(path), transport=cloud.transport())
+
+    assert cloud.paths == ["/v1.0/token"]
+    assert api.token_info is not None and api.token_info.access_token == "A1"
+
+
+def test_hobo_clients_sharing_a_store_get_one_token(token_store: TokenStore) -> None:
+    cloud = FakeHoboCloud()
+    apis = [
+        HoboAPI("id", "secret", user_id, endpoint=ENDPOINT, token_store=token_store, transport=cloud.transport())
+        for user_id in ("u1", "u2")
+    ]
+
+    assert cloud.paths == ["/ws/auth/token"]
+    assert all(api.token_info is not None and api.token_info.access_token == "H1" for api in apis)
+
+
+def test_file_token_store(tmp_path: Any) -> None:
+    path = tmp_path / "tokens.json"
+    store = FileTokenStore(str(path))
+
+    assert store.load("k") is None
+    store.save("k", {"access_token": "a"})
+    store.save("other", {"access_token": "b"})
+    assert store.load("k") == {"access_token": "a"}
+    store.delete("k")
+    assert store.load("k") is None
+    assert json.loads(path.read_text()) == {"other": {"access_token": "b"}}
+    assert not [name for name in path.parent.iterdir() if name.suffix == ".tmp"]
+
+    # The lock is reentrant
+    with store.lock("k"), store.lock("other"):
+        store.save("k", {"access_token": "c"})
+    assert store.load("k") == {"access_token": "c"}
+
+
+def test_file_token_store_ignores_a_corrupted_file(tmp_path: Any) -> None:
+    path = tmp_path / "tokens.json"
+    path.write_text("{not json")
+    store = FileTokenStore(str(path))
+
+    assert store.load("k") is None
+    store.save("k", {"access_token": "a"})
+    assert store.load("k") == {"access_token": "a"}
@@ -0,0 +1,117 @@
+"""HTTP transports of the API clients."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, List, Tuple
+
+import pytest
+import requests
+
+from bestlab_platform.hobo import HoboAPI
+from bestlab_platform.transport import InMemoryTransport, RequestsTransport
+from bestlab_platform.tuya import TuyaOpenAPI
+from tests.fakes import ENDPOINT
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Answers every request with a Tuya token or an empty Tuya result, after the delay of a "delay" header."""
+
+    server: _Server
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.server.client_ports.append(self.client_address[1])
+        time.sleep(float(self.headers.get("delay", 0)))
+        result = {"access_token": "A1", "refresh_token": "R1", "expire_time": 7200, "uid": "u"}
+        body = json.dumps({
+            "success": True,
+            "result": result if self.path.startswith("/v1.0/token") else {},
+            "t": int(time.time() * 1000),
+        })
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode("utf8"))
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    client_ports: List[int]
+
+
+@pytest.fixture
+def server() -> Iterator[Tuple[str, _Server]]:
+    http_server = _Server(("127.0.0.1", 0), _Handler)
+    http_server.client_ports = []
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{http_server.server_address[1]}", http_server
+    http_server.shutdown()
+    http_server.server_close()
+
+
+def test_clients_sharing_a_transport_share_its_connections(server: Tuple[str, _Server]) -> None:
+    endpoint, http_server = server
+    transport = RequestsTransport(pool_maxsize=2)
+    apis = [TuyaOpenAPI(endpoint, "id", "secret", transport=transport) for _ in range(3)]
+
+    for api in apis:
+        api.get("/v1.0/devices/d1")
+
+    assert len(http_server.client_ports) == 6
+    assert len(set(http_server.client_ports)) == 1
+    assert all(api.session is not apis[0].session for api in apis[1:])
+    transport.close()
+
+
+def test_keep_alive_false_opens_a_connection_per_request(server: Tuple[str, _Server]) -> None:
+    endpoint, http_server = server
+    api = TuyaOpenAPI(endpoint, "id", "secret", transport=RequestsTransport(keep_alive=False))
+
+    api.get("/v1.0/devices/d1")
+    api.get("/v1.0/devices/d1")
+
+    assert len(set(http_server.client_ports)) == 3
+
+
+def test_default_timeout(server: Tuple[str, _Server]) -> None:
+    endpoint, _ = server
+    session = RequestsTransport(timeout=0.2).create_session()
+
+    assert session.get(f"{endpoint}/v1.0/devices/d1", headers={"delay": "0"}).ok
+    with pytest.raises(requests.Timeout):
+        session.get(f"{endpoint}/v1.0/devices/d1", headers={"delay": "0.5"})
+    # A timeout given with the request wins.
+    assert session.get(f"{endpoint}/v1.0/devices/d1", headers={"delay": "0.3"}, timeout=5).ok
+
+
+def test_in_memory_transport() -> None:
+    def handler(request: requests.PreparedRequest) -> Tuple[int, Any]:
+        if request.path_url == "/ws/auth/token":
+            return 200, '{"access_token": "H1", "token_type": "bearer", "expires_in": 600}'
+        return 404, b"not found"
+
+    transport = InMemoryTransport(handler, latency=0.05)
+    started = time.perf_counter()
+    HoboAPI("id", "secret", "user", endpoint=ENDPOINT, transport=transport)
+
+    assert time.perf_counter() - started >= 0.05
+    assert transport.request_count == 1
+    assert [request.path_url for request in transport.requests] == ["/ws/auth/token"]
+    response = transport.create_session().get(f"{ENDPOINT}/missing")
+    assert response.status_code == 404
+    assert response.content == b"not found"
+    assert response.elapsed.total_seconds() >= 0.05
+
+    unrecorded = InMemoryTransport(handler, record_requests=False)
+    unrecorded.create_session().get(f"{ENDPOINT}/missing")
+    assert unrecorded.request_count == 1
+    assert unrecorded.requests == []
@@ -0,0 +1,90 @@
+"""Columnar (NumPy/pandas) conversion of Tuya device logs."""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import Any
+
+import pytest
+
+from bestlab_platform.tuya import SmartHomeDeviceAPI, TuyaOpenAPI
+from bestlab_platform.tuya.columnar import (device_log_to_arrays,
+                                            device_logs_to_dataframe,
+                                            dp_types_from_specification)
+from tests.fakes import ENDPOINT, FakeTuyaCloud, ok, tuya_record
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+SPECIFICATION = ok({
+    "category": "wsdcg",
+    "functions": [],
+    "status": [
+        {"code": "va_temperature", "type": "Integer", "values": json.dumps({"unit": "℃", "scale": 1})},
+        {"code": "switch", "type": "Boolean", "values": "{}"},
+        {"code": "pir", "type": "Enum", "values": json.dumps({"range": ["pir", "none"]})},
+    ],
+})
+
+LOG = [
+    tuya_record(3000, "va_temperature", "215"),
+    tuya_record(3000, "switch", "true"),
+    tuya_record(2000, "pir", "none"),
+    tuya_record(1000, "va_temperature", "203"),
+    tuya_record(1000, "switch", "false"),
+    tuya_record(1000, "pir", "pir"),
+]
+
+
+def test_dp_types_from_specification() -> None:
+    assert dp_types_from_specification(SPECIFICATION) == {
+        "va_temperature": ("Integer", 1), "switch": ("Boolean", 0), "pir": ("Enum", 0)
+    }
+
+
+def test_typed_arrays_are_scaled_and_sorted() -> None:
+    arrays = device_log_to_arrays(LOG, dp_types_from_specification(SPECIFICATION))
+
+    assert arrays["va_temperature"]["event_time"].tolist() == [1000, 3000]
+    assert arrays["va_temperature"]["value"].tolist() == pytest.approx([20.3, 21.5])
+    assert arrays["switch"]["value"].dtype == np.bool_
+    assert arrays["switch"]["value"].tolist() == [False, True]
+    assert arrays["pir"]["value"].tolist() == ["pir", "none"]
+
+
+def test_untyped_arrays_are_inferred() -> None:
+    arrays = device_log_to_arrays(LOG + [tuya_record(4000, "battery", "2.5"), tuya_record(5000, "battery", "3")])
+
+    assert arrays["va_temperature"]["value"].dtype == np.int64
+    assert arrays["battery"]["value"].dtype == np.float64
+    assert arrays["switch"]["value"].dtype == np.bool_
+    assert arrays["pir"]["value"].dtype == object
+
+
+def test_dataframe_has_one_column_per_device_and_code() -> None:
+    dataframe = device_logs_to_dataframe(
+        {"T1": LOG, "T2": [tuya_record(2000, "pir", "pir"), tuya_record(2000, "pir", "none")]}
+    )
+
+    assert list(dataframe.columns) == [
+        ("T1", "va_temperature"), ("T1", "switch"), ("T1", "pir"), ("T2", "pir")
+    ]
+    assert list(dataframe.index) == list(pd.to_datetime([1000, 2000, 3000], unit="ms", utc=True))
+    assert np.isnan(dataframe[("T1", "va_temperature")].iloc[1])
+    # The last record reported at the same time is kept.
+    assert dataframe[("T2", "pir")].iloc[1] == "none"
+    assert device_logs_to_dataframe({}).empty
+
+
+def test_get_device_log_arrays_uses_the_specification() -> None:
+    cloud = FakeTuyaCloud()
+    now = int(time.time() * 1000)
+    cloud.device_logs["d1"] = [dict(record, event_time=now - 10000 + record["event_time"]) for record in LOG]
+    cloud.route("GET", r"/v1.0/devices/d1/specifications", lambda request: SPECIFICATION)
+    device_api = SmartHomeDeviceAPI(TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport()))
+
+    arrays: Any = device_api.get_device_log_arrays("d1", now - 60000, now)
+
+    assert arrays["va_temperature"]["value"].tolist() == pytest.approx([20.3, 21.5])
+    assert arrays["va_temperature"]["event_time"].tolist() == [now - 9000, now - 7000]
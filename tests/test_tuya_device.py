@@ -0,0 +1,49 @@
+"""Device log queries of SmartHomeDeviceAPI."""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from bestlab_platform.tuya import SmartHomeDeviceAPI, TuyaOpenAPI
+from tests.fakes import ENDPOINT, FakeTuyaCloud, tuya_record
+
+MINUTE = 60 * 1000
+
+
+@pytest.mark.parametrize("num_windows", [1, 3])
+def test_second_and_millisecond_timestamps_query_the_same_range(num_windows: int) -> None:
+    cloud = FakeTuyaCloud()
+    start_seconds = int(time.time()) - 3600
+    start = start_seconds * 1000
+    cloud.device_logs["d1"] = [tuya_record(start + i * MINUTE) for i in range(1, 60)]
+    device_api = SmartHomeDeviceAPI(TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport()))
+
+    in_seconds = device_api.get_device_log("d1", start_seconds, start_seconds + 3600, num_windows=num_windows)
+    in_milliseconds = device_api.get_device_log("d1", start, start + 3600 * 1000, num_windows=num_windows)
+
+    assert len(in_seconds) == 59
+    assert in_seconds == in_milliseconds
+    # The windows are fetched in parallel threads: their requests are in any order.
+    requests = cloud.log_requests
+    assert sorted(requests[:num_windows]) == sorted(requests[num_windows:])
+    assert min(request[1] for request in requests) == start
+
+
+def test_iter_device_log_requests_pages_as_they_are_consumed() -> None:
+    cloud = FakeTuyaCloud()
+    now = int(time.time() * 1000)
+    cloud.device_logs["d1"] = [tuya_record(now - i * 1000) for i in range(1, 251)]
+    device_api = SmartHomeDeviceAPI(TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport()))
+
+    records = device_api.iter_device_log("d1", now - 3600 * 1000, now)
+    first = next(records)
+    log_pages = [request for request in cloud.requests if request.path == "/v1.0/devices/d1/logs"]
+    assert first["event_time"] == now - 1000
+    assert len(log_pages) == 1
+
+    rest = list(records)
+    assert [record["event_time"] for record in rest] == [now - i * 1000 for i in range(2, 251)]
+    log_pages = [request for request in cloud.requests if request.path == "/v1.0/devices/d1/logs"]
+    assert [request.query.get("start_row_key") for request in log_pages] == [None, "100", "200"]
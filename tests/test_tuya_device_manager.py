@@ -0,0 +1,130 @@
+"""Batch calls of TuyaDeviceManager."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+import pytest
+
+from bestlab_platform.exceptions import (BatchRequestError,
+                                         OutcomeUnknownError, ResponseError)
+from bestlab_platform.tuya import TuyaDeviceManager, TuyaOpenAPI
+from tests.fakes import (ENDPOINT, FakeRequest, FakeTuyaCloud, error, ok,
+                         tuya_record)
+
+DEVICES = {"A": "d1", "B": "d2", "C": "d3"}
+
+
+def _cloud() -> FakeTuyaCloud:
+    cloud = FakeTuyaCloud()
+    now = int(time.time() * 1000)
+    for number, device_id in enumerate(DEVICES.values(), 1):
+        cloud.device_logs[device_id] = [tuya_record(now - i * 1000) for i in range(1, number * 150)]
+    return cloud
+
+
+def _manager(cloud: FakeTuyaCloud) -> TuyaDeviceManager:
+    return TuyaDeviceManager(TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport()), device_map=DEVICES)
+
+
+def _last_hour() -> tuple[int, int]:
+    now = int(time.time() * 1000)
+    return now - 3600 * 1000, now
+
+
+def test_device_logs_are_fetched_in_parallel() -> None:
+    cloud = _cloud()
+    # Every first page waits for the first pages of the other devices: a sequential batch would never get past it.
+    barrier = threading.Barrier(len(DEVICES), timeout=5)
+
+    def device_log(request: FakeRequest) -> Any:
+        if "start_row_key" not in request.query:
+            barrier.wait()
+        return cloud._device_log(request)
+
+    cloud.route("GET", r"/v1.0/devices/(?P<device_id>[^/]+)/logs", device_log)
+
+    logs = _manager(cloud).get_device_log_in_batch(*_last_hour(), max_workers=len(DEVICES))
+
+    assert list(logs) == ["A", "B", "C"]
+    assert [len(log) for log in logs.values()] == [149, 299, 449]
+
+
+def test_parallel_and_sequential_batches_return_the_same_logs() -> None:
+    cloud = _cloud()
+    start, end = _last_hour()
+    manager = _manager(cloud)
+
+    assert manager.get_device_log_in_batch(start, end, max_workers=2) == manager.get_device_log_in_batch(start, end)
+
+
+def test_failed_device_does_not_abort_the_batch() -> None:
+    cloud = _cloud()
+    cloud.route("GET", r"/v1.0/devices/d2/logs", lambda request: error(1106, "permission deny"))
+    manager = _manager(cloud)
+
+    with pytest.raises(BatchRequestError) as e:
+        manager.get_device_log_in_batch(*_last_hour(), max_workers=2)
+    assert {name: len(log) for name, log in e.value.results.items()} == {"A": 149, "C": 449}
+    assert list(e.value.errors) == ["B"]
+
+    results = manager.get_device_log_in_batch(*_last_hour(), max_workers=2, return_exceptions=True)
+    assert isinstance(results["B"], Exception)
+
+
+def _command_cloud(delays: dict[str, float]) -> tuple[FakeTuyaCloud, list[str]]:
+    """Cloud applying commands after a delay per device, and the list of the devices whose command was applied."""
+    cloud = FakeTuyaCloud()
+    applied: list[str] = []
+
+    def commands(request: FakeRequest) -> Any:
+        assert request.match is not None
+        device_id = request.match.group("device_id")
+        time.sleep(delays.get(device_id, 0))
+        if device_id == "d2":
+            return error(2001, "device is offline")
+        applied.append(device_id)
+        return ok(True)
+
+    cloud.route("POST", r"/v1.0/devices/(?P<device_id>[^/]+)/commands", commands)
+    return cloud, applied
+
+
+COMMANDS = [{"code": "switch", "value": True}]
+
+
+def test_commands_are_sent_in_parallel_with_partial_failures() -> None:
+    cloud, applied = _command_cloud({"d1": 0.2, "d3": 0.2})
+    started = time.monotonic()
+
+    results = _manager(cloud).send_command_in_batch(COMMANDS, max_workers=3)
+
+    assert time.monotonic() - started < 0.35
+    assert list(results) == ["A", "B", "C"]
+    assert results["A"]["result"] is True
+    assert isinstance(results["B"], ResponseError)
+    assert sorted(applied) == ["d1", "d3"]
+    assert cloud.requests[-1].body == {"commands": COMMANDS}
+
+    with pytest.raises(BatchRequestError) as e:
+        _manager(cloud).send_command_in_batch(COMMANDS, return_exceptions=False)
+    assert list(e.value.errors) == ["B"]
+
+
+def test_command_batch_deadline() -> None:
+    # One worker: A is being sent when the deadline expires, B and C are not started yet.
+    cloud, applied = _command_cloud({"d1": 0.5})
+    started = time.monotonic()
+
+    results = _manager(cloud).send_command_in_batch(COMMANDS, max_workers=1, timeout=0.1)
+
+    assert time.monotonic() - started < 0.4
+    assert isinstance(results["A"], OutcomeUnknownError)
+    assert isinstance(results["A"], TimeoutError)
+    assert type(results["B"]) is TimeoutError
+    assert type(results["C"]) is TimeoutError
+    # The command being sent is left to finish, the others are never sent.
+    time.sleep(0.6)
+    assert applied == ["d1"]
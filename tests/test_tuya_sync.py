@@ -0,0 +1,61 @@
+"""Incremental synchronization of Tuya device logs."""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from bestlab_platform.exceptions import BatchRequestError
+from bestlab_platform.tuya import (SQLiteTuyaLogStore, TuyaDeviceManager,
+                                   TuyaLogSync, TuyaOpenAPI)
+from tests.fakes import ENDPOINT, FakeTuyaCloud, error, tuya_record
+
+MINUTE = 60 * 1000
+
+
+def _log_sync(cloud: FakeTuyaCloud, devices: dict[str, str]) -> TuyaLogSync:
+    api = TuyaOpenAPI(ENDPOINT, "id", "secret", transport=cloud.transport())
+    return TuyaLogSync(TuyaDeviceManager(api, device_map=devices), SQLiteTuyaLogStore(":memory:"))
+
+
+def test_sync_only_fetches_new_records() -> None:
+    cloud = FakeTuyaCloud()
+    now = int(time.time() * 1000)
+    cloud.device_logs["d1"] = [tuya_record(now - i * MINUTE) for i in range(1, 250)]
+    log_sync = _log_sync(cloud, {"PIR1": "d1"})
+    start = now - 300 * MINUTE
+
+    assert log_sync.sync(start, overlap_ms=0) == {"PIR1": 249}
+    cloud.device_logs["d1"].append(tuya_record(now + MINUTE))
+    assert log_sync.sync(start, now + 2 * MINUTE, overlap_ms=0) == {"PIR1": 1}
+    # The second sync starts from the end of the first one.
+    assert cloud.log_requests[1][1] >= now
+    assert len(log_sync.query("PIR1")) == 250
+
+
+def test_late_records_are_fetched_within_the_overlap() -> None:
+    cloud = FakeTuyaCloud()
+    now = int(time.time() * 1000)
+    log_sync = _log_sync(cloud, {"PIR1": "d1", "PIR2": "d2"})
+    cloud.device_logs["d1"] = [tuya_record(now - 2 * MINUTE)]
+
+    assert log_sync.sync(now - 60 * MINUTE) == {"PIR1": 1, "PIR2": 0}
+    # Records which reached the platform after the first sync, with earlier event times
+    cloud.device_logs["d1"].append(tuya_record(now - 3 * MINUTE))
+    cloud.device_logs["d2"] = [tuya_record(now - 5 * MINUTE)]
+    assert log_sync.sync(now - 60 * MINUTE) == {"PIR1": 1, "PIR2": 1}
+
+
+def test_failed_device_does_not_abort_the_others() -> None:
+    cloud = FakeTuyaCloud()
+    now = int(time.time() * 1000)
+    cloud.device_logs["d1"] = [tuya_record(now - MINUTE)]
+    cloud.route("GET", r"/v1.0/devices/d2/logs", lambda request: error(1106, "permission deny"))
+    log_sync = _log_sync(cloud, {"PIR1": "d1", "PIR2": "d2"})
+
+    with pytest.raises(BatchRequestError) as e:
+        log_sync.sync(now - 60 * MINUTE, max_workers=2)
+    assert e.value.results == {"PIR1": 1}
+    assert list(e.value.errors) == ["PIR2"]
+    assert len(log_sync.query("PIR1")) == 1